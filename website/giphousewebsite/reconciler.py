@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class Action:
+    """Types of operations needed to bring an actual state to a desired state."""
+
+    ADD = "add"
+    UPDATE = "update"
+    REMOVE = "remove"
+
+
+class Operation:
+    """A single operation that brings one item of the actual state to the desired state."""
+
+    def __init__(self, action, key, desired=None, actual=None):
+        """
+        Create an operation.
+
+        :param action: The Action to perform
+        :param key: The key of the item the operation applies to
+        :param desired: The desired item, None for removals
+        :param actual: The actual item, None for additions
+        """
+        self.action = action
+        self.key = key
+        self.desired = desired
+        self.actual = actual
+
+    def __eq__(self, other):
+        """Compare operations by comparing properties."""
+        if isinstance(other, Operation):
+            return (self.action, self.key, self.desired, self.actual) == (
+                other.action,
+                other.key,
+                other.desired,
+                other.actual,
+            )
+        return False
+
+    def __repr__(self):
+        """Represent the operation by its action and key."""
+        return f"Operation('{self.action}', {self.key!r})"
+
+
+class KeyedCollection:
+    """A collection of items, indexed by a hashable key for constant time lookups."""
+
+    def __init__(self, items, key=None):
+        """
+        Index the items by their key.
+
+        :param items: Iterable of items
+        :param key: Function returning the key of an item, the item itself is used as key if not specified
+        """
+        self.key = key if key is not None else (lambda item: item)
+        self.items = {self.key(item): item for item in items}
+
+    def __contains__(self, key):
+        """Check whether an item with the key is in the collection."""
+        return key in self.items
+
+    def __getitem__(self, key):
+        """Get the item with the key."""
+        return self.items[key]
+
+    def __iter__(self):
+        """Iterate over the keys of the collection."""
+        return iter(self.items)
+
+    def __len__(self):
+        """Get the number of items in the collection."""
+        return len(self.items)
+
+
+class Diff:
+    """The operations needed to reconcile an actual state with a desired state."""
+
+    def __init__(self, adds, updates, removes):
+        """
+        Create a diff.
+
+        :param adds: Operations for items that are desired but do not exist
+        :param updates: Operations for items that exist but differ from the desired item
+        :param removes: Operations for items that exist but are not desired
+        """
+        self.adds = adds
+        self.updates = updates
+        self.removes = removes
+
+    @property
+    def operations(self):
+        """Get all operations of the diff."""
+        return self.adds + self.updates + self.removes
+
+    def __bool__(self):
+        """Check whether any operations are needed."""
+        return bool(self.adds or self.updates or self.removes)
+
+
+def reconcile(desired, actual, desired_key=None, actual_key=None, changed=None):
+    """
+    Compute the operations that bring the actual state to the desired state.
+
+    Both states are indexed by key, so computing the diff takes linear time. Additions follow the order of the desired
+    state and removals follow the order of the actual state.
+
+    :param desired: Iterable or KeyedCollection of desired items
+    :param actual: Iterable or KeyedCollection of actual items
+    :param desired_key: Function returning the key of a desired item, used if desired is not a KeyedCollection
+    :param actual_key: Function returning the key of an actual item, used if actual is not a KeyedCollection
+    :param changed: Function that checks whether a (desired, actual) pair with the same key needs an update
+    :return: Diff with typed add, update and remove operations
+    """
+    if not isinstance(desired, KeyedCollection):
+        desired = KeyedCollection(desired, desired_key)
+    if not isinstance(actual, KeyedCollection):
+        actual = KeyedCollection(actual, actual_key)
+
+    adds = []
+    updates = []
+    for key, item in desired.items.items():
+        if key not in actual:
+            adds.append(Operation(Action.ADD, key, desired=item))
+        elif changed is not None and changed(item, actual[key]):
+            updates.append(Operation(Action.UPDATE, key, desired=item, actual=actual[key]))
+
+    removes = [Operation(Action.REMOVE, key, actual=item) for key, item in actual.items.items() if key not in desired]
+
+    return Diff(adds, updates, removes)
+
+
+class Executor:
+    """Execute operations in batches, optionally concurrently."""
+
+    def __init__(self, batch_size=None, max_workers=1):
+        """
+        Create an executor.
+
+        :param batch_size: Maximum number of operations per batch, all operations form one batch if not specified
+        :param max_workers: Maximum number of batches that are executed concurrently
+        """
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def batches(self, operations):
+        """Split the operations in batches of at most batch_size operations."""
+        operations = list(operations)
+        batch_size = self.batch_size or len(operations) or 1
+        return [operations[i : i + batch_size] for i in range(0, len(operations), batch_size)]
+
+    def run(self, operations, handler):
+        """
+        Execute the operations.
+
+        :param operations: Iterable of operations to execute
+        :param handler: Function that executes a batch (a list) of operations
+        :return: List of the results of the handler for every batch, in order of the batches
+        """
+        batches = self.batches(operations)
+        if self.max_workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                return list(pool.map(handler, batches))
+        return [handler(batch) for batch in batches]
+
+    def run_as_completed(self, operations, handler):
+        """
+        Execute the operations and yield the result of every batch as soon as it is done.
+
+        This allows the caller to process results, e.g. store them in the database, in its own thread while other
+        batches are still being executed.
+
+        :param operations: Iterable of operations to execute
+        :param handler: Function that executes a batch (a list) of operations
+        :return: Iterator of (batch, result) tuples, in order of completion
+        """
+        batches = self.batches(operations)
+        if self.max_workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(handler, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+        else:
+            for batch in batches:
+                yield batch, handler(batch)
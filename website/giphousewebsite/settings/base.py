@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+from datetime import timedelta
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
@@ -146,3 +147,15 @@ GSUITE_SCOPES = [
     "https://www.googleapis.com/auth/admin.directory.group",
     "https://www.googleapis.com/auth/apps.groups.settings",
 ]
+# Lists whose fingerprint is older than this are fully reconciled with G Suite again, to undo out-of-band edits.
+GSUITE_FINGERPRINT_MAX_AGE = timedelta(days=1)
+# Requests per second that stay within the default Directory API (2400 per minute) and Groups Settings API quotas
+GSUITE_DIRECTORY_API_RATE = 40
+GSUITE_GROUPS_SETTINGS_API_RATE = 10
+# Directory with discovery documents to use instead of the ones bundled with googleapiclient, e.g. for newer versions
+GSUITE_DISCOVERY_DOCUMENTS_DIR = None
+GSUITE_HTTP_TIMEOUT = 60
+# Number of lists that are archived or deleted concurrently
+GSUITE_REMOVAL_WORKERS = 4
+# Seconds to collect changes to mailing lists before automatically syncing them, None to disable automatic syncs
+GSUITE_AUTO_SYNC_DELAY = None
@@ -96,3 +96,4 @@ GSUITE_ADMIN_USER = os.environ["DJANGO_GSUITE_ADMIN_USER"]
 GSUITE_ADMIN_CREDENTIALS_BASE64 = os.environ["DJANGO_GSUITE_ADMIN_CREDENTIALS_BASE64"]
 GSUITE_ADMIN_CREDENTIALS = base64.urlsafe_b64decode(GSUITE_ADMIN_CREDENTIALS_BASE64)
 GSUITE_ADMIN_CREDENTIALS = json.loads(GSUITE_ADMIN_CREDENTIALS)
+GSUITE_AUTO_SYNC_DELAY = 60
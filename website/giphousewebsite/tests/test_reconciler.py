@@ -0,0 +1,84 @@
+import threading
+
+from django.test import TestCase
+
+from giphousewebsite.reconciler import Action, Diff, Executor, KeyedCollection, Operation, reconcile
+
+
+class KeyedCollectionTest(TestCase):
+    def test_keyed_collection(self):
+        collection = KeyedCollection([{"id": 1}, {"id": 2}], key=lambda item: item["id"])
+
+        self.assertIn(1, collection)
+        self.assertNotIn(3, collection)
+        self.assertEqual(collection[2], {"id": 2})
+        self.assertEqual(list(collection), [1, 2])
+        self.assertEqual(len(collection), 2)
+
+    def test_keyed_collection_default_key(self):
+        self.assertIn("a", KeyedCollection(["a", "b"]))
+
+
+class OperationTest(TestCase):
+    def test_eq(self):
+        self.assertEqual(Operation(Action.ADD, "a", desired="a"), Operation(Action.ADD, "a", desired="a"))
+        self.assertNotEqual(Operation(Action.ADD, "a", desired="a"), Operation(Action.REMOVE, "a", actual="a"))
+        self.assertNotEqual(Operation(Action.ADD, "a"), "a")
+
+    def test_repr(self):
+        self.assertEqual(repr(Operation(Action.ADD, "a")), "Operation('add', 'a')")
+
+
+class ReconcileTest(TestCase):
+    def test_reconcile(self):
+        diff = reconcile(
+            [("a", 1), ("b", 2), ("c", 3)],
+            [("b", 2), ("c", 4), ("d", 5)],
+            desired_key=lambda item: item[0],
+            actual_key=lambda item: item[0],
+            changed=lambda desired, actual: desired[1] != actual[1],
+        )
+
+        self.assertEqual(diff.adds, [Operation(Action.ADD, "a", desired=("a", 1))])
+        self.assertEqual(diff.updates, [Operation(Action.UPDATE, "c", desired=("c", 3), actual=("c", 4))])
+        self.assertEqual(diff.removes, [Operation(Action.REMOVE, "d", actual=("d", 5))])
+        self.assertEqual(len(diff.operations), 3)
+        self.assertTrue(diff)
+
+    def test_reconcile_without_changed(self):
+        diff = reconcile(KeyedCollection(["a", "b"]), KeyedCollection(["b", "c"]))
+
+        self.assertEqual([operation.key for operation in diff.adds], ["a"])
+        self.assertEqual(diff.updates, [])
+        self.assertEqual([operation.key for operation in diff.removes], ["c"])
+
+    def test_reconcile_in_sync(self):
+        self.assertFalse(reconcile(["a", "b"], ["b", "a"]))
+        self.assertFalse(Diff([], [], []))
+
+
+class ExecutorTest(TestCase):
+    def test_batches(self):
+        self.assertEqual(Executor(batch_size=2).batches(range(5)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(Executor().batches(range(3)), [[0, 1, 2]])
+        self.assertEqual(Executor().batches([]), [])
+
+    def test_run(self):
+        self.assertEqual(Executor(batch_size=2).run(range(5), sum), [1, 5, 4])
+
+    def test_run_concurrently(self):
+        threads = set()
+
+        def handler(batch):
+            threads.add(threading.get_ident())
+            return sum(batch)
+
+        self.assertEqual(Executor(batch_size=2, max_workers=2).run(range(5), handler), [1, 5, 4])
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_run_as_completed(self):
+        self.assertEqual(list(Executor(batch_size=2).run_as_completed(range(3), sum)), [([0, 1], 1), ([2], 2)])
+
+    def test_run_as_completed_concurrently(self):
+        results = Executor(batch_size=1, max_workers=2).run_as_completed(range(4), lambda batch: batch[0] * 2)
+        self.assertEqual(sorted(results), [([0], 0), ([1], 2), ([2], 4), ([3], 6)])
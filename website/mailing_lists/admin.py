@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.shortcuts import redirect
 from django.urls import path
 
@@ -9,6 +10,7 @@ from mailing_lists.models import (
     MailingList,
     MailingListAlias,
     MailingListCourseSemesterLink,
+    resolve_addresses,
 )
 
 
@@ -41,26 +43,51 @@ class CourseSemesterLinkInline(admin.TabularInline):
         return formfield
 
 
+class MailingListChangeList(ChangeList):
+    """ChangeList that resolves the member counts of all mailing lists on a page at once."""
+
+    def get_results(self, request):
+        """Get the mailing lists on the page and annotate them with their number of members."""
+        super().get_results(request)
+        addresses = resolve_addresses(mailing_list.pk for mailing_list in self.result_list)
+        for mailing_list in self.result_list:
+            mailing_list.member_count = len(addresses[mailing_list.pk])
+
+
 @admin.register(MailingList)
 class MailingListAdmin(admin.ModelAdmin):
     """Admin class for Mailing List."""
 
     form = MailingListAdminForm
-    list_display = ("address", "description", "mailinglist_aliases")
+    list_display = ("address", "description", "mailinglist_aliases", "member_count")
     list_filter = ("address",)
     readonly_fields = ("gsuite_group_name",)
     inlines = [CourseSemesterLinkInline, ExtraEmailInline, AliasInline]
     actions = ["synchronize_selected_mailing_lists"]
 
-    def synchronize_selected_mailing_lists(self, request, queryset):
-        """Synchronize all selected mailing lists with Gsuite."""
-        sync = GSuiteSyncService()
+    def get_queryset(self, request):
+        """Prefetch the aliases that are shown in the changelist."""
+        return super().get_queryset(request).prefetch_related("mailinglistalias_set")
+
+    def get_changelist(self, request, **kwargs):
+        """Get the changelist that annotates the member counts."""
+        return MailingListChangeList
 
-        sync_list = []
-        for list in queryset:
-            sync_list.append(sync.mailing_list_to_group(list))
+    def member_count(self, obj):
+        """Return the number of email addresses in the mailing list, annotated by the changelist."""
+        return obj.member_count
 
-        sync.sync_mailing_lists(sync_list)
+    member_count.short_description = "Members"
+
+    def synchronize_selected_mailing_lists(self, request, queryset):
+        """
+        Synchronize all selected mailing lists with Gsuite as a Task.
+
+        The selected lists are synced even if they did not change, to repair changes made directly in GSuite.
+        """
+        sync = GSuiteSyncService()
+        task_id = sync.sync_mailing_lists_as_task(sync.mailing_lists_to_groups(queryset), force=True)
+        return redirect("admin:progress_bar", task=task_id)
 
     synchronize_selected_mailing_lists.short_description = "Synchronize selected mailing lists"
 
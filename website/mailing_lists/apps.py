@@ -6,3 +6,7 @@ class MailingListsConfig(AppConfig):
 
     name = "mailing_lists"
     verbose_name = "Mailing Lists"
+
+    def ready(self):
+        """Connect the signal receivers that queue changed mailing lists for an automatic sync."""
+        from mailing_lists import autosync  # noqa: F401
@@ -0,0 +1,181 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from mailing_lists.gsuite import GSuiteSyncService
+from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias, MailingListCourseSemesterLink
+
+from registrations.models import Registration
+
+logger = logging.getLogger("gsuitesync")
+
+
+class AutoSyncQueue:
+    """
+    Debounced queue of mailing lists that changed and need to be synced with GSuite.
+
+    The first change starts a timer of `GSUITE_AUTO_SYNC_DELAY` seconds, all lists that change before it expires are
+    synced together by a single sync in a background thread. Lists that change while a sync runs are synced by the
+    next sync.
+    """
+
+    def __init__(self):
+        """Create an empty queue."""
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.timer = None
+        self.running = False
+
+    def add(self, mailing_list_ids):
+        """
+        Queue mailing lists to be synced.
+
+        :param mailing_list_ids: Iterable of ids of the mailing lists
+        """
+        with self.lock:
+            self.pending.update(mailing_list_ids)
+            if self.pending and self.timer is None and not self.running:
+                self._schedule()
+
+    def _schedule(self):
+        """Start the timer for the next sync, must be called while holding the lock."""
+        self.timer = threading.Timer(settings.GSUITE_AUTO_SYNC_DELAY, self._run)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _run(self):
+        """Sync the queued lists in the timer thread and close the database connection of the thread afterwards."""
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Sync all queued mailing lists now."""
+        with self.lock:
+            mailing_list_ids, self.pending = self.pending, set()
+            self.timer = None
+            self.running = True
+
+        try:
+            if mailing_list_ids:
+                self.sync(mailing_list_ids)
+        except Exception:
+            logger.exception("Could not automatically sync the changed mailing lists")
+        finally:
+            with self.lock:
+                self.running = False
+                if self.pending:
+                    self._schedule()
+
+    @staticmethod
+    def sync(mailing_list_ids):
+        """
+        Sync the given mailing lists with GSuite.
+
+        :param mailing_list_ids: Ids of the mailing lists, lists that no longer exist are ignored
+        """
+        sync = GSuiteSyncService()
+        lists = sync.mailing_lists_to_groups(MailingList.objects.filter(id__in=mailing_list_ids))
+        if lists:
+            logger.info(f"Automatically syncing {len(lists)} changed mailing lists")
+            sync.sync_mailing_lists(lists=lists)
+
+
+queue = AutoSyncQueue()
+
+
+def queue_mailing_lists(mailing_list_ids):
+    """
+    Queue mailing lists for an automatic sync once the current transaction is committed.
+
+    :param mailing_list_ids: Iterable of ids of the changed mailing lists
+    """
+    if settings.GSUITE_AUTO_SYNC_DELAY is None:
+        return
+
+    mailing_list_ids = set(mailing_list_ids)
+    if mailing_list_ids:
+        transaction.on_commit(lambda: queue.add(mailing_list_ids))
+
+
+def mailing_lists_of_registrations(registrations):
+    """
+    Get the mailing lists that contain the users of registrations, through their project or their course semester.
+
+    :param registrations: Iterable of (project_id, course_id, semester_id) tuples
+    :return: Set of mailing list ids
+    """
+    condition = Q(pk__in=[])
+    for project_id, course_id, semester_id in registrations:
+        if project_id is not None:
+            condition |= Q(projects=project_id)
+        condition |= Q(
+            mailinglistcoursesemesterlink__course=course_id, mailinglistcoursesemesterlink__semester=semester_id
+        )
+    return set(MailingList.objects.filter(condition).values_list("id", flat=True))
+
+
+def _registration_links(registration):
+    return registration.project_id, registration.course_id, registration.semester_id
+
+
+@receiver(pre_save, sender=Registration)
+def remember_registration_links(instance, **kwargs):
+    """Remember the project and course semester of a registration before it is changed."""
+    if settings.GSUITE_AUTO_SYNC_DELAY is None or instance.pk is None:
+        return
+    instance._previous_links = (
+        Registration.objects.filter(pk=instance.pk).values_list("project", "course", "semester").first()
+    )
+
+
+@receiver(post_save, sender=Registration)
+def registration_saved(instance, created, **kwargs):
+    """Queue the mailing lists of the old and new project and course semester of a changed registration."""
+    if settings.GSUITE_AUTO_SYNC_DELAY is None:
+        return
+    previous_links = getattr(instance, "_previous_links", None)
+    links = _registration_links(instance)
+    if created or previous_links is None:
+        queue_mailing_lists(mailing_lists_of_registrations([links]))
+    elif previous_links != links:
+        queue_mailing_lists(mailing_lists_of_registrations([previous_links, links]))
+
+
+@receiver(post_delete, sender=Registration)
+def registration_deleted(instance, **kwargs):
+    """Queue the mailing lists of the project and course semester of a deleted registration."""
+    if settings.GSUITE_AUTO_SYNC_DELAY is not None:
+        queue_mailing_lists(mailing_lists_of_registrations([_registration_links(instance)]))
+
+
+@receiver(m2m_changed, sender=MailingList.users.through)
+@receiver(m2m_changed, sender=MailingList.projects.through)
+def mailing_list_relation_changed(instance, action, reverse, pk_set, **kwargs):
+    """Queue mailing lists of which the users or projects changed, from either side of the relation."""
+    if settings.GSUITE_AUTO_SYNC_DELAY is None:
+        return
+    if action in ("post_add", "post_remove"):
+        queue_mailing_lists(pk_set if reverse else [instance.pk])
+    elif action == "pre_clear" and reverse:
+        queue_mailing_lists(instance.mailinglist_set.values_list("id", flat=True))
+    elif action == "post_clear" and not reverse:
+        queue_mailing_lists([instance.pk])
+
+
+@receiver(post_save, sender=MailingList)
+@receiver(post_delete, sender=ExtraEmailAddress)
+@receiver(post_save, sender=ExtraEmailAddress)
+@receiver(post_delete, sender=MailingListAlias)
+@receiver(post_save, sender=MailingListAlias)
+@receiver(post_delete, sender=MailingListCourseSemesterLink)
+@receiver(post_save, sender=MailingListCourseSemesterLink)
+def mailing_list_changed(sender, instance, **kwargs):
+    """Queue a mailing list of which the properties, extra addresses, aliases or course semesters changed."""
+    queue_mailing_lists([instance.pk if sender is MailingList else instance.mailing_list_id])
@@ -1,5 +1,6 @@
 from django import forms
 from django.conf import settings
+from django.contrib import admin
 from django.contrib.admin import widgets
 from django.contrib.auth import get_user_model
 from django.utils.html import escape
@@ -53,7 +54,9 @@ class MailingListAdminForm(forms.ModelForm):
         )
 
     users = forms.ModelMultipleChoiceField(
-        queryset=None, required=False, widget=widgets.FilteredSelectMultiple("Users", False)
+        queryset=None,
+        required=False,
+        widget=widgets.AutocompleteSelectMultiple(MailingList._meta.get_field("users"), admin.site),
     )
 
     def save_m2m(self):
@@ -17,49 +17,143 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import hashlib
+import json
 import logging
+import os
 import threading
+from collections import Counter
+from datetime import timedelta
 from random import random
 from time import sleep
 
 from django.conf import settings
+from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.datastructures import ImmutableList
 
 from google.oauth2 import service_account
 
-from googleapiclient.discovery import build
-from googleapiclient.discovery_cache.base import Cache
+from google_auth_httplib2 import AuthorizedHttp
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 
-from mailing_lists.models import MailingList, MailingListToBeDeleted
+from httplib2 import Http
+
+from giphousewebsite.reconciler import Executor, reconcile
+
+from mailing_lists.models import MailingList, MailingListToBeDeleted, resolve_addresses
+from mailing_lists.throttling import TokenBucket, is_quota_error, is_transient_error
 
 from tasks.models import Task
 
 logger = logging.getLogger("gsuitesync")
 
 
-class MemoryCache(Cache):
-    """Cache http requests in memory."""
+class GSuiteClientFactory:
+    """
+    Create GSuite API clients without network round trips.
+
+    The clients are built from the discovery documents bundled with googleapiclient (or read from
+    `GSUITE_DISCOVERY_DOCUMENTS_DIR`), so no discovery documents are fetched. The service account credentials are
+    shared by all clients, so an access token is reused until it expires. httplib2 is not thread safe, so every thread
+    gets its own authorized HTTP transport and its own clients, which are reused by later syncs in that thread.
+    """
+
+    def __init__(self):
+        """Create a client factory, the credentials and clients are created when first needed."""
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._documents = {}
+        self._local = threading.local()
+
+    @property
+    def credentials(self):
+        """Get the service account credentials shared by all clients."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = service_account.Credentials.from_service_account_info(
+                    settings.GSUITE_ADMIN_CREDENTIALS, scopes=settings.GSUITE_SCOPES
+                ).with_subject(settings.GSUITE_ADMIN_USER)
+            return self._credentials
+
+    def discovery_document(self, service_name, version):
+        """
+        Get the discovery document of an API from disk.
+
+        :param service_name: Name of the API
+        :param version: Version of the API
+        :return: The discovery document as string
+        """
+        key = f"{service_name}.{version}"
+        with self._lock:
+            if key not in self._documents:
+                document = None
+                if settings.GSUITE_DISCOVERY_DOCUMENTS_DIR:
+                    path = os.path.join(settings.GSUITE_DISCOVERY_DOCUMENTS_DIR, f"{key}.json")
+                    if os.path.exists(path):
+                        with open(path) as f:
+                            document = f.read()
+                self._documents[key] = document or get_static_doc(service_name, version)
+            return self._documents[key]
+
+    def client(self, service_name, version):
+        """
+        Get an API client for the current thread.
+
+        :param service_name: Name of the API
+        :param version: Version of the API
+        :return: The API client
+        """
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+            self._local.http = AuthorizedHttp(self.credentials, http=Http(timeout=settings.GSUITE_HTTP_TIMEOUT))
+
+        key = (service_name, version)
+        if key not in clients:
+            clients[key] = build_from_document(self.discovery_document(service_name, version), http=self._local.http)
+        return clients[key]
+
+    def directory_api(self):
+        """Get a Directory API client for the current thread."""
+        return self.client("admin", "directory_v1")
 
-    _CACHE = {}
+    def groups_settings_api(self):
+        """Get a Groups Settings API client for the current thread."""
+        return self.client("groupssettings", "v1")
 
-    def get(self, url):
-        """Get the cached result for a url."""
-        return MemoryCache._CACHE.get(url)
 
-    def set(self, url, content):
-        """Set the cached result for a url."""
-        MemoryCache._CACHE[url] = content
+client_factory = GSuiteClientFactory()
 
+# Maximum page size of the Directory API list operations
+DIRECTORY_PAGE_SIZE = 200
 
-memory_cache = MemoryCache()
+# Rate limiters shared by all syncs, as the quotas apply to the whole service account
+directory_api_limiter = TokenBucket(settings.GSUITE_DIRECTORY_API_RATE)
+groups_settings_api_limiter = TokenBucket(settings.GSUITE_GROUPS_SETTINGS_API_RATE)
 
+# Number of times a request is retried when a quota is exceeded
+MAX_QUOTA_RETRIES = 5
 
-def chunks(list, chunk_size):
-    """Yield successive n-sized chunks from list."""
-    for i in range(0, len(list), chunk_size):
-        yield list[i : i + chunk_size]
+# Number of follow-up batches for requests of a batch that failed with a transient error
+MAX_BATCH_RETRIES = 3
+
+# The API clients are not thread safe, so batches of a group are executed one after another
+batch_executor = Executor(batch_size=50)
+
+# Guards the statistics of syncs, which are updated by concurrent removals
+statistics_lock = threading.Lock()
+
+# Lists are archived and deleted concurrently, every thread uses its own API clients
+removal_executor = Executor(batch_size=1, max_workers=settings.GSUITE_REMOVAL_WORKERS)
+
+# Delay before retrying to archive or delete a list that failed, doubled after every failed attempt
+REMOVAL_RETRY_DELAY = timedelta(minutes=5)
+MAX_REMOVAL_RETRY_DELAY = timedelta(days=1)
 
 
 class GSuiteSyncService:
@@ -103,39 +197,56 @@ class GSuiteSyncService:
                 return self.__dict__ == other.__dict__
             return False
 
+        @property
+        def fingerprint(self):
+            """
+            Hash the desired state of the group.
+
+            The hash covers everything that is pushed to GSuite: the name, description, aliases, addresses and the
+            group settings. If the fingerprint of a group did not change since the last successful sync, the group
+            does not need to be synced again.
+
+            :return: Hex digest of the desired state of the group
+            """
+            state = [
+                self.name,
+                self.description,
+                sorted(self.aliases),
+                self.addresses,
+                GSuiteSyncService._group_settings(),
+            ]
+            return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
     def __init__(self, groups_settings_api=None, directory_api=None):
         """
         Create GSuite Sync Service with the possibility to create your own group settings and directory api.
 
+        Lists are archived and deleted concurrently, so specified API objects must be thread safe.
+
         :param groups_settings_api: Group settings api object, created if not specified
         :param directory_api: Directory api object, created if not specified
         """
         super().__init__()
 
-        if groups_settings_api is None or directory_api is None:
-            credentials = service_account.Credentials.from_service_account_info(
-                settings.GSUITE_ADMIN_CREDENTIALS, scopes=settings.GSUITE_SCOPES
-            ).with_subject(settings.GSUITE_ADMIN_USER)
-
-            if groups_settings_api is None:
-                groups_settings_api = build(
-                    "groupssettings",
-                    "v1",
-                    credentials=credentials,
-                    cache=memory_cache,
-                )
-
-            if directory_api is None:
-                directory_api = build(
-                    "admin",
-                    "directory_v1",
-                    credentials=credentials,
-                    cache=memory_cache,
-                )
-
-        self.groups_settings_api = groups_settings_api
-        self.directory_api = directory_api
+        self._groups_settings_api = groups_settings_api
+        self._directory_api = directory_api
         self.task = None
+        self._listed_aliases = {}
+        self._reset_statistics()
+
+    @property
+    def groups_settings_api(self):
+        """Get the Groups Settings API client, created for the current thread if not specified."""
+        if self._groups_settings_api is not None:
+            return self._groups_settings_api
+        return client_factory.groups_settings_api()
+
+    @property
+    def directory_api(self):
+        """Get the Directory API client, created for the current thread if not specified."""
+        if self._directory_api is not None:
+            return self._directory_api
+        return client_factory.directory_api()
 
     @staticmethod
     def _group_settings():
@@ -203,6 +314,49 @@ class GSuiteSyncService:
             "whoCanDiscoverGroup": "ALL_IN_DOMAIN_CAN_DISCOVER",
         }
 
+    def _execute(self, request, limiter, cost=1, retry_quota=True):
+        """
+        Execute a request within the API quota.
+
+        Requests wait for the rate limiter of the API and are retried with exponential backoff if the API still
+        responds that a quota was exceeded.
+
+        :param request: The request (or batch request) to execute
+        :param limiter: The TokenBucket of the API
+        :param cost: The number of requests counted against the quota
+        :param retry_quota: Whether to retry the request if a quota was exceeded, callers that retry themselves
+                            disable this to not multiply the retries, and count the call as failed only if their own
+                            retries run out
+        :return: The response of the request
+        """
+        n = 0
+        while True:
+            if limiter.acquire(cost):
+                with statistics_lock:
+                    self.throttled_calls += 1
+            try:
+                return request.execute()
+            except HttpError as e:
+                if not retry_quota and is_quota_error(e):
+                    raise
+                if not is_quota_error(e) or n >= MAX_QUOTA_RETRIES:
+                    with statistics_lock:
+                        self.failed_calls += 1
+                    raise
+                logger.warning(f"Quota exceeded, retrying request (attempt {n + 1})")
+                with statistics_lock:
+                    self.retried_calls += 1
+                sleep(min(2**n + random(), 64))
+                n += 1
+
+    def _execute_directory(self, request, cost=1, retry_quota=True):
+        """Execute a Directory API request within its quota."""
+        return self._execute(request, directory_api_limiter, cost, retry_quota)
+
+    def _execute_groups_settings(self, request, cost=1):
+        """Execute a Groups Settings API request within its quota."""
+        return self._execute(request, groups_settings_api_limiter, cost)
+
     def create_group(self, group):
         """
         Create a new group based on the provided data.
@@ -210,23 +364,27 @@ class GSuiteSyncService:
         :param group: GroupData to create a group for
         """
         try:
-            self.directory_api.groups().insert(
-                body={
-                    "email": f"{group.name}@{settings.GSUITE_DOMAIN}",
-                    "name": group.name,
-                    "description": group.description,
-                },
-            ).execute()
+            self._execute_directory(
+                self.directory_api.groups().insert(
+                    body={
+                        "email": f"{group.name}@{settings.GSUITE_DOMAIN}",
+                        "name": group.name,
+                        "description": group.description,
+                    },
+                )
+            )
             # Wait for mailing list creation to complete Docs say we need to
             # wait a minute.
             n = 0
             while True:
                 sleep(min(2**n + random(), 64))
                 try:
-                    self.groups_settings_api.groups().update(
-                        groupUniqueId=f"{group.name}@{settings.GSUITE_DOMAIN}",
-                        body=self._group_settings(),
-                    ).execute()
+                    self._execute_groups_settings(
+                        self.groups_settings_api.groups().update(
+                            groupUniqueId=f"{group.name}@{settings.GSUITE_DOMAIN}",
+                            body=self._group_settings(),
+                        )
+                    )
                     break
                 except HttpError as e:
                     if n > 6:
@@ -250,18 +408,22 @@ class GSuiteSyncService:
         :param group: new group data
         """
         try:
-            self.directory_api.groups().update(
-                groupKey=f"{gsuite_group_name}@{settings.GSUITE_DOMAIN}",
-                body={
-                    "email": f"{group.name}@{settings.GSUITE_DOMAIN}",
-                    "name": group.name,
-                    "description": group.description,
-                },
-            ).execute()
-            self.groups_settings_api.groups().update(
-                groupUniqueId=f"{group.name}@{settings.GSUITE_DOMAIN}",
-                body=self._group_settings(),
-            ).execute()
+            self._execute_directory(
+                self.directory_api.groups().update(
+                    groupKey=f"{gsuite_group_name}@{settings.GSUITE_DOMAIN}",
+                    body={
+                        "email": f"{group.name}@{settings.GSUITE_DOMAIN}",
+                        "name": group.name,
+                        "description": group.description,
+                    },
+                )
+            )
+            self._execute_groups_settings(
+                self.groups_settings_api.groups().update(
+                    groupUniqueId=f"{group.name}@{settings.GSUITE_DOMAIN}",
+                    body=self._group_settings(),
+                )
+            )
             logger.info(f"List {group.name} updated")
         except HttpError:
             logger.exception(f"Could not update list {group.name}")
@@ -276,49 +438,48 @@ class GSuiteSyncService:
         """
         Update the aliases of a group based on existing values.
 
+        The existing aliases are taken from the group listing of the current sync. They are only requested
+        separately for groups that were not listed, such as groups created during the sync.
+
         :param group: group data
         """
         group_key = f"{group.name}@{settings.GSUITE_DOMAIN}"
-        try:
-            aliases_response = (
-                self.directory_api.groups()
-                .aliases()
-                .list(
-                    groupKey=group_key,
-                )
-                .execute()
-            )
-        except HttpError:
-            logger.exception(f"Could not obtain existing aliases for list {group.name}:")
-            return
-
-        existing_aliases = [a["alias"] for a in aliases_response.get("aliases", [])]
-        new_aliases = [f"{a}@{settings.GSUITE_DOMAIN}" for a in group.aliases]
-
-        remove_list = list(filter(lambda x: x not in new_aliases, existing_aliases))
-        insert_list = list(filter(lambda x: x not in existing_aliases, new_aliases))
-
-        for chunk in chunks(remove_list, 50):
-            batch = self.directory_api.new_batch_http_request()
-            for remove_alias in chunk:
-                batch.add(self.directory_api.groups().aliases().delete(groupKey=group_key, alias=remove_alias))
-
+        if group_key in self._listed_aliases:
+            # Aliases listed with the groups are only used once, as they are outdated after this update
+            existing_aliases = self._listed_aliases.pop(group_key)
+        else:
             try:
-                batch.execute()
+                aliases_response = self._execute_directory(
+                    self.directory_api.groups()
+                    .aliases()
+                    .list(
+                        groupKey=group_key,
+                        fields="aliases(alias)",
+                    )
+                )
             except HttpError:
-                logger.exception(f"Could not remove an alias for list {group.name}")
+                logger.exception(f"Could not obtain existing aliases for list {group.name}:")
+                self.failed_groups.add(group.name)
+                return
+            existing_aliases = [a["alias"] for a in aliases_response.get("aliases", [])]
 
-        for chunk in chunks(insert_list, 50):
-            batch = self.directory_api.new_batch_http_request()
-            for insert_alias in chunk:
-                batch.add(
-                    self.directory_api.groups().aliases().insert(groupKey=group_key, body={"alias": insert_alias})
-                )
+        new_aliases = [f"{a}@{settings.GSUITE_DOMAIN}" for a in group.aliases]
+        diff = reconcile(new_aliases, existing_aliases)
 
-            try:
-                batch.execute()
-            except HttpError:
-                logger.exception(f"Could not insert an alias for list {group.name}")
+        self._execute_batches(
+            group,
+            diff.removes,
+            lambda operation: self.directory_api.groups().aliases().delete(groupKey=group_key, alias=operation.key),
+            "Could not remove an alias for list",
+        )
+        self._execute_batches(
+            group,
+            diff.adds,
+            lambda operation: self.directory_api.groups()
+            .aliases()
+            .insert(groupKey=group_key, body={"alias": operation.key}),
+            "Could not insert an alias for list",
+        )
 
         logger.info(f"List {group.name} aliases updated")
 
@@ -331,10 +492,12 @@ class GSuiteSyncService:
         :return: True if the operation succeeded, False otherwise.
         """
         try:
-            self.groups_settings_api.groups().patch(
-                groupUniqueId=f"{name}@{settings.GSUITE_DOMAIN}",
-                body={"archiveOnly": "true", "whoCanPostMessage": "NONE_CAN_POST"},
-            ).execute()
+            self._execute_groups_settings(
+                self.groups_settings_api.groups().patch(
+                    groupUniqueId=f"{name}@{settings.GSUITE_DOMAIN}",
+                    body={"archiveOnly": "true", "whoCanPostMessage": "NONE_CAN_POST"},
+                )
+            )
             self._update_group_members(GSuiteSyncService.GroupData(name, addresses=[]))
             self._update_group_aliases(GSuiteSyncService.GroupData(name, aliases=[]))
             logger.info(f"List {name} archived")
@@ -352,15 +515,120 @@ class GSuiteSyncService:
         :return: True if the operation succeeded, False otherwise.
         """
         try:
-            self.directory_api.groups().delete(
-                groupKey=f"{name}@{settings.GSUITE_DOMAIN}",
-            ).execute()
+            self._execute_directory(
+                self.directory_api.groups().delete(
+                    groupKey=f"{name}@{settings.GSUITE_DOMAIN}",
+                )
+            )
             logger.info(f"List {name} deleted")
             return True
         except HttpError:
             logger.exception(f"Could not delete list {name}")
             return False
 
+    def _execute_batches(self, group, operations, to_request, error_message):
+        """
+        Execute the requests for the operations on a group in batch requests.
+
+        The outcome of every request in a batch is recorded. Requests that failed with a transient error, or all
+        requests if the whole batch failed, are resubmitted in a follow-up batch with exponential backoff.
+
+        :param group: The group data the operations belong to
+        :param operations: List of reconciler operations
+        :param to_request: Function that creates the API request for an operation
+        :param error_message: Message to log when an operation fails, followed by the group name
+        """
+
+        def execute_batch(batch):
+            n = 0
+            while True:
+                errors = {}
+                quota_exceeded = False
+
+                def callback(request_id, response, exception):
+                    if exception is not None:
+                        errors[int(request_id)] = exception
+
+                batch_request = self.directory_api.new_batch_http_request(callback=callback)
+                for request_id, operation in enumerate(batch):
+                    batch_request.add(to_request(operation), request_id=str(request_id))
+
+                try:
+                    # Every request in a batch counts against the quota. A batch that exceeded the quota is retried by
+                    # the follow-up batches, so it is not retried by _execute as well.
+                    self._execute_directory(batch_request, cost=len(batch), retry_quota=False)
+                except HttpError as e:
+                    logger.warning(f"Batch request for list {group.name} failed: {e}")
+                    errors = {request_id: e for request_id in range(len(batch))}
+                    quota_exceeded = is_quota_error(e)
+
+                retry = [batch[request_id] for request_id, e in errors.items() if is_transient_error(e)]
+                for request_id, e in errors.items():
+                    if not is_transient_error(e):
+                        logger.error(f"{error_message} {group.name} ({batch[request_id].key}): {e}")
+                self._record_results(group, len(batch) - len(errors), len(errors) - len(retry))
+
+                if not retry:
+                    return
+                if n >= MAX_BATCH_RETRIES:
+                    logger.error(f"{error_message} {group.name}: {len(retry)} requests kept failing")
+                    self._record_results(group, 0, len(retry))
+                    if quota_exceeded:
+                        with statistics_lock:
+                            self.failed_calls += 1
+                    return
+
+                if quota_exceeded:
+                    with statistics_lock:
+                        self.retried_calls += 1
+                sleep(min(2**n + random(), 64))
+                n += 1
+                batch = retry
+
+        batch_executor.run(operations, execute_batch)
+
+    def _record_results(self, group, succeeded, failed):
+        """
+        Record the number of succeeded and failed operations on a group.
+
+        :param group: The group data the operations belong to
+        :param succeeded: The number of operations that succeeded
+        :param failed: The number of operations that failed permanently
+        """
+        with statistics_lock:
+            self.operations_succeeded[group.name] += succeeded
+            self.operations_failed[group.name] += failed
+            if failed:
+                self.failed_groups.add(group.name)
+
+    def _reset_statistics(self):
+        """Reset the statistics of a sync."""
+        self.failed_groups = set()
+        self.operations_succeeded = Counter()
+        self.operations_failed = Counter()
+        self.throttled_calls = 0
+        self.retried_calls = 0
+        self.failed_calls = 0
+
+    def _list_all(self, list_method, key, **kwargs):
+        """
+        Yield all items of a paginated Directory API list operation.
+
+        Pages are requested with the maximum page size and are processed one at a time, instead of collecting all
+        pages in memory first.
+
+        :param list_method: The list method of the API resource, e.g. `directory_api.members().list`
+        :param key: The key of the items in the response, e.g. "members"
+        :param kwargs: Arguments for the list method
+        """
+        response = self._execute_directory(list_method(maxResults=DIRECTORY_PAGE_SIZE, **kwargs))
+        yield from response.get(key, [])
+        while "nextPageToken" in response:
+            response = self._execute_directory(
+                list_method(maxResults=DIRECTORY_PAGE_SIZE, pageToken=response["nextPageToken"], **kwargs)
+            )
+            yield from response.get(key, [])
+
     def _update_group_members(self, group):
         """
         Update the group members of the specified group based on the existing members.
@@ -369,64 +637,49 @@ class GSuiteSyncService:
         """
         group_key = f"{group.name}@{settings.GSUITE_DOMAIN}"
         try:
-            members_response = (
-                self.directory_api.members()
-                .list(
+            existing_members = list(
+                self._list_all(
+                    self.directory_api.members().list,
+                    "members",
                     groupKey=group_key,
+                    fields="nextPageToken,members(email,role)",
                 )
-                .execute()
             )
-            members_list = members_response.get("members", [])
-            while "nextPageToken" in members_response:
-                members_response = (
-                    self.directory_api.members()
-                    .list(
-                        groupKey=group_key,
-                        pageToken=members_response["nextPageToken"],
-                    )
-                    .execute()
-                )
-                members_list += members_response.get("members", [])
-
-            existing_members = [m["email"] for m in members_list if m["role"] == "MEMBER"]
-            existing_managers = [m["email"] for m in members_list if m["role"] == "MANAGER"]
         except HttpError:
             logger.exception(f"Could not obtain list member data for {group.name}")
+            self.failed_groups.add(group.name)
             return  # the list does not exist or something else is wrong
-        new_members = group.addresses
-
-        remove_list = list(filter(lambda x: x not in new_members, existing_members))
-        insert_list = list(filter(lambda x: x not in existing_members and x not in existing_managers, new_members))
-
-        for chunk in chunks(remove_list, 50):
-            batch = self.directory_api.new_batch_http_request()
-            for remove_member in chunk:
-                batch.add(self.directory_api.members().delete(groupKey=group_key, memberKey=remove_member))
 
-            try:
-                batch.execute()
-            except HttpError:
-                logger.exception(f"Could not remove a list member from {group.name}")
-
-        for chunk in chunks(insert_list, 50):
-            batch = self.directory_api.new_batch_http_request()
-            for insert_member in chunk:
-                batch.add(
-                    self.directory_api.members().insert(
-                        groupKey=group_key, body={"email": insert_member, "role": "MEMBER"}
-                    )
-                )
+        diff = reconcile(group.addresses, existing_members, actual_key=lambda member: member["email"])
 
-            try:
-                batch.execute()
-            except HttpError:
-                logger.exception(f"Could not insert a list member in {group.name}")
+        self._execute_batches(
+            group,
+            # Managers are never removed
+            [operation for operation in diff.removes if operation.actual["role"] == "MEMBER"],
+            lambda operation: self.directory_api.members().delete(groupKey=group_key, memberKey=operation.key),
+            "Could not remove a list member from",
+        )
+        self._execute_batches(
+            group,
+            diff.adds,
+            lambda operation: self.directory_api.members().insert(
+                groupKey=group_key, body={"email": operation.key, "role": "MEMBER"}
+            ),
+            "Could not insert a list member in",
+        )
 
         logger.info(f"List {group.name} members updated")
 
     @staticmethod
-    def mailing_list_to_group(mailing_list):
-        """Convert a mailing list model to everything we need for GSuite."""
+    def mailing_list_to_group(mailing_list, addresses=None):
+        """
+        Convert a mailing list model to everything we need for GSuite.
+
+        :param mailing_list: MailingList to convert
+        :param addresses: Email addresses of the list if already resolved, resolved from the database otherwise
+        """
+        if addresses is None:
+            addresses = mailing_list.all_addresses if mailing_list.pk is not None else []
         return GSuiteSyncService.GroupData(
             name=mailing_list.address,
             gsuite_group_name=mailing_list.gsuite_group_name,
@@ -434,7 +687,7 @@ class GSuiteSyncService:
             aliases=(
                 [x.address for x in mailing_list.mailinglistalias_set.all()] if mailing_list.pk is not None else []
             ),
-            addresses=(list(mailing_list.all_addresses) if mailing_list.pk is not None else []),
+            addresses=list(addresses),
         )
 
     def _get_all_lists(self):
@@ -443,30 +696,147 @@ class GSuiteSyncService:
 
         :return: List of all mailing lists as GroupData
         """
-        return [self.mailing_list_to_group(mailinglist) for mailinglist in MailingList.objects.all()]
+        return self.mailing_lists_to_groups(MailingList.objects.all())
+
+    @staticmethod
+    def mailing_lists_to_groups(mailing_lists):
+        """
+        Convert mailing list models to GroupData, resolving the aliases and addresses of all lists at once.
+
+        :param mailing_lists: QuerySet of MailingList
+        :return: List of GroupData
+        """
+        mailing_lists = list(mailing_lists.prefetch_related("mailinglistalias_set"))
+        addresses = resolve_addresses(mailing_list.pk for mailing_list in mailing_lists)
+        return [
+            GSuiteSyncService.mailing_list_to_group(mailing_list, addresses[mailing_list.pk])
+            for mailing_list in mailing_lists
+        ]
 
     def _get_list_names_to_delete(self):
         """
         Get all lists to be deleted that were deleted in Django since the last synchronization.
 
+        Lists of which deleting failed before are only returned once their retry delay has passed.
+
         :return: List of the names of all mailing lists that should be deleted.
         """
         return [
             mailinglist.address
-            for mailinglist in MailingListToBeDeleted.objects.filter(archive_instead_of_delete=False)
+            for mailinglist in MailingListToBeDeleted.objects.filter(
+                Q(next_attempt__isnull=True) | Q(next_attempt__lte=timezone.now()),
+                archive_instead_of_delete=False,
+            )
         ]
 
     def _get_list_names_to_archive(self):
         """
         Get all lists to be archived that were deleted in Django since the last synchronization.
 
+        Lists of which archiving failed before are only returned once their retry delay has passed.
+
         :return: List of the names of all mailing lists that should be archived.
         """
         return [
             mailinglist.address
-            for mailinglist in MailingListToBeDeleted.objects.filter(archive_instead_of_delete=True)
+            for mailinglist in MailingListToBeDeleted.objects.filter(
+                Q(next_attempt__isnull=True) | Q(next_attempt__lte=timezone.now()),
+                archive_instead_of_delete=True,
+            )
         ]
 
+    def _get_synced_fingerprints(self, lists):
+        """
+        Get the fingerprints of the last successful sync of the given lists that are still fresh.
+
+        Fingerprints older than `GSUITE_FINGERPRINT_MAX_AGE` are ignored, so every list is periodically reconciled
+        with GSuite again, undoing changes made directly in the GSuite admin console.
+
+        :param lists: List of GroupData to get the fingerprints for
+        :return: Dictionary of list names to their fingerprint
+        """
+        return dict(
+            MailingList.objects.filter(
+                address__in=[mailinglist.name for mailinglist in lists],
+                gsuite_fingerprint_date__gte=timezone.now() - settings.GSUITE_FINGERPRINT_MAX_AGE,
+            ).values_list("address", "gsuite_fingerprint")
+        )
+
+    def _store_sync_result(self, mailinglist):
+        """
+        Store the GSuite group name and, if the list is fully in sync, the fingerprint of a synced list.
+
+        :param mailinglist: GroupData of the synced list
+        """
+        if mailinglist.name in self.failed_groups:
+            fingerprint, fingerprint_date = None, None
+        else:
+            fingerprint, fingerprint_date = mailinglist.fingerprint, timezone.now()
+
+        MailingList.objects.filter(address=mailinglist.name).update(
+            gsuite_group_name=mailinglist.name,
+            gsuite_fingerprint=fingerprint,
+            gsuite_fingerprint_date=fingerprint_date,
+        )
+
+    def _remove_lists(self, list_names_to_remove, list_names_to_archive, existing_groups, archived_groups):
+        """
+        Delete and archive the lists that were deleted in Django.
+
+        The lists are processed concurrently by the removal executor, as archiving a list removes all its members and
+        aliases. The results are stored in the database by the calling thread: removed lists are no longer marked to
+        be deleted, and lists that could not be removed are retried by a later sync, after a retry delay that doubles
+        with every failed attempt.
+
+        :param list_names_to_remove: Names of the lists to delete
+        :param list_names_to_archive: Names of the lists to archive
+        :param existing_groups: Names of the groups in GSuite with members
+        :param archived_groups: Names of the groups in GSuite without members
+        """
+
+        def remove(batch):
+            ((list_name, archive),) = batch
+            try:
+                if archive and list_name in existing_groups:
+                    logger.debug(f"Starting archive group of {list_name}")
+                    return self.archive_group(list_name)
+                if not archive and (list_name in existing_groups or list_name in archived_groups):
+                    logger.debug(f"Starting delete group of {list_name}")
+                    return self.delete_group(list_name)
+                return True
+            except Exception as e:
+                return e
+
+        lists = [(list_name, False) for list_name in list_names_to_remove] + [
+            (list_name, True) for list_name in list_names_to_archive
+        ]
+        for ((list_name, archive),), result in removal_executor.run_as_completed(lists, remove):
+            if result is True:
+                MailingListToBeDeleted.objects.filter(address=list_name).delete()
+            else:
+                self._postpone_removal(list_name)
+                if isinstance(result, Exception):
+                    self.task_failed(result)
+                elif self.task:
+                    self.task.fail = True
+            self.next_task()
+
+    @staticmethod
+    def _postpone_removal(list_name):
+        """
+        Record a failed attempt to delete or archive a list and postpone the next attempt.
+
+        :param list_name: Name of the list
+        """
+        entry = MailingListToBeDeleted.objects.filter(address=list_name).first()
+        if entry is None:
+            return
+        entry.attempts += 1
+        entry.next_attempt = timezone.now() + min(
+            REMOVAL_RETRY_DELAY * 2 ** (entry.attempts - 1), MAX_REMOVAL_RETRY_DELAY
+        )
+        entry.save()
+
     def next_task(self):
         """Increment completed counter of task if task exists."""
         if self.task:
@@ -480,57 +850,60 @@ class GSuiteSyncService:
             self.task.fail = True
             self.task.save()
 
-    def sync_mailing_lists(self, lists=None):
+    def sync_mailing_lists(self, lists=None, force=False):
         """
         Sync mailing lists with GSuite.
 
         Lists are only deleted if all lists are synced and thus no lists are passed to this function.
+        Existing lists of which the fingerprint did not change since their last sync are skipped, unless forced.
 
         :param lists: optional parameter to determine which lists to sync
+        :param force: optional parameter to also sync lists of which the fingerprint did not change
         """
         logger.info("Starting synchronization with Gsuite.")
+        self._reset_statistics()
         remove_lists = lists is None
         if lists is None:
             lists = self._get_all_lists()
 
         try:
-            groups_response = self.directory_api.groups().list(domain=settings.GSUITE_DOMAIN).execute()
-            groups_list = groups_response.get("groups", [])
-            while "nextPageToken" in groups_response:
-                groups_response = (
-                    self.directory_api.groups()
-                    .list(
-                        domain=settings.GSUITE_DOMAIN,
-                        pageToken=groups_response["nextPageToken"],
-                    )
-                    .execute()
-                )
-                groups_list += groups_response.get("groups", [])
-            existing_groups = [g["name"] for g in groups_list if int(g["directMembersCount"]) > 0]
-            archived_groups = [g["name"] for g in groups_list if g["directMembersCount"] == "0"]
+            existing_groups = set()
+            archived_groups = set()
+            self._listed_aliases = {}
+            for g in self._list_all(
+                self.directory_api.groups().list,
+                "groups",
+                domain=settings.GSUITE_DOMAIN,
+                # nonEditableAliases (aliases in secondary domains) cannot be changed, so they are not requested
+                fields="nextPageToken,groups(email,name,directMembersCount,aliases)",
+            ):
+                self._listed_aliases[g["email"]] = g.get("aliases", [])
+                if int(g["directMembersCount"]) > 0:
+                    existing_groups.add(g["name"])
+                else:
+                    archived_groups.add(g["name"])
         except HttpError:
             logger.exception("Could not get the existing groups")
+            if self.task:
+                # Finish the task, so the progress bar shows the failure
+                self.task.fail = True
+                self.task.total = self.task.completed = 0
+                self.task.save()
             return  # there are no groups or something went wrong
 
         new_groups = [g.gsuite_group_name if g.gsuite_group_name else g.name for g in lists if len(g.addresses) > 0]
 
         list_names_to_remove = self._get_list_names_to_delete()
         list_names_to_archive = self._get_list_names_to_archive()
-        insert_list = [x for x in new_groups if x not in existing_groups]
+        insert_list = {operation.key for operation in reconcile(new_groups, existing_groups).adds}
+        synced_fingerprints = {} if force else self._get_synced_fingerprints(lists)
+        lists_skipped = 0
 
         if self.task:
-            self.task.total = (
-                len(list_names_to_archive)
-                + len(list_names_to_remove)
-                + len(
-                    [
-                        mailinglist.name in insert_list
-                        and mailinglist.name not in archived_groups
-                        or len(mailinglist.addresses) > 0
-                        for mailinglist in lists
-                    ]
-                )
-            )
+            # Progress is made for every list, and for every list to remove if lists are removed
+            self.task.total = len(lists)
+            if remove_lists:
+                self.task.total += len(list_names_to_archive) + len(list_names_to_remove)
             self.task.completed = 0
             self.task.save()
 
@@ -539,52 +912,66 @@ class GSuiteSyncService:
                 if mailinglist.name in insert_list and mailinglist.name not in archived_groups:
                     logger.debug(f"Starting create group of {mailinglist.name}")
                     if self.create_group(mailinglist):
-                        MailingList.objects.filter(address=mailinglist.name).update(gsuite_group_name=mailinglist.name)
+                        self._store_sync_result(mailinglist)
                 elif len(mailinglist.addresses) > 0:
-                    logger.debug(f"Starting update group of {mailinglist.name}")
-                    if self.update_group(
-                        mailinglist.gsuite_group_name if mailinglist.gsuite_group_name else mailinglist.name,
-                        mailinglist,
+                    if (
+                        mailinglist.name in existing_groups
+                        and synced_fingerprints.get(mailinglist.name) == mailinglist.fingerprint
                     ):
-                        MailingList.objects.filter(address=mailinglist.name).update(gsuite_group_name=mailinglist.name)
+                        logger.debug(f"Skipping unchanged group {mailinglist.name}")
+                        lists_skipped += 1
+                    else:
+                        logger.debug(f"Starting update group of {mailinglist.name}")
+                        if self.update_group(
+                            mailinglist.gsuite_group_name if mailinglist.gsuite_group_name else mailinglist.name,
+                            mailinglist,
+                        ):
+                            self._store_sync_result(mailinglist)
             except Exception as e:
                 self.task_failed(e)
             self.next_task()
 
         if remove_lists:
-            for list_name in list_names_to_remove:
-                success = True
-                try:
-                    if list_name in existing_groups or list_name in archived_groups:
-                        logger.debug(f"Starting delete group of {list_name}")
-                        success = self.delete_group(list_name)
-                    if success:
-                        MailingListToBeDeleted.objects.filter(address=list_name).delete()
-                    else:
-                        self.task.fail = True
-                except Exception as e:
-                    self.task_failed(e)
-                self.next_task()
-
-            for list_name in list_names_to_archive:
-                success = True
-                try:
-                    if list_name in existing_groups:
-                        logger.debug(f"Starting archive group of {list_name}")
-                        success = self.archive_group(list_name)
-                    if success:
-                        MailingListToBeDeleted.objects.filter(address=list_name).delete()
-                    else:
-                        self.task.fail = True
-                except Exception as e:
-                    self.task_failed(e)
-                self.next_task()
+            self._remove_lists(list_names_to_remove, list_names_to_archive, existing_groups, archived_groups)
 
+        logger.info(f"Skipped {lists_skipped} unchanged lists.")
+        logger.info(
+            f"API calls throttled: {self.throttled_calls}, retried: {self.retried_calls}, failed: {self.failed_calls}"
+        )
+        for name in sorted(self.operations_succeeded.keys() | self.operations_failed.keys()):
+            logger.info(
+                f"List {name}: {self.operations_succeeded[name]} member and alias changes succeeded, "
+                f"{self.operations_failed[name]} failed"
+            )
+        if self.task:
+            self.task.success_message = (
+                f"Synchronized {len(lists)} mailing lists with GSuite, of which {lists_skipped} were unchanged. "
+                f"{self.throttled_calls} API calls were throttled, {self.retried_calls} were retried after exceeding "
+                f"a quota and {self.failed_calls} failed."
+            )
+            lists_with_failures = sorted(name for name, failed in self.operations_failed.items() if failed)
+            if lists_with_failures:
+                self.task.success_message += (
+                    f" {sum(self.operations_failed.values())} member and alias changes failed for the lists: "
+                    f"{', '.join(lists_with_failures)}."
+                )
+            self.task.save()
+        self._listed_aliases = {}
         logger.info("Synchronization ended.")
 
-    def sync_mailing_lists_as_task(self, lists=None):
-        """Sync all selected mailing lists to GSuite as a Task."""
-        self.task = Task.objects.create(redirect_url=reverse("admin:mailing_lists_mailinglist_changelist"))
-        thread = threading.Thread(target=self.sync_mailing_lists, args=(lists,))
+    def sync_mailing_lists_as_task(self, lists=None, force=False):
+        """
+        Sync mailing lists to GSuite as a Task, in a background thread.
+
+        :param lists: optional parameter to determine which lists to sync, all lists are synced if not specified
+        :param force: optional parameter to also sync lists of which the fingerprint did not change
+        :return: The id of the Task that shows the progress of the sync
+        """
+        self.task = Task.objects.create(
+            total=len(lists) if lists is not None else None,
+            completed=0,
+            redirect_url=reverse("admin:mailing_lists_mailinglist_changelist"),
+        )
+        thread = threading.Thread(target=self.sync_mailing_lists, args=(lists, force))
         thread.start()
         return self.task.id
@@ -0,0 +1,418 @@
+import json
+import re
+import threading
+import uuid
+from collections import Counter
+from email.parser import BytesFeedParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from time import monotonic
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from googleapiclient.discovery import build_from_document
+
+from httplib2 import Http
+
+from mailing_lists.gsuite import DIRECTORY_PAGE_SIZE, client_factory
+
+DIRECTORY_PREFIX = "/admin/directory/v1/groups"
+GROUPS_SETTINGS_PREFIX = "/groups/v1/groups/"
+
+STATUS_REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    409: "Conflict",
+}
+
+
+class StandInError(Exception):
+    """An error response of the stand-in server."""
+
+    def __init__(self, status, message, reason):
+        """
+        Create an error response.
+
+        :param status: HTTP status code of the response
+        :param message: Human readable error message
+        :param reason: Google API error reason, e.g. "notFound"
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.reason = reason
+
+    def body(self):
+        """Get the body of the error response in the format of Google APIs."""
+        return {
+            "error": {
+                "code": self.status,
+                "message": self.message,
+                "errors": [{"message": self.message, "domain": "global", "reason": self.reason}],
+            }
+        }
+
+
+def filter_fields(data, fields):
+    """
+    Apply a partial response selector to a response, e.g. "nextPageToken,groups(email,name)".
+
+    :param data: The (dictionary) response
+    :param fields: The fields selector, nested selections of list items are put between parentheses
+    :return: The response with only the selected fields
+    """
+    selected = {}
+    depth = 0
+    start = 0
+    for i, char in enumerate(fields + ","):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            field = fields[start:i].strip()
+            start = i + 1
+            name, _, nested = field.partition("(")
+            if name not in data:
+                continue
+            if nested:
+                nested = nested[:-1]
+                value = data[name]
+                if isinstance(value, list):
+                    selected[name] = [filter_fields(item, nested) for item in value]
+                else:
+                    selected[name] = filter_fields(value, nested)
+            else:
+                selected[name] = data[name]
+    return selected
+
+
+class GSuiteStandIn:
+    """
+    Local HTTP stand-in for the parts of the Directory and Groups Settings APIs used by the GSuite sync.
+
+    The stand-in keeps groups, members, aliases and group settings in memory and implements pagination, partial
+    responses, batch requests, the propagation delay of new groups in the Groups Settings API and (randomly injected)
+    quota errors. It counts the HTTP round trips, the requests in batches and the transferred bytes, so the number of
+    API calls and the efficiency of a sync can be measured without a GSuite domain.
+    """
+
+    def __init__(self, domain, propagation_delay=0, quota_error_rate=0, seed=None, clock=monotonic):
+        """
+        Create a stand-in with an empty domain, the server is started by `start`.
+
+        :param domain: The domain of the groups
+        :param propagation_delay: Seconds after creating a group until it is known by the Groups Settings API
+        :param quota_error_rate: Fraction of the requests that fail because a quota is exceeded
+        :param seed: Seed of the random quota errors
+        :param clock: Function returning the current time in seconds, used for the propagation delay
+        """
+        self.domain = domain
+        self.propagation_delay = propagation_delay
+        self.quota_error_rate = quota_error_rate
+        self.random = Random(seed)
+        self.clock = clock
+        self.groups = {}
+        self.statistics = Counter()
+        self.lock = threading.Lock()
+        self.statistics_lock = threading.Lock()
+        self.server = None
+
+    def __enter__(self):
+        """Start the server."""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop the server."""
+        self.stop()
+
+    def start(self):
+        """Start the server on a free local port in a background thread."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self):
+        """Get the root URL of the server."""
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/"
+
+    def _client(self, service_name, version):
+        """Build an API client from the bundled discovery document that sends its requests to the stand-in."""
+        document = json.loads(client_factory.discovery_document(service_name, version))
+        document["rootUrl"] = self.url
+        return build_from_document(document, http=Http())
+
+    def directory_api(self):
+        """Create a Directory API client for the stand-in."""
+        return self._client("admin", "directory_v1")
+
+    def groups_settings_api(self):
+        """Create a Groups Settings API client for the stand-in."""
+        return self._client("groupssettings", "v1")
+
+    def add_group(self, name, members=(), aliases=(), settings=None):
+        """
+        Add an existing group to the domain.
+
+        :param name: Name of the group, the email address is the name at the domain
+        :param members: Email addresses of the members of the group
+        :param aliases: Names of the aliases of the group
+        :param settings: The group settings
+        :return: The group
+        """
+        group = {
+            "id": uuid.uuid4().hex,
+            "email": f"{name}@{self.domain}",
+            "name": name,
+            "description": "",
+            "aliases": [f"{alias}@{self.domain}" for alias in aliases],
+            "members": {email: "MEMBER" for email in members},
+            "settings": dict(settings or {}),
+            "created": self.clock() - self.propagation_delay,
+        }
+        self.groups[group["id"]] = group
+        return group
+
+    def get_group(self, group_key):
+        """
+        Get a group by its id, email address or one of its aliases.
+
+        :param group_key: The id, email address or alias of the group
+        :return: The group, or None if the group does not exist
+        """
+        if group_key in self.groups:
+            return self.groups[group_key]
+        for group in self.groups.values():
+            if group["email"] == group_key or group_key in group["aliases"]:
+                return group
+        return None
+
+    def count(self, statistic, n=1):
+        """Increment a statistic of the stand-in."""
+        with self.statistics_lock:
+            self.statistics[statistic] += n
+
+    def _group_or_404(self, group_key):
+        group = self.get_group(group_key)
+        if group is None:
+            raise StandInError(404, "Resource Not Found: groupKey", "notFound")
+        return group
+
+    @staticmethod
+    def _group_resource(group):
+        return {
+            "kind": "admin#directory#group",
+            "id": group["id"],
+            "email": group["email"],
+            "name": group["name"],
+            "description": group["description"],
+            "directMembersCount": str(len(group["members"])),
+            "aliases": list(group["aliases"]),
+        }
+
+    @staticmethod
+    def _page(items, query, key):
+        """Get a page of the items, based on the maxResults and pageToken parameters."""
+        page_size = min(int(query.get("maxResults", DIRECTORY_PAGE_SIZE)), DIRECTORY_PAGE_SIZE)
+        start = int(query.get("pageToken", 0))
+        response = {key: items[start : start + page_size]}
+        if start + page_size < len(items):
+            response["nextPageToken"] = str(start + page_size)
+        return response
+
+    def handle(self, method, path, query, body):
+        """
+        Handle a single (not batched) API request.
+
+        :param method: HTTP method of the request
+        :param path: Path of the request
+        :param query: Dictionary of query parameters
+        :param body: Parsed JSON body of the request, or None
+        :return: Tuple of the status code and the response body (None for empty responses)
+        """
+        if self.quota_error_rate and self.random.random() < self.quota_error_rate:
+            self.count("quota_errors")
+            raise StandInError(403, "Rate Limit Exceeded", "rateLimitExceeded")
+
+        with self.lock:
+            if path.startswith(GROUPS_SETTINGS_PREFIX):
+                response = self._handle_groups_settings(method, unquote(path[len(GROUPS_SETTINGS_PREFIX) :]), body)
+            elif path.startswith(DIRECTORY_PREFIX):
+                response = self._handle_directory(method, path[len(DIRECTORY_PREFIX) :].strip("/"), query, body)
+            else:
+                raise StandInError(404, f"Unknown path {path}", "notFound")
+
+        if response is None:
+            return 204, None
+        if "fields" in query:
+            response = filter_fields(response, query["fields"])
+        return 200, response
+
+    def _handle_groups_settings(self, method, group_key, body):
+        group = self._group_or_404(group_key)
+        if self.clock() - group["created"] < self.propagation_delay:
+            self.count("propagation_errors")
+            raise StandInError(404, "Resource Not Found: groupUniqueId", "notFound")
+        if method == "PUT":
+            group["settings"] = dict(body)
+        elif method == "PATCH":
+            group["settings"].update(body)
+        elif method != "GET":
+            raise StandInError(400, f"Unsupported method {method}", "badRequest")
+        return {"kind": "groupsSettings#groups", "email": group["email"], **group["settings"]}
+
+    def _handle_directory(self, method, path, query, body):
+        parts = [unquote(part) for part in path.split("/")] if path else []
+
+        if not parts:
+            if method == "GET":
+                groups = [
+                    self._group_resource(group)
+                    for group in sorted(self.groups.values(), key=lambda group: group["email"])
+                    if group["email"].endswith(f"@{query.get('domain', self.domain)}")
+                ]
+                return self._page(groups, query, "groups")
+            if method == "POST":
+                if self.get_group(body["email"]) is not None:
+                    raise StandInError(409, "Entity already exists.", "duplicate")
+                group = self.add_group(body["email"].split("@")[0])
+                group["name"] = body.get("name", group["name"])
+                group["description"] = body.get("description", "")
+                group["created"] = self.clock()
+                return self._group_resource(group)
+            raise StandInError(400, f"Unsupported request {method} {path}", "badRequest")
+
+        group = self._group_or_404(parts[0])
+
+        if len(parts) == 1:
+            if method == "GET":
+                return self._group_resource(group)
+            if method in ("PUT", "PATCH"):
+                if body.get("email", group["email"]) != group["email"]:
+                    group["aliases"].append(group["email"])
+                    group["email"] = body["email"]
+                group["name"] = body.get("name", group["name"])
+                group["description"] = body.get("description", group["description"])
+                return self._group_resource(group)
+            if method == "DELETE":
+                del self.groups[group["id"]]
+                return None
+
+        if len(parts) > 1 and parts[1] == "members":
+            if len(parts) == 2 and method == "GET":
+                members = [
+                    {"kind": "admin#directory#member", "email": email, "role": role, "type": "USER"}
+                    for email, role in sorted(group["members"].items())
+                ]
+                return self._page(members, query, "members")
+            if len(parts) == 2 and method == "POST":
+                if body["email"] in group["members"]:
+                    raise StandInError(409, "Member already exists.", "duplicate")
+                group["members"][body["email"]] = body.get("role", "MEMBER")
+                return {"kind": "admin#directory#member", **body}
+            if len(parts) == 3 and method == "DELETE":
+                if group["members"].pop(parts[2], None) is None:
+                    raise StandInError(404, "Resource Not Found: memberKey", "notFound")
+                return None
+
+        if len(parts) > 1 and parts[1] == "aliases":
+            if len(parts) == 2 and method == "GET":
+                return {"aliases": [{"alias": alias, "primaryEmail": group["email"]} for alias in group["aliases"]]}
+            if len(parts) == 2 and method == "POST":
+                if self.get_group(body["alias"]) is not None:
+                    raise StandInError(409, "Entity already exists.", "duplicate")
+                group["aliases"].append(body["alias"])
+                return {"alias": body["alias"], "primaryEmail": group["email"]}
+            if len(parts) == 3 and method == "DELETE":
+                if parts[2] not in group["aliases"]:
+                    raise StandInError(404, "Resource Not Found: alias", "notFound")
+                group["aliases"].remove(parts[2])
+                return None
+
+        raise StandInError(400, f"Unsupported request {method} {path}", "badRequest")
+
+    def handle_batch(self, content_type, body):
+        """
+        Handle a multipart batch request by handling every part as a single request.
+
+        :param content_type: Content type of the batch request, including the boundary
+        :param body: Body of the batch request
+        :return: Tuple of the content type and the body of the multipart batch response
+        """
+        parser = BytesFeedParser()
+        parser.feed(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = uuid.uuid4().hex
+        response = []
+
+        for part in parser.close().get_payload():
+            self.count("batched_requests")
+            request_line, _, rest = part.get_payload().replace("\r\n", "\n").partition("\n")
+            method, url, _ = request_line.split(" ", 2)
+            _, _, request_body = rest.partition("\n\n")
+            status, response_body = self._respond(method, url, request_body.encode())
+            content = json.dumps(response_body) if response_body is not None else ""
+            content_id = re.sub(r"^<", "<response-", part["Content-ID"])
+            response.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{content}\r\n"
+            )
+
+        response.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(response).encode()
+
+    def _respond(self, method, url, body):
+        """Handle a single request and turn errors into error responses."""
+        url = urlsplit(url)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            return self.handle(method, url.path, query, json.loads(body) if body.strip() else None)
+        except StandInError as e:
+            return e.status, e.body()
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, StandInError(400, f"Invalid request: {e}", "invalid").body()
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                standin.count("requests")
+                standin.count("bytes_received", len(body))
+
+                if self.command == "POST" and urlsplit(self.path).path.startswith("/batch"):
+                    standin.count("batch_requests")
+                    status = 200
+                    content_type, content = standin.handle_batch(self.headers["Content-Type"], body)
+                else:
+                    status, response_body = standin._respond(self.command, self.path, body)
+                    content_type = "application/json; charset=UTF-8"
+                    content = json.dumps(response_body).encode() if response_body is not None else b""
+
+                standin.count("bytes_sent", len(content))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,163 @@
+import logging
+from random import Random
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mailing_lists import gsuite, throttling
+from mailing_lists.gsuite import GSuiteSyncService
+from mailing_lists.gsuite_standin import GSuiteStandIn
+
+
+class SimulatedClock:
+    """Clock that advances when slept on instead of waiting, to simulate backoff and rate limiting."""
+
+    def __init__(self):
+        """Create a clock that has not slept yet."""
+        self.slept = 0.0
+
+    def time(self):
+        """Get the current time, including the time slept."""
+        return monotonic() + self.slept
+
+    def sleep(self, seconds):
+        """Advance the clock instead of sleeping."""
+        self.slept += seconds
+
+
+class Command(BaseCommand):
+    """Command to benchmark the mailing list sync against a local GSuite stand-in."""
+
+    help = "Benchmark the GSuite sync against a local stand-in of the Directory and Groups Settings APIs"
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument("--lists", type=int, default=500, help="Number of generated mailing lists")
+        parser.add_argument("--members", type=int, default=20000, help="Total number of generated list memberships")
+        parser.add_argument("--aliases", type=int, default=1, help="Number of aliases per list")
+        parser.add_argument(
+            "--churn", type=float, default=0.1, help="Fraction of the memberships that changes before the last sync"
+        )
+        parser.add_argument(
+            "--propagation-delay",
+            type=float,
+            default=0,
+            help="Seconds until a new group is known by the Groups Settings API",
+        )
+        parser.add_argument(
+            "--quota-error-rate", type=float, default=0, help="Fraction of the requests that exceed a quota"
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated domain and errors")
+        parser.add_argument(
+            "--simulate-waits",
+            action="store_true",
+            help="Do not sleep for backoff and rate limiting, but report the time that would have been waited",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark scenarios and report their statistics."""
+        if options["verbosity"] < 2:
+            logging.getLogger("gsuitesync").setLevel(logging.WARNING)
+
+        random = Random(options["seed"])
+        lists = self.generate_lists(random, options["lists"], options["members"], options["aliases"])
+        changed_lists = self.change_members(random, lists, options["churn"])
+
+        clock = SimulatedClock() if options["simulate_waits"] else None
+
+        with GSuiteStandIn(
+            settings.GSUITE_DOMAIN,
+            propagation_delay=options["propagation_delay"],
+            quota_error_rate=options["quota_error_rate"],
+            seed=options["seed"],
+            clock=clock.time if clock else monotonic,
+        ) as standin:
+            sync = GSuiteSyncService(
+                groups_settings_api=standin.groups_settings_api(), directory_api=standin.directory_api()
+            )
+
+            for scenario, scenario_lists in (
+                ("Initial sync", lists),
+                ("Unchanged resync", lists),
+                (f"Resync after {options['churn']:.0%} churn", changed_lists),
+            ):
+                self.run_scenario(scenario, sync, standin, scenario_lists, clock)
+
+    @staticmethod
+    def generate_lists(random, number_of_lists, number_of_members, number_of_aliases):
+        """
+        Generate GroupData for a domain, the memberships are spread evenly over the lists.
+
+        :return: List of GroupData
+        """
+        members_per_list = number_of_members // max(number_of_lists, 1)
+        users = [f"user{i}@example.org" for i in range(max(number_of_members // 4, members_per_list))]
+        return [
+            GSuiteSyncService.GroupData(
+                name=f"benchmark-list-{i}",
+                description=f"Benchmark list {i}",
+                aliases=[f"benchmark-alias-{i}-{j}" for j in range(number_of_aliases)],
+                addresses=random.sample(users, members_per_list),
+            )
+            for i in range(number_of_lists)
+        ]
+
+    @staticmethod
+    def change_members(random, lists, churn):
+        """
+        Replace a fraction of the members of every list.
+
+        :return: List of changed GroupData
+        """
+        changed_lists = []
+        for group in lists:
+            addresses = list(group.addresses)
+            for i in random.sample(range(len(addresses)), round(len(addresses) * churn)):
+                addresses[i] = f"new-{addresses[i]}"
+            changed_lists.append(
+                GSuiteSyncService.GroupData(
+                    name=group.name, description=group.description, aliases=group.aliases, addresses=addresses
+                )
+            )
+        return changed_lists
+
+    def run_scenario(self, scenario, sync, standin, lists, clock=None):
+        """
+        Sync the lists with the stand-in and report the statistics of the sync.
+
+        If a SimulatedClock is given, the sync and its rate limiters use it instead of sleeping.
+        """
+        standin.statistics.clear()
+        original_clock = gsuite.sleep, throttling.sleep, throttling.monotonic
+        if clock is not None:
+            slept = clock.slept
+            gsuite.sleep = throttling.sleep = clock.sleep
+            throttling.monotonic = clock.time
+
+        try:
+            start = perf_counter()
+            sync.sync_mailing_lists(lists=lists, force=True)
+            duration = perf_counter() - start
+        finally:
+            gsuite.sleep, throttling.sleep, throttling.monotonic = original_clock
+
+        statistics = standin.statistics
+        batch_capacity = statistics["batch_requests"] * gsuite.batch_executor.batch_size
+        fill_ratio = statistics["batched_requests"] / batch_capacity if batch_capacity else 0
+
+        self.stdout.write(f"{scenario} ({len(lists)} lists, {sum(len(g.addresses) for g in lists)} members)")
+        self.stdout.write(f"  Wall time:          {duration:.2f} s")
+        if clock is not None:
+            self.stdout.write(f"  Simulated waits:    {clock.slept - slept:.2f} s")
+        self.stdout.write(f"  HTTP requests:      {statistics['requests']}")
+        self.stdout.write(f"  Batch requests:     {statistics['batch_requests']}")
+        self.stdout.write(f"  Requests in batches: {statistics['batched_requests']}")
+        self.stdout.write(f"  Batch fill ratio:   {fill_ratio:.1%}")
+        self.stdout.write(f"  Bytes sent:         {statistics['bytes_received']}")
+        self.stdout.write(f"  Bytes received:     {statistics['bytes_sent']}")
+        self.stdout.write(
+            f"  Quota errors:       {statistics['quota_errors']} "
+            f"(throttled {sync.throttled_calls}, retried {sync.retried_calls}, failed {sync.failed_calls})"
+        )
+        self.stdout.write(f"  Propagation errors: {statistics['propagation_errors']}")
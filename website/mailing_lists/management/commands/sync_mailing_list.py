@@ -8,7 +8,15 @@ class Command(BaseCommand):
 
     help = "Run the GSuite sync"
 
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Also sync lists that did not change since their last sync",
+        )
+
     def handle(self, *args, **options):
         """Run mailing list sync."""
         sync = GSuiteSyncService()
-        sync.sync_mailing_lists()
+        sync.sync_mailing_lists(force=options["force"])
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mailing_lists", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mailinglist",
+            name="gsuite_fingerprint",
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="mailinglist",
+            name="gsuite_fingerprint_date",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
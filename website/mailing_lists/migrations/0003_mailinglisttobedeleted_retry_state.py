@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mailing_lists", "0002_mailinglist_gsuite_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mailinglisttobedeleted",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="mailinglisttobedeleted",
+            name="next_attempt",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
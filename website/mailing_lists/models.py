@@ -1,7 +1,10 @@
+from collections import defaultdict
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Q
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 
@@ -34,6 +37,8 @@ class MailingList(models.Model):
     archive_instead_of_delete = models.BooleanField(
         verbose_name="Archive instead of deleting from Gsuite", default=True
     )
+    gsuite_fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
+    gsuite_fingerprint_date = models.DateTimeField(blank=True, null=True, editable=False)
 
     def validate_unique(self, exclude=None):
         """Validate uniqueness of the mailing list email address."""
@@ -58,37 +63,62 @@ class MailingList(models.Model):
     @property
     def all_addresses(self):
         """Return all email addresses that are in the mailing list."""
-        course_emails = []
-        for course_semester_link in self.mailinglistcoursesemesterlink_set.all():
-            course_emails += course_semester_link.email_addresses
-
-        project_emails = []
-        for project in self.projects.all():
-            for employee in project.get_employees():
-                project_emails.append(employee.email)
-
-        user_emails = []
-        for user in self.users.all():
-            user_emails.append(user.email)
-
-        extra_emails = []
-        for extra in self.extraemailaddress_set.all():
-            extra_emails.append(extra.address)
-
-        return set(course_emails + project_emails + user_emails + extra_emails)
+        return resolve_addresses([self.pk])[self.pk]
 
     @property
     def mailinglist_aliases(self):
-        """Return the alias of a mailinglist."""
-        aliaslist = [
-            str(i) for i in MailingListAlias.objects.filter(mailing_list=self).values_list("address", flat=True)
-        ]
+        """Return the alias of a mailinglist, using prefetched aliases if available."""
+        aliaslist = [alias.address for alias in self.mailinglistalias_set.all()]
         if aliaslist:
             return ", ".join(aliaslist)
         else:
             return "-"
 
 
+def resolve_addresses(mailing_list_ids):
+    """
+    Get all email addresses that are in the given mailing lists.
+
+    The addresses of the course semesters, projects, users and extra email addresses of all lists are resolved with a
+    constant number of queries, independent of the number of lists.
+
+    :param mailing_list_ids: Iterable of ids of mailing lists
+    :return: Dictionary of mailing list ids to the set of email addresses in that list
+    """
+    mailing_list_ids = list(mailing_list_ids)
+    addresses = defaultdict(set)
+
+    links = defaultdict(list)
+    for mailing_list_id, course_id, semester_id in MailingListCourseSemesterLink.objects.filter(
+        mailing_list__in=mailing_list_ids
+    ).values_list("mailing_list", "course", "semester"):
+        links[(course_id, semester_id)].append(mailing_list_id)
+    if links:
+        condition = Q(pk__in=[])
+        for course_id, semester_id in links:
+            condition |= Q(course=course_id, semester=semester_id)
+        for course_id, semester_id, email in Registration.objects.filter(condition).values_list(
+            "course", "semester", "user__email"
+        ):
+            for mailing_list_id in links[(course_id, semester_id)]:
+                addresses[mailing_list_id].add(email)
+
+    related_addresses = (
+        MailingList.projects.through.objects.filter(
+            mailinglist__in=mailing_list_ids, project__registration__isnull=False
+        ).values_list("mailinglist", "project__registration__user__email"),
+        MailingList.users.through.objects.filter(mailinglist__in=mailing_list_ids).values_list(
+            "mailinglist", "employee__email"
+        ),
+        ExtraEmailAddress.objects.filter(mailing_list__in=mailing_list_ids).values_list("mailing_list", "address"),
+    )
+    for queryset in related_addresses:
+        for mailing_list_id, email in queryset:
+            addresses[mailing_list_id].add(email)
+
+    return addresses
+
+
 class MailingListToBeDeleted(models.Model):
     """A mailing list that has been deleted in Django and must be deleted or archived in Gsuite in the future."""
 
@@ -98,6 +128,8 @@ class MailingListToBeDeleted(models.Model):
 
     address = models.CharField(max_length=60, primary_key=True)
     archive_instead_of_delete = models.BooleanField(default=True)
+    attempts = models.PositiveIntegerField(default=0, editable=False)
+    next_attempt = models.DateTimeField(blank=True, null=True, editable=False)
 
 
 @receiver(pre_delete, sender=MailingList)
@@ -186,15 +218,6 @@ class MailingListCourseSemesterLink(models.Model):
             )
         ]
 
-    @property
-    def email_addresses(self):
-        """Get all email adresses of people in the Course in the Semester."""
-        return (
-            Registration.objects.filter(course=self.course, semester=self.semester)
-            .select_related("user")
-            .values_list("user__email", flat=True)
-        )
-
     def __str__(self):
         """Show mailing list link to course and semester."""
         return f"connect {self.mailing_list} to {self.course} in {self.semester}"
@@ -2,18 +2,20 @@ from unittest.mock import MagicMock, patch
 
 from django.contrib.admin import AdminSite
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from courses.models import Semester
+from courses.models import Course, Semester
 
 from mailing_lists.admin import CourseSemesterLinkInline, MailingListAdmin
 from mailing_lists.forms import MailingListAdminForm
-from mailing_lists.models import MailingList
+from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias
 
 from projects.models import Project
 
-from registrations.models import Employee
+from registrations.models import Employee, Registration
 
 User: Employee = get_user_model()
 
@@ -55,6 +57,7 @@ class MailingListAdminTest(TestCase):
         cls.user = User.objects.create(github_id=2, github_username="BobJones")
 
         cls.semester = Semester.objects.create(year=2020, season=Semester.SPRING)
+        cls.course = Course.objects.create(name="SE")
 
         cls.project = Project.objects.create(name="test", semester=cls.semester)
 
@@ -77,12 +80,50 @@ class MailingListAdminTest(TestCase):
     @patch("mailing_lists.admin.GSuiteSyncService")
     def test_synchronize_selected_mailing_lists_calls_ok(self, gsuite_sync_service):
         mock_instance = MagicMock()
+        mock_instance.sync_mailing_lists_as_task.return_value = 1
         gsuite_sync_service.return_value = mock_instance
         mailing_list_admin = MailingListAdmin(MailingList, AdminSite)
-        mailing_list_admin.synchronize_selected_mailing_lists(
-            self.request, [MailingList.objects.create(address="test")]
+        queryset = MailingList.objects.filter(pk=MailingList.objects.create(address="test").pk)
+        response = mailing_list_admin.synchronize_selected_mailing_lists(self.request, queryset)
+        mock_instance.mailing_lists_to_groups.assert_called_once_with(queryset)
+        mock_instance.sync_mailing_lists_as_task.assert_called_once_with(
+            mock_instance.mailing_lists_to_groups(), force=True
         )
-        mock_instance.sync_mailing_lists.assert_called_once()
+        mock_instance.sync_mailing_lists.assert_not_called()
+        self.assertEqual(response.url, reverse("admin:progress_bar", kwargs={"task": 1}))
+
+    def create_lists(self, number):
+        for i in range(number):
+            mailing_list = MailingList.objects.create(address=f"list{number}-{i}")
+            MailingListAlias.objects.create(address=f"alias{number}-{i}", mailing_list=mailing_list)
+            ExtraEmailAddress.objects.create(address=f"{i}@example.org", name="Extra", mailing_list=mailing_list)
+            mailing_list.users.add(self.user)
+
+    def test_changelist_constant_queries(self):
+        url = reverse("admin:mailing_lists_mailinglist_changelist")
+        self.create_lists(2)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "alias2-1")
+
+        self.create_lists(10)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, "alias10-9")
+        self.assertContains(response, '<td class="field-member_count">2</td>', html=True, count=12)
+
+    def test_change_form_only_renders_selected_users(self):
+        semester = Semester.objects.get_or_create_current_semester()
+        for i in range(5):
+            user = User.objects.create(github_id=100 + i, github_username=f"user{i}", first_name=f"user{i}")
+            Registration.objects.create(user=user, semester=semester, course=self.course, experience=1)
+        self.mailinglist.users.add(user)
+
+        response = self.client.get(reverse("admin:mailing_lists_mailinglist_change", args=(self.mailinglist.id,)))
+
+        self.assertContains(response, "user4")
+        self.assertNotContains(response, "user3")
 
     def test_get_form(self):
         response = self.client.get(reverse("admin:mailing_lists_mailinglist_change", args=(self.mailinglist.id,)))
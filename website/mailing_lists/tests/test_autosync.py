@@ -0,0 +1,215 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from courses.models import Course, Semester
+
+from mailing_lists.autosync import AutoSyncQueue, mailing_lists_of_registrations, queue_mailing_lists
+from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias, MailingListCourseSemesterLink
+
+from projects.models import Project
+
+from registrations.models import Employee, Registration
+
+
+@override_settings(GSUITE_AUTO_SYNC_DELAY=10)
+@patch("mailing_lists.autosync.queue")
+class AutoSyncSignalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(year=2020, season=Semester.SPRING)
+        cls.course = Course.objects.create(name="SE")
+        cls.project = Project.objects.create(name="test", slug="test", semester=cls.semester)
+        cls.other_project = Project.objects.create(name="other", slug="other", semester=cls.semester)
+        cls.user = Employee.objects.create(github_id=1, github_username="user", email="user@example.org")
+
+        cls.unrelated_list = MailingList.objects.create(address="unrelated")
+        cls.project_list = MailingList.objects.create(address="project")
+        cls.project_list.projects.add(cls.project)
+        cls.other_project_list = MailingList.objects.create(address="other-project")
+        cls.other_project_list.projects.add(cls.other_project)
+        cls.course_list = MailingList.objects.create(address="course")
+        MailingListCourseSemesterLink.objects.create(
+            mailing_list=cls.course_list, course=cls.course, semester=cls.semester
+        )
+
+    def queued(self, queue):
+        return {mailing_list_id for call in queue.add.call_args_list for mailing_list_id in call.args[0]}
+
+    def create_registration(self, project=None):
+        return Registration.objects.create(
+            user=self.user, project=project, course=self.course, semester=self.semester, experience=1
+        )
+
+    def test_mailing_lists_of_registrations(self, queue):
+        self.assertEqual(
+            mailing_lists_of_registrations([(self.project.id, self.course.id, self.semester.id)]),
+            {self.project_list.id, self.course_list.id},
+        )
+        self.assertEqual(
+            mailing_lists_of_registrations([(None, self.course.id, Semester.objects.create(year=2021).id)]), set()
+        )
+
+    def test_registration_created(self, queue):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_registration(self.project)
+
+        self.assertEqual(self.queued(queue), {self.project_list.id, self.course_list.id})
+
+    def test_registration_project_changed(self, queue):
+        registration = self.create_registration(self.project)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.project = self.other_project
+            registration.save()
+
+        self.assertEqual(self.queued(queue), {self.project_list.id, self.other_project_list.id, self.course_list.id})
+
+    def test_registration_unchanged(self, queue):
+        registration = self.create_registration(self.project)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.comments = "Comment"
+            registration.save()
+
+        queue.add.assert_not_called()
+
+    def test_registration_deleted(self, queue):
+        registration = self.create_registration(self.project)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.delete()
+
+        self.assertEqual(self.queued(queue), {self.project_list.id, self.course_list.id})
+
+    def test_users_changed(self, queue):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unrelated_list.users.add(self.user)
+        self.assertEqual(self.queued(queue), {self.unrelated_list.id})
+
+        queue.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.mailinglist_set.clear()
+        self.assertEqual(self.queued(queue), {self.unrelated_list.id})
+
+    def test_projects_changed(self, queue):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.mailinglist_set.add(self.unrelated_list)
+        self.assertEqual(self.queued(queue), {self.unrelated_list.id})
+
+        queue.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.mailinglist_set.clear()
+        self.assertEqual(self.queued(queue), {self.unrelated_list.id, self.project_list.id})
+
+        queue.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_project_list.projects.clear()
+        self.assertEqual(self.queued(queue), {self.other_project_list.id})
+
+    def test_mailing_list_related_objects_changed(self, queue):
+        with self.captureOnCommitCallbacks(execute=True):
+            extra = ExtraEmailAddress.objects.create(
+                address="a@example.org", name="A", mailing_list=self.unrelated_list
+            )
+            MailingListAlias.objects.create(address="alias", mailing_list=self.project_list)
+            extra.delete()
+
+        self.assertEqual(self.queued(queue), {self.unrelated_list.id, self.project_list.id})
+
+    def test_nothing_changed(self, queue):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            queue_mailing_lists([])
+
+        self.assertEqual(callbacks, [])
+        queue.add.assert_not_called()
+
+    def test_not_committed(self, queue):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.unrelated_list.users.add(self.user)
+
+        queue.add.assert_not_called()
+
+    @override_settings(GSUITE_AUTO_SYNC_DELAY=None)
+    def test_disabled(self, queue):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_registration(self.project)
+            self.unrelated_list.users.add(self.user)
+
+        queue.add.assert_not_called()
+
+
+@override_settings(GSUITE_AUTO_SYNC_DELAY=10)
+class AutoSyncQueueTest(TestCase):
+    @patch("mailing_lists.autosync.threading.Timer")
+    def test_add_debounces(self, timer):
+        queue = AutoSyncQueue()
+
+        queue.add([1, 2])
+        queue.add([2, 3])
+
+        timer.assert_called_once_with(10, queue._run)
+        self.assertEqual(queue.pending, {1, 2, 3})
+
+    @patch("mailing_lists.autosync.threading.Timer")
+    def test_flush(self, timer):
+        queue = AutoSyncQueue()
+        queue.sync = MagicMock(side_effect=lambda mailing_list_ids: queue.add([4]))
+
+        queue.add([1, 2])
+        queue.flush()
+
+        queue.sync.assert_called_once_with({1, 2})
+        self.assertEqual(queue.pending, {4})
+        self.assertEqual(timer.call_count, 2)
+        self.assertFalse(queue.running)
+
+    @patch("mailing_lists.autosync.connection")
+    @patch("mailing_lists.autosync.threading.Timer")
+    def test_timer_fired(self, timer, connection):
+        queue = AutoSyncQueue()
+        queue.sync = MagicMock()
+
+        queue.add([1])
+        timer.call_args.args[1]()
+
+        queue.sync.assert_called_once_with({1})
+        connection.close.assert_called_once()
+        self.assertIsNone(queue.timer)
+
+    def test_flush_empty(self):
+        queue = AutoSyncQueue()
+        queue.sync = MagicMock()
+
+        queue.flush()
+
+        queue.sync.assert_not_called()
+        self.assertIsNone(queue.timer)
+
+    @patch("mailing_lists.autosync.logger")
+    @patch("mailing_lists.autosync.threading.Timer")
+    def test_flush_failure(self, timer, logger):
+        queue = AutoSyncQueue()
+        queue.sync = MagicMock(side_effect=Exception("Oh no!"))
+
+        queue.add([1])
+        queue.flush()
+
+        logger.exception.assert_called_once()
+        self.assertFalse(queue.running)
+        self.assertEqual(timer.call_count, 1)
+
+    @patch("mailing_lists.autosync.GSuiteSyncService")
+    def test_sync(self, gsuite_sync_service):
+        mailing_list = MailingList.objects.create(address="test")
+        sync = gsuite_sync_service.return_value
+
+        AutoSyncQueue.sync({mailing_list.id, mailing_list.id + 1})
+
+        self.assertEqual(list(sync.mailing_lists_to_groups.call_args.args[0]), [mailing_list])
+        sync.sync_mailing_lists.assert_called_once_with(lists=sync.mailing_lists_to_groups.return_value)
+
+        sync.reset_mock()
+        sync.mailing_lists_to_groups.return_value = []
+        AutoSyncQueue.sync({mailing_list.id + 1})
+        sync.sync_mailing_lists.assert_not_called()
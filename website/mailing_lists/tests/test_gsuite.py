@@ -17,30 +17,74 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import os
+import threading
+from datetime import timedelta
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, patch
 
 from django.conf import settings
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 
 from googleapiclient.errors import HttpError
 
 from httplib2 import Response
 
+from giphousewebsite.reconciler import Action, Executor, Operation
+
 from mailing_lists import gsuite
-from mailing_lists.gsuite import GSuiteSyncService, MemoryCache
-from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias
+from mailing_lists.gsuite import GSuiteClientFactory, GSuiteSyncService
+from mailing_lists.models import ExtraEmailAddress, MailingList, MailingListAlias, MailingListToBeDeleted
 
 from tasks.models import Task
 
 
-class MemoryCacheTestCase(TestCase):
-    def test_memory_cache(self):
-        mc = MemoryCache()
+class GSuiteClientFactoryTestCase(TestCase):
+    @patch("google.oauth2.service_account.Credentials.from_service_account_info")
+    def test_credentials(self, from_service_account_info):
+        factory = GSuiteClientFactory()
+
+        self.assertIs(factory.credentials, factory.credentials)
+        from_service_account_info.assert_called_once()
+
+    def test_discovery_document(self):
+        factory = GSuiteClientFactory()
+
+        with self.subTest("Bundled"):
+            document = factory.discovery_document("admin", "directory_v1")
+            self.assertIn('"name": "admin"', document)
+            self.assertIs(factory.discovery_document("admin", "directory_v1"), document)
+
+        with self.subTest("On disk"), TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "groupssettings.v1.json"), "w") as f:
+                f.write("{}")
+
+            with self.settings(GSUITE_DISCOVERY_DOCUMENTS_DIR=directory):
+                self.assertEqual(factory.discovery_document("groupssettings", "v1"), "{}")
+                self.assertIn('"name": "admin"', GSuiteClientFactory().discovery_document("admin", "directory_v1"))
+
+    @patch("mailing_lists.gsuite.AuthorizedHttp")
+    @patch("mailing_lists.gsuite.build_from_document")
+    @patch("google.oauth2.service_account.Credentials.from_service_account_info")
+    def test_clients_per_thread(self, from_service_account_info, build_from_document, authorized_http):
+        build_from_document.side_effect = lambda document, http: MagicMock()
+        factory = GSuiteClientFactory()
+
+        directory_api = factory.directory_api()
+        self.assertIs(factory.directory_api(), directory_api)
+        self.assertIsNot(factory.groups_settings_api(), directory_api)
+        authorized_http.assert_called_once()
 
-        mc.set("url", "content")
+        other_thread_clients = []
+        thread = threading.Thread(target=lambda: other_thread_clients.append(factory.directory_api()))
+        thread.start()
+        thread.join()
 
-        self.assertEqual(mc.get("url"), "content")
+        self.assertIsNot(other_thread_clients[0], directory_api)
+        self.assertEqual(authorized_http.call_count, 2)
+        from_service_account_info.assert_called_once()
 
 
 class GSuiteMethodsTestCase(TestCase):
@@ -62,35 +106,21 @@ class GSuiteMethodsTestCase(TestCase):
         self.settings_api.reset_mock()
         self.directory_api.reset_mock()
 
-    @patch("google.oauth2.service_account.Credentials.from_service_account_info")
-    @patch("mailing_lists.gsuite.build")
-    def test_gsuite_init(self, build, from_service_account_info):
-        from_service_account_info.return_value = MagicMock(return_value="creds")
-
-        GSuiteSyncService()
-
-        build.assert_called()
-        from_service_account_info.assert_called()
-
-    @patch("google.oauth2.service_account.Credentials.from_service_account_info")
-    @patch("mailing_lists.gsuite.build")
-    def test_gsuite_init_groupsettings(self, build, from_service_account_info):
-        from_service_account_info.return_value = MagicMock(return_value="creds")
-
-        GSuiteSyncService(groups_settings_api=MagicMock())
+    @patch("mailing_lists.gsuite.client_factory")
+    def test_gsuite_init(self, client_factory):
+        sync_service = GSuiteSyncService()
+        client_factory.directory_api.assert_not_called()
+        client_factory.groups_settings_api.assert_not_called()
 
-        build.assert_called()
-        from_service_account_info.assert_called()
+        self.assertEqual(sync_service.directory_api, client_factory.directory_api())
+        self.assertEqual(sync_service.groups_settings_api, client_factory.groups_settings_api())
 
-    @patch("google.oauth2.service_account.Credentials.from_service_account_info")
-    @patch("mailing_lists.gsuite.build")
-    def test_gsuite_init_directory(self, build, from_service_account_info):
-        from_service_account_info.return_value = MagicMock(return_value="creds")
-
-        GSuiteSyncService(directory_api=MagicMock())
-
-        build.assert_called()
-        from_service_account_info.assert_called()
+    @patch("mailing_lists.gsuite.client_factory")
+    def test_gsuite_init_specified_apis(self, client_factory):
+        self.assertIs(self.sync_service.directory_api, self.directory_api)
+        self.assertIs(self.sync_service.groups_settings_api, self.settings_api)
+        client_factory.directory_api.assert_not_called()
+        client_factory.groups_settings_api.assert_not_called()
 
     def test_gsuite_eq(self):
         self.assertNotEqual(
@@ -133,6 +163,46 @@ class GSuiteMethodsTestCase(TestCase):
             ),
         )
 
+    def test_gsuite_fingerprint(self):
+        group = GSuiteSyncService.GroupData("new_group", "some description", ["alias1"], ["b@example.com", "a@e.com"])
+
+        self.assertEqual(
+            group.fingerprint,
+            GSuiteSyncService.GroupData(
+                "new_group", "some description", ["alias1"], ["a@e.com", "b@example.com"]
+            ).fingerprint,
+        )
+        self.assertNotEqual(
+            group.fingerprint,
+            GSuiteSyncService.GroupData("new_group", "some description", ["alias1"], ["a@e.com"]).fingerprint,
+        )
+        self.assertNotEqual(
+            group.fingerprint,
+            GSuiteSyncService.GroupData(
+                "new_group", "other description", ["alias1"], ["a@e.com", "b@example.com"]
+            ).fingerprint,
+        )
+
+    def test_store_sync_result(self):
+        group = GSuiteSyncService.mailing_list_to_group(self.mailing_list)
+
+        with self.subTest("Fully synced"):
+            self.sync_service._store_sync_result(group)
+            self.mailing_list.refresh_from_db()
+            self.assertEqual(self.mailing_list.gsuite_group_name, "new_group")
+            self.assertEqual(self.mailing_list.gsuite_fingerprint, group.fingerprint)
+            self.assertIsNotNone(self.mailing_list.gsuite_fingerprint_date)
+            self.assertEqual(self.sync_service._get_synced_fingerprints([group]), {"new_group": group.fingerprint})
+
+        with self.subTest("Partially synced"):
+            self.sync_service.failed_groups = {"new_group"}
+            self.sync_service._store_sync_result(group)
+            self.mailing_list.refresh_from_db()
+            self.assertIsNone(self.mailing_list.gsuite_fingerprint)
+            self.assertEqual(self.sync_service._get_synced_fingerprints([group]), {})
+
+        self.sync_service.failed_groups = set()
+
     def test_get_all_lists(self):
         self.assertEqual(len(self.sync_service._get_all_lists()), 1)
 
@@ -142,6 +212,61 @@ class GSuiteMethodsTestCase(TestCase):
     def test_get_lists_to_archive(self):
         self.assertEqual(self.sync_service._get_list_names_to_archive(), ["archive"])
 
+    def test_get_lists_to_remove_after_retry_delay(self):
+        MailingListToBeDeleted.objects.filter(address="delete").update(
+            next_attempt=timezone.now() + timedelta(minutes=1)
+        )
+        MailingListToBeDeleted.objects.filter(address="archive").update(
+            next_attempt=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(self.sync_service._get_list_names_to_delete(), [])
+        self.assertEqual(self.sync_service._get_list_names_to_archive(), ["archive"])
+
+    def test_remove_lists(self):
+        self.sync_service.task = task = Task.objects.create(
+            total=3, completed=0, redirect_url=reverse("admin:mailing_lists_mailinglist_changelist")
+        )
+        MailingListToBeDeleted.objects.create(address="error", archive_instead_of_delete=True)
+        threads = set()
+
+        def archive_group(name):
+            threads.add(threading.get_ident())
+            if name == "error":
+                raise Exception("Oh no!")
+            return name == "archive"
+
+        with patch.object(self.sync_service, "archive_group", side_effect=archive_group), patch.object(
+            self.sync_service, "delete_group", return_value=False
+        ) as delete_group, patch.object(gsuite, "removal_executor", Executor(batch_size=1, max_workers=2)):
+            self.sync_service._remove_lists(["delete"], ["archive", "error"], {"delete", "archive", "error"}, set())
+
+        delete_group.assert_called_once_with("delete")
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertFalse(MailingListToBeDeleted.objects.filter(address="archive").exists())
+
+        entry = MailingListToBeDeleted.objects.get(address="delete")
+        self.assertEqual(entry.attempts, 1)
+        self.assertAlmostEqual(
+            entry.next_attempt, timezone.now() + gsuite.REMOVAL_RETRY_DELAY, delta=timedelta(minutes=1)
+        )
+        self.assertEqual(MailingListToBeDeleted.objects.get(address="error").attempts, 1)
+        self.assertEqual(task.completed, 3)
+        self.assertTrue(task.fail)
+        self.sync_service.task = None
+
+    def test_postpone_removal_backoff(self):
+        MailingListToBeDeleted.objects.filter(address="delete").update(attempts=20)
+
+        self.sync_service._postpone_removal("delete")
+        self.sync_service._postpone_removal("unknown")
+
+        entry = MailingListToBeDeleted.objects.get(address="delete")
+        self.assertEqual(entry.attempts, 21)
+        self.assertAlmostEqual(
+            entry.next_attempt, timezone.now() + gsuite.MAX_REMOVAL_RETRY_DELAY, delta=timedelta(minutes=1)
+        )
+
     def test_mailing_list_to_group(self):
         group = GSuiteSyncService.mailing_list_to_group(self.mailing_list)
         self.assertEqual(
@@ -373,7 +498,8 @@ class GSuiteMethodsTestCase(TestCase):
             success = self.sync_service.delete_group("new_group")
             self.assertFalse(success)
 
-    def test_update_group_aliases(self):
+    @patch("mailing_lists.gsuite.sleep")
+    def test_update_group_aliases(self, sleep):
         with self.subTest("Error getting existing list"):
             self.directory_api.groups().aliases().list().execute.side_effect = HttpError(
                 Response({"status": 500}), bytes()
@@ -403,7 +529,157 @@ class GSuiteMethodsTestCase(TestCase):
 
             self.sync_service._update_group_aliases(group_data)
 
-    def test_update_group_members(self):
+        self.directory_api.reset_mock()
+
+        with self.subTest("Aliases from group listing"):
+            group_key = f"update_group@{settings.GSUITE_DOMAIN}"
+            self.sync_service._listed_aliases = {group_key: [f"deleteme@{settings.GSUITE_DOMAIN}"]}
+            self.directory_api.new_batch_http_request = MagicMock()
+
+            self.sync_service._update_group_aliases(GSuiteSyncService.GroupData(name="update_group"))
+
+            self.directory_api.groups().aliases().list.assert_not_called()
+            self.directory_api.groups().aliases().delete.assert_called_once_with(
+                groupKey=group_key, alias=f"deleteme@{settings.GSUITE_DOMAIN}"
+            )
+            self.assertNotIn(group_key, self.sync_service._listed_aliases)
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_execute_retries_quota_errors(self, sleep):
+        request = MagicMock()
+        self.sync_service.retried_calls = 0
+        self.sync_service.failed_calls = 0
+
+        with self.subTest("Retried"):
+            request.execute.side_effect = [HttpError(Response({"status": 429}), bytes()), "response"]
+            self.assertEqual(self.sync_service._execute_directory(request), "response")
+            self.assertEqual(self.sync_service.retried_calls, 1)
+            self.assertEqual(self.sync_service.failed_calls, 0)
+
+        with self.subTest("Too many retries"):
+            request.execute.side_effect = HttpError(Response({"status": 429}), bytes())
+            self.assertRaises(HttpError, self.sync_service._execute_groups_settings, request)
+            self.assertEqual(self.sync_service.retried_calls, 1 + gsuite.MAX_QUOTA_RETRIES)
+            self.assertEqual(self.sync_service.failed_calls, 1)
+
+    @patch("mailing_lists.gsuite.directory_api_limiter")
+    def test_execute_throttled(self, limiter):
+        limiter.acquire.return_value = 0.5
+        self.sync_service.throttled_calls = 0
+
+        self.sync_service._execute_directory(MagicMock(), cost=3)
+
+        limiter.acquire.assert_called_once_with(3)
+        self.assertEqual(self.sync_service.throttled_calls, 1)
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_execute_batches(self, sleep):
+        class FakeBatch:
+            def __init__(self, callback, outcomes):
+                self.callback = callback
+                self.outcomes = outcomes
+                self.requests = []
+
+            def add(self, request, request_id):
+                self.requests.append((request_id, request))
+
+            def execute(self):
+                for request_id, request in self.requests:
+                    status = self.outcomes.get(request, 200)
+                    error = HttpError(Response({"status": status}), bytes()) if status != 200 else None
+                    self.callback(request_id, None, error)
+
+        outcomes = [{"a": 503, "b": 404}, {"a": 200}]
+        batches = []
+
+        def new_batch_http_request(callback):
+            batches.append(FakeBatch(callback, outcomes[len(batches)]))
+            return batches[-1]
+
+        self.directory_api.new_batch_http_request = new_batch_http_request
+        self.sync_service._reset_statistics()
+        group = GSuiteSyncService.GroupData(name="batch_group")
+
+        self.sync_service._execute_batches(
+            group, [Operation(Action.ADD, key) for key in ["a", "b", "c"]], lambda o: o.key, "Could not insert"
+        )
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual([request for _, request in batches[1].requests], ["a"])
+        sleep.assert_called_once()
+        self.assertEqual(self.sync_service.operations_succeeded["batch_group"], 2)
+        self.assertEqual(self.sync_service.operations_failed["batch_group"], 1)
+        self.assertIn("batch_group", self.sync_service.failed_groups)
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_execute_batches_keeps_failing(self, sleep):
+        self.directory_api.new_batch_http_request = MagicMock()
+        self.directory_api.new_batch_http_request().execute.side_effect = HttpError(Response({"status": 500}), bytes())
+        self.sync_service._reset_statistics()
+        group = GSuiteSyncService.GroupData(name="batch_group")
+
+        self.sync_service._execute_batches(
+            group, [Operation(Action.ADD, key) for key in ["a", "b"]], lambda o: o.key, "Could not insert"
+        )
+
+        self.assertEqual(sleep.call_count, gsuite.MAX_BATCH_RETRIES)
+        self.assertEqual(self.sync_service.operations_succeeded["batch_group"], 0)
+        self.assertEqual(self.sync_service.operations_failed["batch_group"], 2)
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_execute_batches_quota_exceeded(self, sleep):
+        self.directory_api.new_batch_http_request = MagicMock()
+        batch_request = self.directory_api.new_batch_http_request()
+        batch_request.execute.side_effect = HttpError(Response({"status": 429}), bytes())
+        self.sync_service._reset_statistics()
+        group = GSuiteSyncService.GroupData(name="batch_group")
+
+        self.sync_service._execute_batches(
+            group, [Operation(Action.ADD, key) for key in ["a", "b"]], lambda o: o.key, "Could not insert"
+        )
+
+        self.assertEqual(batch_request.execute.call_count, 1 + gsuite.MAX_BATCH_RETRIES)
+        self.assertEqual(sleep.call_count, gsuite.MAX_BATCH_RETRIES)
+        self.assertEqual(self.sync_service.retried_calls, gsuite.MAX_BATCH_RETRIES)
+        self.assertEqual(self.sync_service.failed_calls, 1)
+        self.assertEqual(self.sync_service.operations_failed["batch_group"], 2)
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_execute_batches_quota_exceeded_once(self, sleep):
+        self.directory_api.new_batch_http_request = MagicMock()
+        batch_request = self.directory_api.new_batch_http_request()
+        batch_request.execute.side_effect = [HttpError(Response({"status": 429}), bytes()), None]
+        self.sync_service._reset_statistics()
+        group = GSuiteSyncService.GroupData(name="batch_group")
+
+        self.sync_service._execute_batches(
+            group, [Operation(Action.ADD, key) for key in ["a", "b"]], lambda o: o.key, "Could not insert"
+        )
+
+        self.assertEqual(batch_request.execute.call_count, 2)
+        self.assertEqual(self.sync_service.retried_calls, 1)
+        self.assertEqual(self.sync_service.failed_calls, 0)
+        self.assertEqual(self.sync_service.operations_succeeded["batch_group"], 2)
+        self.assertNotIn("batch_group", self.sync_service.failed_groups)
+
+    def test_list_all(self):
+        list_method = MagicMock()
+        list_method().execute.side_effect = [
+            {"members": [{"email": "a@example.com"}], "nextPageToken": "some_token"},
+            {"members": [{"email": "b@example.com"}]},
+        ]
+        list_method.reset_mock()
+
+        members = self.sync_service._list_all(list_method, "members", groupKey="group", fields="members(email)")
+
+        self.assertEqual([m["email"] for m in members], ["a@example.com", "b@example.com"])
+        list_method.assert_any_call(maxResults=gsuite.DIRECTORY_PAGE_SIZE, groupKey="group", fields="members(email)")
+        list_method.assert_called_with(
+            maxResults=gsuite.DIRECTORY_PAGE_SIZE, pageToken="some_token", groupKey="group", fields="members(email)"
+        )
+
+    @patch("mailing_lists.gsuite.sleep")
+    def test_update_group_members(self, sleep):
         with self.subTest("Error getting existing list"):
             self.directory_api.members().list().execute.side_effect = HttpError(Response({"status": 500}), bytes())
             self.sync_service._update_group_members(GSuiteSyncService.GroupData(name="update_group"))
@@ -446,10 +722,14 @@ class GsuiteSyncTestCase(TestCase):
 
         cls.sync_service = GSuiteSyncService(groups_settings_api=cls.settings_api, directory_api=cls.directory_api)
         cls.existing_groups = [
-            {"name": "delete_me", "directMembersCount": "3"},
-            {"name": "archive_me", "directMembersCount": "3"},
-            {"name": "already_synced", "directMembersCount": "2"},
-            {"name": "already_archived", "directMembersCount": "0"},
+            {"email": f"delete_me@{settings.GSUITE_DOMAIN}", "name": "delete_me", "directMembersCount": "3"},
+            {"email": f"archive_me@{settings.GSUITE_DOMAIN}", "name": "archive_me", "directMembersCount": "3"},
+            {"email": f"already_synced@{settings.GSUITE_DOMAIN}", "name": "already_synced", "directMembersCount": "2"},
+            {
+                "email": f"already_archived@{settings.GSUITE_DOMAIN}",
+                "name": "already_archived",
+                "directMembersCount": "0",
+            },
         ]
 
     def setUp(self):
@@ -476,6 +756,17 @@ class GsuiteSyncTestCase(TestCase):
         self.directory_api.groups().list().execute.side_effect = HttpError(Response({"status": 500}), bytes())
         self.sync_service.sync_mailing_lists()
 
+    def test_error_getting_existing_list_with_task(self):
+        self.sync_service.task = self.task = Task.objects.create(
+            redirect_url=reverse("admin:mailing_lists_mailinglist_changelist")
+        )
+        self.directory_api.groups().list().execute.side_effect = HttpError(Response({"status": 500}), bytes())
+
+        self.sync_service.sync_mailing_lists()
+
+        self.assertTrue(self.task.fail)
+        self.assertEqual(self.task.completed, self.task.total)
+
     def test_successful_full_sync(self):
         self.sync_service.task = None
 
@@ -536,6 +827,28 @@ class GsuiteSyncTestCase(TestCase):
         self.sync_service.delete_group.side_effect = Exception("Oh no!")
         self.sync_service.sync_mailing_lists()
 
+    def test_sync_skips_unchanged_lists(self):
+        self.sync_service.task = None
+        self.sync_service._get_list_names_to_archive.return_value = []
+        self.sync_service._get_list_names_to_delete.return_value = []
+
+        already_synced = GSuiteSyncService.GroupData(name="already_synced", addresses=["someone"])
+        MailingList.objects.create(
+            address="already_synced",
+            gsuite_fingerprint=already_synced.fingerprint,
+            gsuite_fingerprint_date=timezone.now(),
+        )
+
+        with self.subTest("Unchanged"):
+            self.sync_service.sync_mailing_lists()
+            self.sync_service.update_group.assert_not_called()
+
+        self.directory_api.groups().list().execute.side_effect = [{"groups": self.existing_groups}]
+
+        with self.subTest("Forced"):
+            self.sync_service.sync_mailing_lists(force=True)
+            self.sync_service.update_group.assert_called_once_with("already_synced", already_synced)
+
     def test_partial_sync(self):
         self.sync_service.task = None
 
@@ -563,6 +876,18 @@ class GsuiteSyncTestCase(TestCase):
         self.sync_service.archive_group.assert_not_called()
         self.sync_service.delete_group.assert_not_called()
 
+    def test_partial_sync_with_task(self):
+        self.sync_service.task = self.task = Task.objects.create(
+            redirect_url=reverse("admin:mailing_lists_mailinglist_changelist")
+        )
+        self.sync_service._get_list_names_to_archive.return_value = ["archive_me"]
+        self.sync_service._get_list_names_to_delete.return_value = ["delete_me"]
+
+        self.sync_service.sync_mailing_lists([GSuiteSyncService.GroupData(name="sync_me", addresses=["someone"])])
+
+        self.assertEqual(self.task.total, 1)
+        self.assertEqual(self.task.completed, 1)
+
     def test_archive_delete_with_task_failure(self):
         self.sync_service.task = self.task = Task.objects.create(
             total=0, completed=0, redirect_url=reverse("admin:mailing_lists_mailinglist_changelist")
@@ -603,8 +928,10 @@ class GsuiteSyncTestCase(TestCase):
         original_sync_mailing_lists = self.sync_service.sync_mailing_lists
         self.sync_service.sync_mailing_lists = MagicMock()
         task_id = self.sync_service.sync_mailing_lists_as_task(lists=["test"])
-        self.assertTrue(Task.objects.filter(id=task_id).exists())
-        self.sync_service.sync_mailing_lists.assert_called_with(["test"])
+        self.assertEqual(Task.objects.get(id=task_id).total, 1)
+        self.sync_service.sync_mailing_lists.assert_called_with(["test"], False)
+        self.sync_service.sync_mailing_lists_as_task(lists=["test"], force=True)
+        self.sync_service.sync_mailing_lists.assert_called_with(["test"], True)
         self.sync_service.sync_mailing_lists = original_sync_mailing_lists
 
     def test_sync_mailing_lists_with_task_failure(self):
@@ -622,3 +949,46 @@ class GsuiteSyncTestCase(TestCase):
 
         self.assertEqual(self.task.completed, self.task.total)
         self.assertTrue(self.task.fail)
+        self.assertIn("API calls were throttled", self.task.success_message)
+
+    def test_sync_reports_failed_lists(self):
+        self.sync_service.task = self.task = Task.objects.create(
+            total=0, completed=0, redirect_url=reverse("admin:mailing_lists_mailinglist_changelist")
+        )
+        self.sync_service._get_list_names_to_archive.return_value = []
+        self.sync_service._get_list_names_to_delete.return_value = []
+
+        def create_group(group):
+            self.sync_service._record_results(group, 1, 2)
+            return True
+
+        self.sync_service.create_group.side_effect = create_group
+
+        self.sync_service.sync_mailing_lists()
+
+        self.assertIn("2 member and alias changes failed for the lists: sync_me.", self.task.success_message)
+
+    def test_sync_lists_aliases_with_groups(self):
+        self.sync_service.task = None
+        self.sync_service._get_list_names_to_archive.return_value = []
+        self.sync_service._get_list_names_to_delete.return_value = []
+        alias = f"alias@{settings.GSUITE_DOMAIN}"
+        self.directory_api.groups().list().execute.side_effect = [
+            {"groups": self.existing_groups[:2], "nextPageToken": "some_token"},
+            {"groups": [{**self.existing_groups[2], "aliases": [alias]}, self.existing_groups[3]]},
+        ]
+        listed_aliases = []
+        self.sync_service.update_group.side_effect = lambda name, group: listed_aliases.append(
+            dict(self.sync_service._listed_aliases)
+        )
+
+        self.sync_service.sync_mailing_lists()
+
+        self.directory_api.groups().list.assert_any_call(
+            maxResults=gsuite.DIRECTORY_PAGE_SIZE,
+            domain=settings.GSUITE_DOMAIN,
+            fields="nextPageToken,groups(email,name,directMembersCount,aliases)",
+        )
+        self.assertEqual(listed_aliases[0][f"already_synced@{settings.GSUITE_DOMAIN}"], [alias])
+        self.assertEqual(listed_aliases[0][f"delete_me@{settings.GSUITE_DOMAIN}"], [])
+        self.assertEqual(self.sync_service._listed_aliases, {})
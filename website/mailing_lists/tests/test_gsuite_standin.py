@@ -0,0 +1,182 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from mailing_lists.gsuite import GSuiteSyncService
+from mailing_lists.gsuite_standin import GSuiteStandIn, filter_fields
+
+
+class FilterFieldsTest(TestCase):
+    def test_filter_fields(self):
+        response = {
+            "nextPageToken": "1",
+            "kind": "admin#directory#groups",
+            "groups": [{"email": "a@example.org", "name": "a", "id": "1"}],
+        }
+
+        self.assertEqual(
+            filter_fields(response, "nextPageToken,groups(email,name)"),
+            {"nextPageToken": "1", "groups": [{"email": "a@example.org", "name": "a"}]},
+        )
+        self.assertEqual(filter_fields(response, "aliases(alias)"), {})
+
+
+class GSuiteStandInRequestTest(TestCase):
+    def setUp(self):
+        self.standin = GSuiteStandIn("example.org")
+        self.group = self.standin.add_group("list", members=["a@example.org"], aliases=["alias"])
+
+    def request(self, method, path, body=None):
+        return self.standin._respond(method, path, json.dumps(body).encode() if body is not None else b"")
+
+    def assertError(self, response, status, reason):
+        self.assertEqual(response[0], status)
+        self.assertEqual(response[1]["error"]["errors"][0]["reason"], reason)
+
+    def test_filter_fields__nested_object(self):
+        self.assertEqual(
+            filter_fields({"group": {"email": "a", "name": "b"}}, "group(email)"), {"group": {"email": "a"}}
+        )
+
+    def test_groups(self):
+        group_path = f"/admin/directory/v1/groups/{self.group['id']}"
+
+        self.assertEqual(self.request("GET", group_path)[1]["email"], "list@example.org")
+        self.assertError(
+            self.request("POST", "/admin/directory/v1/groups", {"email": "list@example.org"}), 409, "duplicate"
+        )
+        self.assertError(self.request("DELETE", "/admin/directory/v1/groups"), 400, "badRequest")
+        self.assertError(self.request("GET", "/admin/directory/v1/groups/unknown@example.org"), 404, "notFound")
+        self.assertError(self.request("GET", "/unknown"), 404, "notFound")
+        self.assertError(self.request("POST", group_path), 400, "badRequest")
+        self.assertError(self.standin._respond("PUT", group_path, b"{"), 400, "invalid")
+
+        status, group = self.request("PATCH", group_path, {"email": "renamed@example.org", "name": "Renamed"})
+        self.assertEqual(status, 200)
+        self.assertEqual(group["aliases"], ["alias@example.org", "list@example.org"])
+        self.assertEqual(group["name"], "Renamed")
+
+        self.assertEqual(self.request("DELETE", group_path), (204, None))
+        self.assertEqual(self.standin.groups, {})
+
+    def test_group_settings(self):
+        settings_path = "/groups/v1/groups/list@example.org"
+
+        self.request("PUT", settings_path, {"whoCanJoin": "INVITED_CAN_JOIN"})
+        status, response = self.request("PATCH", settings_path, {"whoCanPostMessage": "ANYONE_CAN_POST"})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            self.group["settings"], {"whoCanJoin": "INVITED_CAN_JOIN", "whoCanPostMessage": "ANYONE_CAN_POST"}
+        )
+        self.assertEqual(self.request("GET", settings_path), (200, response))
+        self.assertError(self.request("DELETE", settings_path), 400, "badRequest")
+
+    def test_members_and_aliases(self):
+        members_path = "/admin/directory/v1/groups/list@example.org/members"
+        aliases_path = "/admin/directory/v1/groups/list@example.org/aliases"
+
+        self.assertError(self.request("POST", members_path, {"email": "a@example.org"}), 409, "duplicate")
+        self.assertError(self.request("DELETE", f"{members_path}/b@example.org"), 404, "notFound")
+        self.assertError(self.request("PATCH", members_path), 400, "badRequest")
+        self.assertError(self.request("POST", aliases_path, {"alias": "alias@example.org"}), 409, "duplicate")
+        self.assertError(self.request("DELETE", f"{aliases_path}/other@example.org"), 404, "notFound")
+        self.assertError(self.request("PATCH", aliases_path), 400, "badRequest")
+
+
+class GSuiteStandInTest(TestCase):
+    def setUp(self):
+        for target in ("mailing_lists.gsuite.sleep", "mailing_lists.throttling.sleep"):
+            patcher = patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.standin = GSuiteStandIn(settings.GSUITE_DOMAIN, seed=0)
+        self.standin.start()
+        self.addCleanup(self.standin.stop)
+        self.sync = GSuiteSyncService(
+            groups_settings_api=self.standin.groups_settings_api(), directory_api=self.standin.directory_api()
+        )
+
+    def test_sync(self):
+        existing = self.standin.add_group("existing", members=["old@example.org"], aliases=["old-alias"])
+        self.standin.add_group("other")
+
+        self.sync.sync_mailing_lists(
+            lists=[
+                GSuiteSyncService.GroupData(
+                    "new", aliases=["new-alias"], addresses=["a@example.org", "b@example.org"]
+                ),
+                GSuiteSyncService.GroupData("existing", aliases=["alias"], addresses=["a@example.org"]),
+            ]
+        )
+
+        new = self.standin.get_group(f"new@{settings.GSUITE_DOMAIN}")
+        self.assertEqual(new["members"], {"a@example.org": "MEMBER", "b@example.org": "MEMBER"})
+        self.assertEqual(new["aliases"], [f"new-alias@{settings.GSUITE_DOMAIN}"])
+        self.assertEqual(new["settings"], GSuiteSyncService._group_settings())
+        self.assertEqual(existing["members"], {"a@example.org": "MEMBER"})
+        self.assertEqual(existing["aliases"], [f"alias@{settings.GSUITE_DOMAIN}"])
+        self.assertIs(self.standin.get_group(f"alias@{settings.GSUITE_DOMAIN}"), existing)
+        self.assertEqual(self.standin.statistics["batched_requests"], 7)
+        self.assertGreater(self.standin.statistics["bytes_sent"], 0)
+
+    @patch("mailing_lists.gsuite.DIRECTORY_PAGE_SIZE", 2)
+    @patch("mailing_lists.gsuite_standin.DIRECTORY_PAGE_SIZE", 2)
+    def test_pagination(self):
+        for i in range(5):
+            self.standin.add_group(f"list-{i}", members=["a@example.org"])
+
+        groups = list(self.sync._list_all(self.sync.directory_api.groups().list, "groups", domain=self.standin.domain))
+
+        self.assertEqual([group["name"] for group in groups], [f"list-{i}" for i in range(5)])
+        self.assertEqual(self.standin.statistics["requests"], 3)
+
+    def test_quota_errors(self):
+        self.standin.quota_error_rate = 0.3
+
+        self.sync.sync_mailing_lists(
+            lists=[GSuiteSyncService.GroupData("list", addresses=[f"{i}@example.org" for i in range(20)])]
+        )
+
+        self.assertGreater(self.standin.statistics["quota_errors"], 0)
+        self.assertEqual(len(self.standin.get_group(f"list@{settings.GSUITE_DOMAIN}")["members"]), 20)
+        self.assertEqual(self.sync.failed_groups, set())
+
+    def test_propagation_delay(self):
+        self.standin.propagation_delay = 60
+
+        self.assertFalse(self.sync.create_group(GSuiteSyncService.GroupData("list", addresses=["a@example.org"])))
+        self.assertEqual(self.standin.statistics["propagation_errors"], 8)
+
+
+class BenchmarkGSuiteSyncCommandTest(TestCase):
+    def test_benchmark(self):
+        out = StringIO()
+
+        call_command(
+            "benchmark_gsuite_sync",
+            "--lists=3",
+            "--members=30",
+            "--simulate-waits",
+            "--propagation-delay=5",
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn("Initial sync (3 lists, 30 members)", output)
+        self.assertIn("Resync after 10% churn", output)
+        self.assertIn("Batch requests:     6", output)
+        self.assertIn("Batch fill ratio:   11.0%", output)
+
+    def test_benchmark__real_waits(self):
+        out = StringIO()
+
+        call_command("benchmark_gsuite_sync", "--lists=2", "--members=4", "--verbosity=2", stdout=out)
+
+        self.assertIn("Initial sync (2 lists, 4 members)", out.getvalue())
+        self.assertNotIn("Simulated waits", out.getvalue())
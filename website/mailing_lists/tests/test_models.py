@@ -10,6 +10,7 @@ from mailing_lists.models import (
     MailingListAlias,
     MailingListCourseSemesterLink,
     MailingListToBeDeleted,
+    resolve_addresses,
 )
 
 from projects.models import Project
@@ -109,6 +110,34 @@ class ModelTest(TestCase):
 
         self.assertCountEqual(self.existing_list.all_addresses, [extra.address])
 
+    def test_resolve_addresses(self):
+        semester = Semester.objects.create(year=2000, season=Semester.FALL)
+        course = Course.objects.create(name="Test course")
+        project = Project.objects.create(name="test project", semester=semester)
+        employee = Employee.objects.create(github_id=0, github_username="user1", email="e@test.nl")
+        other_employee = Employee.objects.create(github_id=1, github_username="user2", email="f@test.nl")
+        Registration.objects.create(
+            user=employee,
+            project=project,
+            experience=Registration.EXPERIENCE_BEGINNER,
+            course=course,
+            semester=semester,
+        )
+        other_list = MailingList.objects.create(address="other")
+        empty_list = MailingList.objects.create(address="empty")
+        MailingListCourseSemesterLink.objects.create(mailing_list=self.existing_list, course=course, semester=semester)
+        MailingListCourseSemesterLink.objects.create(mailing_list=other_list, course=course, semester=semester)
+        other_list.projects.add(project)
+        other_list.users.add(other_employee)
+        ExtraEmailAddress.objects.create(address="g@test.nl", name="test", mailing_list=other_list)
+
+        with self.assertNumQueries(5):
+            addresses = resolve_addresses([self.existing_list.pk, other_list.pk, empty_list.pk])
+
+        self.assertEqual(addresses[self.existing_list.pk], {"e@test.nl"})
+        self.assertEqual(addresses[other_list.pk], {"e@test.nl", "f@test.nl", "g@test.nl"})
+        self.assertEqual(addresses[empty_list.pk], set())
+
     def test_email_validator_does_block_reserved_address(self):
         try:
             mailinglist1 = MailingList(address="admin")
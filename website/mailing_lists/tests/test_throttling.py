@@ -0,0 +1,52 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from googleapiclient.errors import HttpError
+
+from httplib2 import Response
+
+from mailing_lists.throttling import TokenBucket, is_quota_error
+
+
+def http_error(status, reason=None):
+    content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode() if reason else b""
+    return HttpError(Response({"status": status}), content)
+
+
+class TokenBucketTest(TestCase):
+    @patch("mailing_lists.throttling.sleep")
+    @patch("mailing_lists.throttling.monotonic")
+    def test_acquire(self, monotonic, sleep):
+        monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10)
+
+        with self.subTest("Tokens available"):
+            self.assertEqual(bucket.acquire(10), 0)
+            sleep.assert_not_called()
+
+        with self.subTest("Bucket empty"):
+            self.assertAlmostEqual(bucket.acquire(5), 0.5)
+            sleep.assert_called_once_with(0.5)
+
+        sleep.reset_mock()
+
+        with self.subTest("Refilled"):
+            monotonic.return_value = 102.0
+            self.assertEqual(bucket.acquire(), 0)
+            sleep.assert_not_called()
+
+        with self.subTest("Cost larger than capacity"):
+            monotonic.return_value = 110.0
+            self.assertEqual(bucket.acquire(50), 0)
+
+
+class IsQuotaErrorTest(TestCase):
+    def test_is_quota_error(self):
+        self.assertTrue(is_quota_error(http_error(429)))
+        self.assertTrue(is_quota_error(http_error(403, "rateLimitExceeded")))
+        self.assertTrue(is_quota_error(http_error(403, "userRateLimitExceeded")))
+        self.assertFalse(is_quota_error(http_error(403, "forbidden")))
+        self.assertFalse(is_quota_error(http_error(403)))
+        self.assertFalse(is_quota_error(http_error(500)))
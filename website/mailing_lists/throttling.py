@@ -0,0 +1,72 @@
+import json
+import threading
+from time import monotonic, sleep
+
+# Reasons Google APIs give for 403 responses when a quota is exceeded
+QUOTA_ERROR_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+
+class TokenBucket:
+    """Thread safe token bucket to stay within the request quota of an API."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Create a full token bucket.
+
+        :param rate: Number of tokens (requests) that are added to the bucket per second
+        :param capacity: Maximum number of tokens in the bucket, equal to the rate if not specified
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens from the bucket, waiting until they are available.
+
+        Tokens are reserved before waiting, so concurrent callers are served in the order they arrive.
+
+        :param tokens: Number of tokens to take, at most the capacity of the bucket is taken
+        :return: The number of seconds waited
+        """
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(tokens, self.capacity)
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+
+def is_quota_error(error):
+    """
+    Check whether an HttpError of a Google API was caused by exceeding a quota.
+
+    :param error: The HttpError
+    :return: True if the request may succeed when retried later, otherwise False
+    """
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+
+    try:
+        errors = json.loads(error.content.decode("utf-8"))["error"]["errors"]
+        return any(e.get("reason") in QUOTA_ERROR_REASONS for e in errors)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+
+def is_transient_error(error):
+    """
+    Check whether an HttpError of a Google API is transient and the request can be retried.
+
+    :param error: The HttpError
+    :return: True if the error was caused by a quota or a server error, otherwise False
+    """
+    return is_quota_error(error) or error.resp.status >= 500
@@ -174,9 +174,8 @@ class ProjectAdmin(admin.ModelAdmin):
 
     def synchronise_to_AWS(self, request):
         """Synchronise to Amazon Web Services."""
-        sync = AWSSync()
-        sync.synchronise(request)
-        return redirect("admin:projects_project_changelist")
+        task = AWSSync().synchronise_as_task()
+        return redirect("admin:progress_bar", task=task)
 
     def get_urls(self):
         """Get admin urls."""
@@ -1,6 +1,58 @@
+import threading
+from collections.abc import Iterator
+
 import boto3
 
 import botocore
+from botocore.config import Config
+
+# Configuration of all AWS clients. The adaptive retry mode backs off and rate limits the client when AWS throttles
+# requests. The connection pool is large enough for the concurrent tree extraction and account creation of AWSSync.
+AWS_CLIENT_CONFIG = Config(
+    retries={"mode": "adaptive", "max_attempts": 10},
+    max_pool_connections=16,
+    connect_timeout=10,
+    read_timeout=30,
+)
+
+
+class AWSClientProvider:
+    """
+    Process-wide provider of boto3 clients, which are created once and reused by every sync.
+
+    boto3 clients are thread safe, so the provided clients can be shared by the threads of a sync. Only creating them
+    is not thread safe, which is why it is done while holding a lock.
+    """
+
+    def __init__(self, config: Config):
+        """
+        Create a provider without any clients yet.
+
+        :param config: botocore Config of the provided clients.
+        """
+        self.config = config
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, service_name: str) -> botocore.client.BaseClient:
+        """
+        Get the client of an AWS service, creating it on first use.
+
+        :param service_name: name of the AWS service, e.g. 'organizations'.
+        :return: the shared boto3 client of the service.
+        """
+        with self._lock:
+            if service_name not in self._clients:
+                self._clients[service_name] = boto3.session.Session().client(service_name, config=self.config)
+            return self._clients[service_name]
+
+    def clear(self) -> None:
+        """Forget all clients, so they are created again with the current credentials on next use."""
+        with self._lock:
+            self._clients.clear()
+
+
+client_provider = AWSClientProvider(AWS_CLIENT_CONFIG)
 
 
 class AWSAPITalker:
@@ -10,12 +62,13 @@ class AWSAPITalker:
         """
         Initialize in order to communicate with the AWS API.
 
-        First, initializes the boto3 clients which communicate with AWS.
-        Second, sets the maximum amount of elements to fit on one page of an AWS response.
+        First, gets the shared boto3 clients which communicate with AWS.
+        Second, sets the amount of elements to fit on one page of an AWS response, which is the maximum of 20 allowed
+        by the Organizations API for listing OUs and accounts, so listings take as few requests as possible.
         """
-        self.iam_client = boto3.client("iam")
-        self.org_client = boto3.client("organizations")
-        self.sts_client = boto3.client("sts")
+        self.iam_client = client_provider.get("iam")
+        self.org_client = client_provider.get("organizations")
+        self.sts_client = client_provider.get("sts")
 
         self.max_results = 20
         self.conditional_tag = {"Key": "AutoCreated", "Value": ""}
@@ -98,6 +151,17 @@ class AWSAPITalker:
             AccountId=account_id, SourceParentId=source_parent_id, DestinationParentId=dest_parent_id
         )
 
+    def iterate_pages(self, page_iterator: botocore.paginate.PageIterator, key: str) -> Iterator[dict]:
+        """
+        Iterate over the information on each page of an AWS API response, requesting pages as they are needed.
+
+        :param page_iterator: boto3 feature which iterates over all pages.
+        :param key: the key corresponding to the list of values to be retrieved from each page.
+        :return: an iterator over the values of all pages.
+        """
+        for page in page_iterator:
+            yield from page[key]
+
     def combine_pages(self, page_iterator: botocore.paginate.PageIterator, key: str) -> list[dict]:
         """
         Combine the information on each page of an AWS API response into a list.
@@ -108,12 +172,19 @@ class AWSAPITalker:
         :param key: the key corresponding to the list of values to be retrieved from each page.
         :return: a list that combines the values from all pages.
         """
-        list = []
+        return list(self.iterate_pages(page_iterator, key))
 
-        for page in page_iterator:
-            list = list + page[key]
+    def iterate_organizational_units_for_parent(self, parent_id: str) -> Iterator[dict]:
+        """
+        Iterate over all organizational units below the specified parent, while their pages are being listed.
+
+        :param parent_id: ID of the parent.
+        :return: iterator over dictionaries containing organizational unit information.
+        """
+        paginator = self.org_client.get_paginator("list_organizational_units_for_parent")
+        page_iterator = paginator.paginate(ParentId=parent_id, PaginationConfig={"PageSize": self.max_results})
 
-        return list
+        return self.iterate_pages(page_iterator, "OrganizationalUnits")
 
     def list_organizational_units_for_parent(self, parent_id: str) -> list[dict]:
         """
@@ -122,10 +193,19 @@ class AWSAPITalker:
         :param parent_id: ID of the parent.
         :return: list of dictionaries containing organizational unit information.
         """
-        paginator = self.org_client.get_paginator("list_organizational_units_for_parent")
-        page_iterator = paginator.paginate(ParentId=parent_id, MaxResults=self.max_results)
+        return list(self.iterate_organizational_units_for_parent(parent_id))
 
-        return self.combine_pages(page_iterator, "OrganizationalUnits")
+    def iterate_accounts_for_parent(self, parent_id: str) -> Iterator[dict]:
+        """
+        Iterate over all accounts below the specified parent, while their pages are being listed.
+
+        :param parent_id: ID of the parent.
+        :return: iterator over dictionaries containing account information
+        """
+        paginator = self.org_client.get_paginator("list_accounts_for_parent")
+        page_iterator = paginator.paginate(ParentId=parent_id, PaginationConfig={"PageSize": self.max_results})
+
+        return self.iterate_pages(page_iterator, "Accounts")
 
     def list_accounts_for_parent(self, parent_id: str) -> list[dict]:
         """
@@ -134,10 +214,7 @@ class AWSAPITalker:
         :param parent_id: ID of the parent.
         :return: list of dictionaries containing account information
         """
-        paginator = self.org_client.get_paginator("list_accounts_for_parent")
-        page_iterator = paginator.paginate(ParentId=parent_id, MaxResults=self.max_results)
-
-        return self.combine_pages(page_iterator, "Accounts")
+        return list(self.iterate_accounts_for_parent(parent_id))
 
     def list_tags_for_resource(self, resource_id: str) -> list[dict]:
         """
@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from collections import deque
+from datetime import timedelta
 
 from botocore.exceptions import ClientError
 
-from django.contrib import messages
+from django.conf import settings
+from django.urls import reverse
 
 from courses.models import Semester
 
-from mailing_lists.models import MailingList
+from giphousewebsite.reconciler import reconcile
 
 from projects.aws.awsapitalker import AWSAPITalker
 from projects.aws.awssync_checks import Checks
-from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
-from projects.models import AWSPolicy, Project
+from projects.aws.awssync_checks_permissions import api_permissions
+from projects.aws.awssync_mirror import AWSOrganizationMirror
+from projects.aws.awssync_structs import AWSTree, SyncData
+from projects.models import AWSAccountRequest, AWSPolicy, Project
+
+from tasks.models import Task
 
 
 class AWSSync:
@@ -26,9 +34,22 @@ class AWSSync:
         self.checker = Checks()
         self.logger = logging.getLogger("django.aws")
         self.logger.setLevel(logging.DEBUG)
+        self._current_policy = None
+        self.task = None
 
         self.ACCOUNT_REQUEST_INTERVAL_SECONDS = 5
         self.ACCOUNT_REQUEST_MAX_ATTEMPTS = 3
+        # Requests of which the status is still unknown after this many lookups, over all runs, are given up.
+        self.ACCOUNT_REQUEST_MAX_TOTAL_ATTEMPTS = 30
+        # AWS Organizations allows at most 5 account creation requests to be in progress at the same time.
+        self.ACCOUNT_REQUEST_MAX_CONCURRENT = 5
+        self.TREE_EXTRACTION_MAX_WORKERS = 8
+        # Pipeline stages shown in the progress of the Task: preconditions, tree extraction, OU setup and the result.
+        # Account creation adds a step for every account to create.
+        self.TASK_STAGES = 4
+        # Maximum age of the mirrored accounts of an OU before they are listed from AWS again.
+        self.MIRROR_TTL = timedelta(days=1)
+        self.mirror = AWSOrganizationMirror(self.api_talker, self.MIRROR_TTL, self.TREE_EXTRACTION_MAX_WORKERS)
 
         self.SUCCESS_MSG = "Successfully synchronized all projects to AWS."
         self.FAIL_MSG = "Not all accounts were created and moved successfully. Check the console for more information."
@@ -43,17 +64,20 @@ class AWSSync:
 
         :return: list of SyncData structs with email, slug
         """
-        sync_data_list = []
         current_semester = Semester.objects.get_or_create_current_semester()
+        projects = (
+            Project.objects.filter(mailinglist__isnull=False, semester=current_semester, aws_account_id__isnull=True)
+            .order_by("id", "mailinglist__id")
+            .values_list("id", "slug", "mailinglist__address")
+        )
 
-        for project in Project.objects.filter(mailinglist__isnull=False, semester=current_semester).values(
-            "slug", "mailinglist"
-        ):
-            project_slug = project["slug"]
-            project_email = MailingList.objects.get(pk=project["mailinglist"]).email_address
-
-            sync_data = SyncData(project_email, project_slug)
-            sync_data_list.append(sync_data)
+        sync_data_list = []
+        seen_projects = set()
+        for project_id, project_slug, mailing_list_address in projects:
+            # A project with multiple mailing lists gets a single account, using its first mailing list.
+            if project_id not in seen_projects:
+                seen_projects.add(project_id)
+                sync_data_list.append(SyncData(f"{mailing_list_address}@{settings.GSUITE_DOMAIN}", project_slug))
         return sync_data_list
 
     def generate_aws_sync_list(self, giphouse_data: list[SyncData], aws_data: list[SyncData]) -> list[SyncData]:
@@ -62,42 +86,29 @@ class AWSSync:
 
         This includes their ID and email address, to be able to put users in the correct AWS organization later.
         """
-        return [project for project in giphouse_data if project not in aws_data]
+        diff = reconcile(giphouse_data, aws_data)
+        return [operation.desired for operation in diff.adds]
 
-    def extract_aws_setup(self, parent_ou_id: str) -> AWSTree:
+    def refresh_aws_setup(self, base_ou_id: str) -> AWSTree:
         """
-        Give a list of all the children of the parent OU.
+        Refresh the local mirror of the children of the base OU and give them as AWSTree.
 
-        :param parent_ou_id: The ID of the parent OU.
-        :return: A AWSTree object containing all the children of the parent OU.
+        :param base_ou_id: The ID of the base OU.
+        :return: A AWSTree object containing all the children of the base OU.
         """
-        aws_tree = AWSTree(
-            "root",
-            parent_ou_id,
-            [
-                Iteration(
-                    ou["Name"],
-                    ou["Id"],
-                    [
-                        SyncData(account["Email"], account["Name"])
-                        for account in self.api_talker.list_accounts_for_parent(parent_id=ou["Id"])
-                    ],
-                )
-                for ou in self.api_talker.list_organizational_units_for_parent(parent_id=parent_ou_id)
-            ],
-        )
-
-        return aws_tree
+        return self.mirror.refresh(base_ou_id)
 
     def get_or_create_course_ou(self, tree: AWSTree) -> str:
         """Create organizational unit under root with name of current semester."""
         root_id = tree.ou_id
         course_ou_name = str(Semester.objects.get_or_create_current_semester())
-        course_ou_id = next((ou.ou_id for ou in tree.iterations if ou.name == course_ou_name), None)
+        course_ou = tree.get_iteration(course_ou_name)
+        course_ou_id = course_ou.ou_id if course_ou is not None else None
 
         if not course_ou_id:
             course_ou = self.api_talker.create_organizational_unit(root_id, course_ou_name)
             course_ou_id = course_ou["OrganizationalUnit"]["Id"]
+            self.mirror.record_organizational_unit(root_id, course_ou_id, course_ou_name)
             self.logger.info(f"Created semester OU '{course_ou_name}' with ID '/{root_id}/{course_ou_id}'.")
         else:
             self.logger.info(f"Semester OU '{course_ou_name}' exists with ID '/{root_id}/{course_ou_id}'.")
@@ -114,28 +125,36 @@ class AWSSync:
                 raise
             self.logger.info(f"Policy with ID '{policy_id}' is already attached to target ID '{target_id}'.")
 
+    def get_current_policy(self) -> AWSPolicy | None:
+        """
+        Get the current AWSPolicy set in the Django admin panel.
+
+        The policy is looked up once and reused until the next pipeline run.
+        """
+        if self._current_policy is None:
+            self._current_policy = AWSPolicy.objects.filter(is_current_policy=True).first()
+        return self._current_policy
+
     def get_current_base_ou_id(self) -> str:
         """Get the manually configured current base OU ID set in the Django admin panel."""
-        for policy in AWSPolicy.objects.all():
-            if policy.is_current_policy:
-                return policy.base_ou_id
-        raise Exception("No current base OU ID found")
+        policy = self.get_current_policy()
+        if policy is None:
+            raise Exception("No current base OU ID found")
+        return policy.base_ou_id
 
     def get_current_policy_id(self) -> str:
         """Get the manually configured current policy ID set in the Django admin panel."""
-        for policy in AWSPolicy.objects.all():
-            if policy.is_current_policy:
-                return policy.policy_id
-        raise Exception("No current policy found")
+        policy = self.get_current_policy()
+        if policy is None:
+            raise Exception("No current policy found")
+        return policy.policy_id
 
     def get_current_policy_tag(self) -> dict:
         """Get the manually configured current policy tag set in the Django admin panel."""
-        for policy in AWSPolicy.objects.all():
-            if policy.is_current_policy:
-                tag = {"Key": policy.tags_key}
-                tag["Value"] = policy.tags_value if policy.tags_value else ""
-                return tag
-        raise Exception("No current policy tag found")
+        policy = self.get_current_policy()
+        if policy is None:
+            raise Exception("No current policy tag found")
+        return {"Key": policy.tags_key, "Value": policy.tags_value if policy.tags_value else ""}
 
     def create_and_move_accounts(
         self, new_member_accounts: list[SyncData], root_id: str, destination_ou_id: str
@@ -143,6 +162,13 @@ class AWSSync:
         """
         Create multiple accounts in the organization of the API caller and move them from the root to a destination OU.
 
+        Up to ACCOUNT_REQUEST_MAX_CONCURRENT account creation requests are outstanding at the same time. All
+        outstanding requests are polled together, and every account is moved as soon as its creation succeeded.
+
+        Every account creation request is journaled as AWSAccountRequest. Requests for the destination OU that an
+        earlier run did not finish are resumed first, and no new request is made for their accounts. A request fails
+        when AWS no longer knows it, or when its status is still unknown after ACCOUNT_REQUEST_MAX_TOTAL_ATTEMPTS.
+
         :param new_member_accounts: List of SyncData objects.
         :param root_id:             The organization's root ID.
         :param destination_ou_id:   The organization's destination OU ID.
@@ -151,92 +177,216 @@ class AWSSync:
         accounts_created = 0
         accounts_moved = 0
 
-        for new_member in new_member_accounts:
-            response = self.api_talker.create_account(
-                new_member.project_email, new_member.project_slug, [self.get_current_policy_tag()]
-            )
-            request_id = response["CreateAccountStatus"]["Id"]
+        policy_tag = self.get_current_policy_tag()
+        current_semester = Semester.objects.get_or_create_current_semester()
+        unfinished_requests = list(
+            AWSAccountRequest.objects.filter(
+                destination_ou_id=destination_ou_id,
+                state__in=[AWSAccountRequest.State.IN_PROGRESS, AWSAccountRequest.State.CREATED],
+            ).order_by("id")
+        )
+        resumed_emails = {request.email for request in unfinished_requests}
+        pending_accounts = deque(
+            member for member in new_member_accounts if member.project_email not in resumed_emails
+        )
+        accounts_to_create = len(unfinished_requests) + len(pending_accounts)
+        if self.task is not None:
+            self.task.total += accounts_to_create
+
+        outstanding_requests = {}
+        for request in unfinished_requests:
+            self.logger.info(f"Resuming creation of member account '{request.email}'.")
+            if request.state == AWSAccountRequest.State.IN_PROGRESS:
+                outstanding_requests[request.request_id] = [request, 0]
+            else:
+                self._advance_task()
+                accounts_created += 1
+                accounts_moved += self._move_created_account(request, root_id, policy_tag)
+
+        # Account creation is asynchronous in AWS, so the requests are kept in a sliding window that is polled as a
+        # whole, instead of being run through an Executor, whose batches would wait for their slowest account.
+        while pending_accounts or outstanding_requests:
+            while pending_accounts and len(outstanding_requests) < self.ACCOUNT_REQUEST_MAX_CONCURRENT:
+                new_member = pending_accounts.popleft()
+                response = self.api_talker.create_account(
+                    new_member.project_email, new_member.project_slug, [dict(policy_tag)]
+                )
+                request = AWSAccountRequest.objects.create(
+                    request_id=response["CreateAccountStatus"]["Id"],
+                    email=new_member.project_email,
+                    slug=new_member.project_slug,
+                    project=Project.objects.filter(semester=current_semester, slug=new_member.project_slug).first(),
+                    destination_ou_id=destination_ou_id,
+                )
+                outstanding_requests[request.request_id] = [request, 0]
 
-            for _ in range(self.ACCOUNT_REQUEST_MAX_ATTEMPTS):
-                time.sleep(self.ACCOUNT_REQUEST_INTERVAL_SECONDS)
+            time.sleep(self.ACCOUNT_REQUEST_INTERVAL_SECONDS)
+
+            for request_id, outstanding_request in list(outstanding_requests.items()):
+                request = outstanding_request[0]
+                outstanding_request[1] += 1
+                request.attempts += 1
+                request.save(update_fields=["attempts"])
 
                 try:
                     response_status = self.api_talker.describe_create_account_status(request_id)
                 except ClientError as error:
-                    self.logger.debug(f"Failed to get status of account with e-mail: '{new_member.project_email}'.")
+                    self.logger.debug(f"Failed to get status of account with e-mail: '{request.email}'.")
                     self.logger.debug(error)
-                    break
+                    del outstanding_requests[request_id]
+                    self._advance_task()
+                    error_code = error.response.get("Error", {}).get("Code")
+                    if error_code == "CreateAccountStatusNotFoundException":
+                        self._fail_request(request, error_code)
+                    elif request.attempts >= self.ACCOUNT_REQUEST_MAX_TOTAL_ATTEMPTS:
+                        self._fail_request(request, "MAX_ATTEMPTS_EXCEEDED")
+                    continue
 
                 request_state = response_status["CreateAccountStatus"]["State"]
 
                 if request_state == "SUCCEEDED":
-                    account_id = response_status["CreateAccountStatus"]["AccountId"]
-                    self.logger.info(f"Created member account '{new_member.project_email}' with ID '{account_id}'.")
+                    del outstanding_requests[request_id]
+                    self._advance_task()
+                    request.account_id = response_status["CreateAccountStatus"]["AccountId"]
+                    request.state = AWSAccountRequest.State.CREATED
+                    request.save()
+                    self.logger.info(f"Created member account '{request.email}' with ID '{request.account_id}'.")
                     accounts_created += 1
-
-                    try:
-                        self.api_talker.move_account(account_id, root_id, destination_ou_id)
-                        accounts_moved += 1
-                        self.logger.info(f"Moved new member account '{new_member.project_email}'.")
-                        self.api_talker.untag_resource(account_id, [self.get_current_policy_tag()["Key"]])
-                    except ClientError as error:
-                        self.logger.debug(f"Failed to move new member account '{new_member.project_email}'.")
-                        self.logger.debug(error)
-                    break
+                    accounts_moved += self._move_created_account(request, root_id, policy_tag)
 
                 elif request_state == "FAILED":
-                    failure_reason = response_status["CreateAccountStatus"]["FailureReason"]
+                    del outstanding_requests[request_id]
+                    self._advance_task()
+                    self._fail_request(request, response_status["CreateAccountStatus"]["FailureReason"])
+
+                elif request.attempts >= self.ACCOUNT_REQUEST_MAX_TOTAL_ATTEMPTS:
+                    del outstanding_requests[request_id]
+                    self._advance_task()
+                    self._fail_request(request, "MAX_ATTEMPTS_EXCEEDED")
+
+                elif outstanding_request[1] >= self.ACCOUNT_REQUEST_MAX_ATTEMPTS:
+                    del outstanding_requests[request_id]
+                    self._advance_task()
                     self.logger.debug(
-                        f"Failed to create account with e-mail: {new_member.project_email}. "
-                        f"Failure reason: {failure_reason}"
+                        f"Account with e-mail: '{request.email}' was not created after "
+                        f"{outstanding_request[1]} attempts."
                     )
-                    break
 
-        accounts_to_create = len(new_member_accounts)
         self.logger.info(f"Accounts created: {accounts_created}/{accounts_to_create}")
         self.logger.info(f"Accounts moved:   {accounts_moved}/{accounts_to_create}")
         success = accounts_to_create == accounts_created == accounts_moved
 
         return success
 
+    def _move_created_account(self, request: AWSAccountRequest, root_id: str, policy_tag: dict) -> bool:
+        """
+        Move a created member account from the root to its destination OU and remove the policy tag from it.
+
+        The account ID is stored in the project the account was requested for first. An account that is already in its
+        destination OU, because an earlier run was interrupted after moving it, is not moved again.
+
+        :return: True iff the account was moved and untagged successfully.
+        """
+        if request.project_id is not None:
+            Project.objects.filter(pk=request.project_id).update(aws_account_id=request.account_id)
+
+        try:
+            try:
+                self.api_talker.move_account(request.account_id, root_id, request.destination_ou_id)
+            except ClientError as error:
+                if error.response.get("Error", {}).get("Code") != "DuplicateAccountException":
+                    raise
+            self.logger.info(f"Moved new member account '{request.email}'.")
+            self.api_talker.untag_resource(request.account_id, [policy_tag["Key"]])
+            tags = {self.api_talker.conditional_tag["Key"]: self.api_talker.conditional_tag["Value"]}
+            self._record_account(request, tags)
+        except ClientError as error:
+            self.logger.debug(f"Failed to move new member account '{request.email}'.")
+            self.logger.debug(error)
+            return False
+
+        request.state = AWSAccountRequest.State.MOVED
+        request.save()
+        return True
+
+    def _fail_request(self, request: AWSAccountRequest, failure_reason: str) -> None:
+        """Mark an account creation request as failed, so it is not resumed again."""
+        request.failure_reason = failure_reason
+        request.state = AWSAccountRequest.State.FAILED
+        request.save()
+        self.logger.debug(f"Failed to create account with e-mail: {request.email}. Failure reason: {failure_reason}")
+
+    def _record_account(self, request: AWSAccountRequest, tags: dict) -> None:
+        """Record a new member account in the mirror of the organization."""
+        self.mirror.record_account(request.account_id, request.email, request.slug, request.destination_ou_id, tags)
+
+    def _advance_task(self) -> None:
+        """Mark a step of the pipeline as completed in the Task, if the pipeline runs as a Task."""
+        if self.task is not None:
+            self.task.completed += 1
+            self.task.save()
+
     def pipeline(self) -> bool:
         """
         Single pipeline that integrates all buildings blocks for the AWS integration process.
 
         :return: True iff all pipeline stages successfully executed.
         """
+        self._current_policy = None
+        self.checker.pipeline_preconditions(api_permissions)
+        self._advance_task()
+
         base_ou_id = self.get_current_base_ou_id()
         policy_id = self.get_current_policy_id()
         root_id = self.api_talker.list_roots()[0]["Id"]
 
-        aws_tree = self.extract_aws_setup(base_ou_id)
+        aws_tree = self.refresh_aws_setup(base_ou_id)
         self.checker.check_double_iteration_names(aws_tree)
 
         aws_sync_data = aws_tree.awstree_to_syncdata_list()
         giphouse_sync_data = self.get_syncdata_from_giphouse()
         merged_sync_data = self.generate_aws_sync_list(giphouse_sync_data, aws_sync_data)
+        self._advance_task()
 
         course_ou_id = self.get_or_create_course_ou(aws_tree)
         self.attach_policy(course_ou_id, policy_id)
+        self._advance_task()
 
         return self.create_and_move_accounts(merged_sync_data, root_id, course_ou_id)
 
-    def synchronise(self, request):
+    def synchronise(self) -> None:
         """
-        Synchronise projects of the current semester to AWS and notify user of success or potential errors.
+        Synchronise projects of the current semester to AWS and report success or potential errors.
 
-        :param request: HTTP request indicating the synchronization button has been pressed.
+        The outcome is stored in the Task if the synchronisation runs as a Task.
         """
+        fail_message = None
         try:
-            synchronisation_success = self.pipeline()
-
-            if synchronisation_success:
-                messages.success(request, self.SUCCESS_MSG)
-            else:
-                messages.warning(request, self.FAIL_MSG)
+            if not self.pipeline():
+                fail_message = self.FAIL_MSG
         except ClientError as api_error:
-            messages.error(request, self.API_ERROR_MSG)
+            fail_message = self.API_ERROR_MSG
             self.logger.error(api_error)
         except Exception as sync_error:
-            messages.error(request, self.SYNC_ERROR_MSG)
+            fail_message = self.SYNC_ERROR_MSG
             self.logger.error(sync_error)
+
+        if self.task is not None:
+            self.task.fail = fail_message is not None
+            self.task.fail_message = fail_message
+            self.task.success_message = self.SUCCESS_MSG
+            self.task.completed = self.task.total
+            self.task.save()
+
+    def synchronise_as_task(self) -> int:
+        """
+        Synchronise projects of the current semester to AWS as a Task, in a background thread.
+
+        :return: The id of the Task that shows the progress of the synchronisation
+        """
+        self.task = Task.objects.create(
+            total=self.TASK_STAGES, completed=0, redirect_url=reverse("admin:projects_project_changelist")
+        )
+        thread = threading.Thread(target=self.synchronise)
+        thread.start()
+        return self.task.id
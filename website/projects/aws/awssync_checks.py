@@ -1,11 +1,50 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
 
 from projects.aws.awsapitalker import AWSAPITalker
 from projects.aws.awssync_structs import AWSTree
 
 
+class FactCache:
+    """
+    Memoized facts about AWS, such as the caller identity, for a single run of the pipeline preconditions.
+
+    Every fact is requested from AWS at most once, also when multiple threads need it at the same time: the other
+    threads wait for the result of the first one. Failures are memoized as well and raised to every thread.
+    """
+
+    def __init__(self):
+        """Create an empty cache."""
+        self._facts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, function: Callable[[], Any]) -> Any:
+        """
+        Get a fact, calling the function to determine it if it is not known yet.
+
+        :param name: name of the fact.
+        :param function: function that requests the fact from AWS.
+        :return: the fact.
+        """
+        with self._lock:
+            future = self._facts.get(name)
+            is_owner = future is None
+            if is_owner:
+                future = self._facts[name] = Future()
+
+        if is_owner:
+            try:
+                future.set_result(function())
+            except Exception as error:
+                future.set_exception(error)
+        return future.result()
+
+
 class Checks:
     """Class for pipeline checks."""
 
@@ -13,11 +52,25 @@ class Checks:
         """Initialize an instance with an AWSAPITalker and a logger."""
         self.api_talker = AWSAPITalker()
         self.logger = logging.getLogger("django.aws")
+        self.facts = None
+
+    def _fact(self, name: str, function: Callable[[], Any]) -> Any:
+        """Get a fact from the cache of the current precondition run, or from AWS outside of a run."""
+        if self.facts is None:
+            return function()
+        return self.facts.get(name, function)
+
+    def get_caller_identity(self) -> dict:
+        """Get the identity of the AWS API caller."""
+        return self._fact("caller_identity", self.api_talker.get_caller_identity)
+
+    def describe_organization(self) -> dict:
+        """Describe the AWS organization of the AWS API caller."""
+        return self._fact("organization", self.api_talker.describe_organization)
 
     def check_double_iteration_names(self, AWSdata: AWSTree) -> None:
         """Check if there are multiple OU's with the same name in AWS."""
-        names = [iteration.name for iteration in AWSdata.iterations]
-        duplicates = [iteration_name for iteration_name in set(names) if names.count(iteration_name) > 1]
+        duplicates = AWSdata.duplicate_iteration_names()
 
         if duplicates:
             raise Exception(
@@ -26,11 +79,11 @@ class Checks:
 
     def check_aws_api_connection(self) -> None:
         """Check AWS API connection establishment with current boto3 credentials."""
-        self.api_talker.get_caller_identity()
+        self.get_caller_identity()
 
     def check_iam_policy(self, desired_actions: list[str]) -> None:
         """Check permissions for list of AWS API actions."""
-        iam_user_arn = self.api_talker.get_caller_identity()["Arn"]
+        iam_user_arn = self.get_caller_identity()["Arn"]
         policy_evaluations = self.api_talker.simulate_principal_policy(iam_user_arn, desired_actions)
 
         denied_api_actions = [
@@ -44,12 +97,12 @@ class Checks:
 
     def check_organization_existence(self) -> None:
         """Check existence AWS organization."""
-        self.api_talker.describe_organization()
+        self.describe_organization()
 
     def check_is_management_account(self) -> None:
         """Check if AWS API caller has same effective account ID as the organization's management account."""
-        organization_info = self.api_talker.describe_organization()
-        iam_user_info = self.api_talker.get_caller_identity()
+        organization_info = self.describe_organization()
+        iam_user_info = self.get_caller_identity()
 
         management_account_id = organization_info["Organization"]["MasterAccountId"]
         api_caller_account_id = iam_user_info["Account"]
@@ -60,7 +113,7 @@ class Checks:
 
     def check_scp_enabled(self) -> None:
         """Check if SCP policy type feature is enabled for the AWS organization."""
-        organization_info = self.api_talker.describe_organization()
+        organization_info = self.describe_organization()
         available_policy_types = organization_info["Organization"]["AvailablePolicyTypes"]
 
         scp_is_enabled = any(
@@ -75,6 +128,9 @@ class Checks:
         """
         Check all crucial pipeline preconditions. Raises exception prematurely on failure.
 
+        The checks run concurrently and share the facts they request from AWS, so the caller identity and organization
+        are requested once, in parallel. Failures are raised in the order of the preconditions.
+
         Preconditions:
         1. Locatable boto3 credentials and successful AWS API connection
         2. Check allowed AWS API actions based on IAM policy of caller
@@ -90,6 +146,19 @@ class Checks:
             (self.check_scp_enabled, (), "SCP enabled"),
         ]
 
-        for precondition, args, description in preconditions:
-            precondition(*args)
-            self.logger.info(f"Pipeline precondition success: {description}.")
+        self.facts = FactCache()
+        try:
+            with ThreadPoolExecutor(max_workers=len(preconditions)) as pool:
+                futures = [pool.submit(self._timed, precondition, *args) for precondition, args, _ in preconditions]
+                for future, (_, _, description) in zip(futures, preconditions):
+                    duration = future.result()
+                    self.logger.info(f"Pipeline precondition success: {description} ({duration * 1000:.0f} ms).")
+        finally:
+            self.facts = None
+
+    @staticmethod
+    def _timed(function: Callable, *args) -> float:
+        """Call a function and return its duration in seconds."""
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
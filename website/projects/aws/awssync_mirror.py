@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from projects.aws.awsapitalker import AWSAPITalker
+from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
+from projects.models import AWSAccount, AWSOrganizationalUnit
+
+
+class AWSOrganizationMirror:
+    """
+    Local mirror of the OUs below the base OU and their member accounts, stored in the database.
+
+    The OUs below the base OU are listed on every refresh. The accounts of an OU are only listed again if the OU is
+    new, was renamed, or was last listed longer than the TTL ago. Changes made by the sync itself are written through
+    to the mirror, so the OUs of past semesters rarely need to be listed again.
+    """
+
+    def __init__(self, api_talker: AWSAPITalker, ttl: timedelta, max_workers: int = 8):
+        """
+        Create a mirror that refreshes from AWS using the given API talker.
+
+        :param api_talker: AWSAPITalker used to list the organization.
+        :param ttl: Maximum age of the account listing of an OU before it is listed again.
+        :param max_workers: Maximum number of OUs of which the accounts are listed concurrently.
+        """
+        self.api_talker = api_talker
+        self.ttl = ttl
+        self.max_workers = max_workers
+
+    def refresh(self, base_ou_id: str) -> AWSTree:
+        """
+        Refresh the mirror of the OUs below the base OU and get it as AWSTree.
+
+        :param base_ou_id: The ID of the base OU.
+        :return: A AWSTree object containing all the children of the base OU.
+        """
+        mirrored_ous = {ou.ou_id: ou for ou in AWSOrganizationalUnit.objects.filter(parent_id=base_ou_id)}
+        mirrored_account_ids = {}
+        for ou_id, account_id in AWSAccount.objects.filter(organizational_unit__parent_id=base_ou_id).values_list(
+            "organizational_unit__ou_id", "account_id"
+        ):
+            mirrored_account_ids.setdefault(ou_id, set()).add(account_id)
+        stale_before = timezone.now() - self.ttl
+        listed_ou_ids = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            listings = []
+            for ou in self.api_talker.iterate_organizational_units_for_parent(parent_id=base_ou_id):
+                listed_ou_ids.add(ou["Id"])
+                mirrored_ou = mirrored_ous.get(ou["Id"])
+                if (
+                    mirrored_ou is None
+                    or mirrored_ou.name != ou["Name"]
+                    or mirrored_ou.refreshed is None
+                    or mirrored_ou.refreshed < stale_before
+                ):
+                    known_account_ids = mirrored_account_ids.get(ou["Id"], set())
+                    listings.append((ou, pool.submit(self._list_accounts, ou["Id"], known_account_ids)))
+
+            for ou, accounts in listings:
+                self._store_organizational_unit(base_ou_id, ou, accounts.result())
+
+        AWSOrganizationalUnit.objects.filter(parent_id=base_ou_id).exclude(ou_id__in=listed_ou_ids).delete()
+        return self.tree(base_ou_id)
+
+    def _list_accounts(self, ou_id: str, known_account_ids: set[str]) -> list[dict]:
+        """
+        List the accounts of an OU, including the tags of accounts that are not mirrored yet.
+
+        :param ou_id: The ID of the OU.
+        :param known_account_ids: IDs of accounts of which the tags are mirrored already.
+        :return: list of dictionaries containing account information, with the tags of new accounts under 'Tags'.
+        """
+        accounts = list(self.api_talker.iterate_accounts_for_parent(parent_id=ou_id))
+        for account in accounts:
+            if account["Id"] not in known_account_ids:
+                account["Tags"] = self.api_talker.list_tags_for_resource(account["Id"])
+        return accounts
+
+    @transaction.atomic
+    def _store_organizational_unit(self, base_ou_id: str, ou: dict, accounts: list[dict]) -> None:
+        """Replace the mirror of an OU and its accounts by a fresh listing."""
+        organizational_unit, _ = AWSOrganizationalUnit.objects.update_or_create(
+            ou_id=ou["Id"], defaults={"parent_id": base_ou_id, "name": ou["Name"], "refreshed": timezone.now()}
+        )
+        AWSAccount.objects.filter(organizational_unit=organizational_unit).exclude(
+            account_id__in=[account["Id"] for account in accounts]
+        ).delete()
+        for account in accounts:
+            defaults = {"email": account["Email"], "name": account["Name"], "organizational_unit": organizational_unit}
+            if "Tags" in account:
+                defaults["tags"] = {tag["Key"]: tag["Value"] for tag in account["Tags"]}
+            AWSAccount.objects.update_or_create(account_id=account["Id"], defaults=defaults)
+
+    def record_organizational_unit(self, parent_id: str, ou_id: str, name: str) -> None:
+        """Record an OU that was created by the sync, which has no accounts yet."""
+        AWSOrganizationalUnit.objects.update_or_create(
+            ou_id=ou_id, defaults={"parent_id": parent_id, "name": name, "refreshed": timezone.now()}
+        )
+
+    def record_account(self, account_id: str, email: str, name: str, ou_id: str, tags: dict) -> None:
+        """
+        Record an account that was moved to an OU by the sync.
+
+        The account is only recorded if the OU is mirrored, otherwise it is mirrored when the OU is listed.
+        """
+        organizational_unit = AWSOrganizationalUnit.objects.filter(ou_id=ou_id).first()
+        if organizational_unit is not None:
+            AWSAccount.objects.update_or_create(
+                account_id=account_id,
+                defaults={"email": email, "name": name, "organizational_unit": organizational_unit, "tags": tags},
+            )
+
+    @staticmethod
+    def tree(base_ou_id: str) -> AWSTree:
+        """Get the mirrored OUs below the base OU and their accounts as AWSTree."""
+        aws_tree = AWSTree("root", base_ou_id, [])
+        members = {}
+        accounts = AWSAccount.objects.filter(organizational_unit__parent_id=base_ou_id).order_by("id")
+        for ou_id, email, name in accounts.values_list("organizational_unit__ou_id", "email", "name"):
+            members.setdefault(ou_id, []).append(SyncData(email, name))
+        for ou in AWSOrganizationalUnit.objects.filter(parent_id=base_ou_id).order_by("id"):
+            aws_tree.add_iteration(Iteration(ou.name, ou.ou_id, members.get(ou.ou_id, [])))
+        return aws_tree
@@ -2,12 +2,18 @@ from __future__ import annotations
 
 
 class SyncData:
-    """Structure for AWS giphouse sync data."""
+    """Structure for AWS giphouse sync data, which is immutable and hashable."""
+
+    __slots__ = ("project_email", "project_slug")
 
     def __init__(self, project_email: str, project_slug: str) -> None:
         """Create SyncData instance."""
-        self.project_email = project_email
-        self.project_slug = project_slug
+        object.__setattr__(self, "project_email", project_email)
+        object.__setattr__(self, "project_slug", project_slug)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Prevent changes to SyncData, as it is used as key in sets and dictionaries."""
+        raise AttributeError("SyncData is immutable")
 
     def __eq__(self, other: SyncData) -> bool:
         """Overload equals for SyncData type."""
@@ -15,6 +21,10 @@ class SyncData:
             raise TypeError("Must compare to object of type SyncData")
         return self.project_email == other.project_email and self.project_slug == other.project_slug
 
+    def __hash__(self) -> int:
+        """Hash SyncData by its email and slug."""
+        return hash((self.project_email, self.project_slug))
+
     def __repr__(self) -> str:
         """Overload to repr function for SyncData type."""
         return f"SyncData('{self.project_email}', '{self.project_slug}')"
@@ -23,6 +33,8 @@ class SyncData:
 class Iteration:
     """Datatype for AWS data in the Course iteration OU."""
 
+    __slots__ = ("name", "ou_id", "members")
+
     def __init__(self, name: str, ou_id: str, members: list[SyncData]) -> None:
         """Initialize Iteration object."""
         self.name = name
@@ -39,15 +51,30 @@ class Iteration:
             raise TypeError("Must compare to object of type Iteration")
         return self.name == other.name and self.ou_id == other.ou_id and self.members == other.members
 
+    def __hash__(self) -> int:
+        """Hash an Iteration by its name and OU ID, which identify it."""
+        return hash((self.name, self.ou_id))
+
 
 class AWSTree:
-    """Tree structure for AWS data."""
+    """
+    Tree structure for AWS data.
+
+    The iterations are indexed by OU name for constant time lookups. Iterations must be added with add_iteration to
+    keep this index up to date. Members are not indexed, as the members of the tree are only compared with the projects
+    as a whole, by reconcile() on the hashed SyncData.
+    """
+
+    __slots__ = ("name", "ou_id", "iterations", "iterations_by_name")
 
     def __init__(self, name: str, ou_id: str, iterations: list[Iteration]) -> None:
         """Initialize AWSTree object."""
         self.name = name
         self.ou_id = ou_id
-        self.iterations = iterations
+        self.iterations = []
+        self.iterations_by_name = {}
+        for iteration in iterations:
+            self.add_iteration(iteration)
 
     def __repr__(self) -> str:
         """Overload to repr function for AWSTree object."""
@@ -59,6 +86,24 @@ class AWSTree:
             raise TypeError("Must compare to object of type AWSTree")
         return self.name == other.name and self.ou_id == other.ou_id and self.iterations == other.iterations
 
+    def __hash__(self) -> int:
+        """Hash an AWSTree by its name and OU ID, which identify it."""
+        return hash((self.name, self.ou_id))
+
+    def add_iteration(self, iteration: Iteration) -> None:
+        """Add an iteration to the tree and its index."""
+        self.iterations.append(iteration)
+        self.iterations_by_name.setdefault(iteration.name, []).append(iteration)
+
+    def get_iteration(self, name: str) -> Iteration | None:
+        """Get the first iteration with the given OU name, or None if there is none."""
+        iterations = self.iterations_by_name.get(name)
+        return iterations[0] if iterations else None
+
+    def duplicate_iteration_names(self) -> list[str]:
+        """Get the OU names that are used by multiple iterations."""
+        return [name for name, iterations in self.iterations_by_name.items() if len(iterations) > 1]
+
     def awstree_to_syncdata_list(self) -> list[SyncData]:
         """Convert AWSTree to list of SyncData elements."""
         return [member for iteration in self.iterations for member in iteration.members]
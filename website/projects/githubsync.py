@@ -7,12 +7,17 @@ from django.urls import reverse
 
 from github import Github, GithubException, GithubIntegration, UnknownObjectException
 
+from giphousewebsite.reconciler import Executor, reconcile
+
 from projects.models import ProjectToBeDeleted, Repository, RepositoryToBeDeleted
 
 from registrations.models import Employee
 
 from tasks.models import Task
 
+# The GitHub API client is shared by the whole sync, so the members of a team are removed one after another
+member_removal_executor = Executor(batch_size=1)
+
 
 class GitHubAPITalker:
     """Communicate with GitHub API v3."""
@@ -195,10 +200,15 @@ class GitHubSync:
         :param project: The project to use
         """
         github_team = self.github.get_team(project.github_team_id)
-        employee_list = [r[0] for r in project.get_employees().values_list("github_username")]
+        diff = reconcile(
+            project.get_employees().values_list("github_username", flat=True),
+            github_team.get_members(),
+            actual_key=lambda github_user: github_user.login,
+        )
 
-        for github_user in github_team.get_members():
-            if github_user.login not in employee_list:
+        def remove_members(operations):
+            for operation in operations:
+                github_user = operation.actual
                 try:
                     if self.github.get_role_of_user(github_user) != "admin":  # Prevent removing organization owners
                         self.github.remove_user(github_user)
@@ -213,6 +223,8 @@ class GitHubSync:
                 except GithubException:
                     self.error(f"Something went wrong while removing {github_user.name} from team {github_team.name}")
 
+        member_removal_executor.run(diff.removes, remove_members)
+
     def remove_team(self, project):
         """Remove a team for a project from GitHub and remove all employees of the project from the organization."""
         github_team = self.github.get_team(project.github_team_id)
@@ -0,0 +1,176 @@
+import json
+import time
+from collections import Counter
+from functools import wraps
+from unittest.mock import MagicMock
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from moto import mock_iam, mock_organizations, mock_sts
+
+from courses.models import Semester
+
+from mailing_lists.models import MailingList
+
+from projects.aws.awsapitalker import client_provider
+from projects.aws.awssync import AWSSync
+from projects.models import AWSPolicy, Project
+
+# Pipeline stages that are timed, by the name of the AWSSync or Checks method that implements them.
+STAGES = (
+    "pipeline_preconditions",
+    "refresh_aws_setup",
+    "get_syncdata_from_giphouse",
+    "generate_aws_sync_list",
+    "get_or_create_course_ou",
+    "attach_policy",
+    "create_and_move_accounts",
+)
+
+
+class Command(BaseCommand):
+    """Command to benchmark the AWS sync pipeline against an organization mocked by moto."""
+
+    help = "Benchmark the AWS sync pipeline against a generated organization mocked by moto, writing JSON results"
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument("--semesters", type=int, default=10, help="Number of generated past semester OUs")
+        parser.add_argument(
+            "--accounts", type=int, default=40, help="Number of generated member accounts per past semester"
+        )
+        parser.add_argument(
+            "--projects", type=int, default=200, help="Number of generated projects in the current semester"
+        )
+        parser.add_argument("--output", help="File to write the JSON results to, standard output if not specified")
+
+    def handle(self, *args, **options):
+        """Seed a mocked organization and the database, run the pipeline and report the results."""
+        with mock_organizations(), mock_sts(), mock_iam():
+            client_provider.clear()
+            try:
+                with transaction.atomic():
+                    results = self.run_benchmark(options["semesters"], options["accounts"], options["projects"])
+                    transaction.set_rollback(True)
+            finally:
+                client_provider.clear()
+
+        results["parameters"] = {key: options[key] for key in ("semesters", "accounts", "projects")}
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def run_benchmark(self, number_of_semesters, accounts_per_semester, number_of_projects):
+        """
+        Run the pipeline once on generated data, which is created in the current transaction.
+
+        :return: Dictionary of results
+        """
+        sync = AWSSync()
+        sync.ACCOUNT_REQUEST_INTERVAL_SECONDS = 0
+        sync.logger = sync.checker.logger = MagicMock()
+        # moto does not simulate IAM policies, so every action is allowed.
+        sync.checker.api_talker.simulate_principal_policy = lambda arn, action_names: {
+            "EvaluationResults": [{"EvalActionName": action, "EvalDecision": "allowed"} for action in action_names]
+        }
+
+        self.seed_organization(sync, number_of_semesters, accounts_per_semester)
+        self.seed_projects(number_of_projects)
+
+        durations = {}
+        for stage in STAGES:
+            owner = sync.checker if stage == "pipeline_preconditions" else sync
+            setattr(owner, stage, self.timed(getattr(owner, stage), stage, durations))
+
+        api_calls = Counter()
+        clients = (sync.api_talker.iam_client, sync.api_talker.org_client, sync.api_talker.sts_client)
+        for client in clients:
+            client.meta.events.register("before-call.*.*", self.counter(api_calls), unique_id="benchmark")
+
+        try:
+            start = time.perf_counter()
+            success = sync.pipeline()
+            total = time.perf_counter() - start
+        finally:
+            for client in clients:
+                client.meta.events.unregister("before-call.*.*", unique_id="benchmark")
+
+        return {
+            "success": success,
+            "total_seconds": total,
+            "stages_seconds": durations,
+            "api_calls_total": sum(api_calls.values()),
+            "api_calls": dict(sorted(api_calls.items())),
+        }
+
+    @staticmethod
+    def seed_organization(sync, number_of_semesters, accounts_per_semester):
+        """Create the mocked organization with its policy and the OUs and accounts of past semesters."""
+        api_talker = sync.api_talker
+        api_talker.create_organization("ALL")
+        root_id = api_talker.list_roots()[0]["Id"]
+        policy = api_talker.org_client.create_policy(
+            Name="DenyAll",
+            Description="Deny all access.",
+            Content=json.dumps(
+                {"Version": "2012-10-17", "Statement": [{"Effect": "Deny", "Action": "*", "Resource": "*"}]}
+            ),
+            Type="SERVICE_CONTROL_POLICY",
+        )
+        AWSPolicy.objects.create(
+            policy_id=policy["Policy"]["PolicySummary"]["Id"],
+            base_ou_id=root_id,
+            is_current_policy=True,
+            tags_key="no_permissions",
+            tags_value="true",
+        )
+
+        for i in range(number_of_semesters):
+            ou = api_talker.create_organizational_unit(root_id, f"Past semester {i}", [])
+            ou_id = ou["OrganizationalUnit"]["Id"]
+            for j in range(accounts_per_semester):
+                account = api_talker.create_account(f"past-{i}-{j}@giphouse.nl", f"past-{i}-{j}", [])
+                api_talker.move_account(account["CreateAccountStatus"]["AccountId"], root_id, ou_id)
+
+    @staticmethod
+    def seed_projects(number_of_projects):
+        """Create projects of the current semester that each have a mailing list."""
+        semester = Semester.objects.get_or_create_current_semester()
+        projects = Project.objects.bulk_create(
+            Project(name=f"Benchmark {i}", slug=f"benchmark-{i}", semester=semester, description="")
+            for i in range(number_of_projects)
+        )
+        mailing_lists = MailingList.objects.bulk_create(
+            MailingList(address=f"benchmark-{i}") for i in range(number_of_projects)
+        )
+        MailingList.projects.through.objects.bulk_create(
+            MailingList.projects.through(mailinglist=mailing_list, project=project)
+            for mailing_list, project in zip(mailing_lists, projects)
+        )
+
+    @staticmethod
+    def timed(function, stage, durations):
+        """Wrap a function so the total time spent in it is added to the durations of the stage."""
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                durations[stage] = durations.get(stage, 0) + time.perf_counter() - start
+
+        return wrapper
+
+    @staticmethod
+    def counter(api_calls):
+        """Get a botocore event handler that counts the API calls per service operation."""
+
+        def count(model, **kwargs):
+            api_calls[f"{model.service_model.service_name}.{model.name}"] += 1
+
+        return count
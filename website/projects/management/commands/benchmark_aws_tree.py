@@ -0,0 +1,80 @@
+from random import Random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from projects.aws.awssync import AWSSync
+from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
+
+
+class Command(BaseCommand):
+    """Command to benchmark the in-memory AWS sync structures on a generated organization."""
+
+    help = "Benchmark building, diffing and checking a generated AWS organization tree"
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument("--iterations", type=int, default=20, help="Number of generated course iteration OUs")
+        parser.add_argument("--accounts", type=int, default=5000, help="Total number of generated member accounts")
+        parser.add_argument(
+            "--new", type=float, default=0.1, help="Fraction of projects in GiPHouse that has no account yet"
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Number of times every operation is timed")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated organization")
+
+    def handle(self, *args, **options):
+        """Run the benchmarks and report the best time of every operation."""
+        random = Random(options["seed"])
+        iterations = self.generate_iterations(options["iterations"], options["accounts"])
+        current_members = iterations[-1].members if iterations else []
+        giphouse_data = current_members + [
+            SyncData(f"new-project-{i}@giphouse.nl", f"new-project-{i}")
+            for i in range(round(len(current_members) * options["new"]))
+        ]
+        random.shuffle(giphouse_data)
+
+        sync = AWSSync()
+        tree = AWSTree("root", "r-0000", iterations)
+        aws_data = tree.awstree_to_syncdata_list()
+        last_name = iterations[-1].name if iterations else ""
+
+        self.stdout.write(
+            f"AWS tree with {options['iterations']} OUs and {len(aws_data)} accounts, "
+            f"{len(giphouse_data)} GiPHouse projects"
+        )
+        for operation, function in (
+            ("Build tree", lambda: AWSTree("root", "r-0000", iterations)),
+            ("Tree to sync data", tree.awstree_to_syncdata_list),
+            ("Generate sync list", lambda: sync.generate_aws_sync_list(giphouse_data, aws_data)),
+            ("Find course OU", lambda: tree.get_iteration(last_name)),
+            ("Check double names", lambda: sync.checker.check_double_iteration_names(tree)),
+            ("Set of sync data", lambda: set(aws_data)),
+        ):
+            self.stdout.write(f"  {operation + ':':<20}{self.time(function, options['repeat']) * 1000:.3f} ms")
+
+    @staticmethod
+    def generate_iterations(number_of_iterations, number_of_accounts):
+        """
+        Generate course iteration OUs, the accounts are spread evenly over the OUs.
+
+        :return: List of Iteration
+        """
+        accounts_per_iteration = number_of_accounts // max(number_of_iterations, 1)
+        return [
+            Iteration(
+                f"Semester {i}",
+                f"ou-{i:04d}",
+                [SyncData(f"project-{i}-{j}@giphouse.nl", f"project-{i}-{j}") for j in range(accounts_per_iteration)],
+            )
+            for i in range(number_of_iterations)
+        ]
+
+    @staticmethod
+    def time(function, repeat):
+        """Get the best wall time of calling a function, in seconds."""
+        durations = []
+        for _ in range(max(repeat, 1)):
+            start = perf_counter()
+            function()
+            durations.append(perf_counter() - start)
+        return min(durations)
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.13 on 2026-10-19 04:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0016_awspolicy_base_ou_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AWSOrganizationalUnit",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("ou_id", models.CharField(max_length=68, unique=True)),
+                ("parent_id", models.CharField(max_length=68)),
+                ("name", models.CharField(max_length=128)),
+                (
+                    "refreshed",
+                    models.DateTimeField(
+                        blank=True, help_text="When the accounts of this OU were last listed from AWS.", null=True
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "AWS organizational unit",
+            },
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="aws_account_id",
+            field=models.CharField(
+                blank=True,
+                help_text="This is the id of the AWS member account of this project.",
+                max_length=12,
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="AWSAccount",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("account_id", models.CharField(max_length=12, unique=True)),
+                ("email", models.EmailField(max_length=254)),
+                ("name", models.CharField(max_length=50)),
+                ("tags", models.JSONField(blank=True, default=dict)),
+                (
+                    "organizational_unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="projects.awsorganizationalunit"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "AWS account",
+            },
+        ),
+    ]
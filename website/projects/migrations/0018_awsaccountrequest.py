@@ -0,0 +1,48 @@
+# Generated by Django 4.1.13 on 2026-10-19 04:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0017_aws_organization_mirror"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AWSAccountRequest",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("request_id", models.CharField(max_length=68, unique=True)),
+                ("email", models.EmailField(max_length=254)),
+                ("slug", models.CharField(max_length=50)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to="projects.project"
+                    ),
+                ),
+                ("destination_ou_id", models.CharField(max_length=68)),
+                (
+                    "state",
+                    models.IntegerField(
+                        choices=[(0, "Creation in progress"), (1, "Created"), (2, "Moved"), (3, "Failed")], default=0
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of times the status of the request was looked up, over all runs of the sync.",
+                    ),
+                ),
+                ("account_id", models.CharField(blank=True, max_length=12, null=True)),
+                ("failure_reason", models.CharField(blank=True, default="", max_length=50)),
+            ],
+            options={
+                "verbose_name": "AWS account request",
+            },
+        ),
+    ]
@@ -38,6 +38,78 @@ class AWSPolicy(models.Model):
         return f"{self.policy_id}"
 
 
+class AWSOrganizationalUnit(models.Model):
+    """Local mirror of an organizational unit in the AWS organization."""
+
+    class Meta:
+        """Meta class for AWSOrganizationalUnit model."""
+
+        verbose_name = "AWS organizational unit"
+
+    ou_id = models.CharField(max_length=68, unique=True)
+    parent_id = models.CharField(max_length=68)
+    name = models.CharField(max_length=128)
+    refreshed = models.DateTimeField(
+        null=True, blank=True, help_text="When the accounts of this OU were last listed from AWS."
+    )
+
+    def __str__(self):
+        """Return OU name and id."""
+        return f"{self.name} ({self.ou_id})"
+
+
+class AWSAccount(models.Model):
+    """Local mirror of a member account in the AWS organization."""
+
+    class Meta:
+        """Meta class for AWSAccount model."""
+
+        verbose_name = "AWS account"
+
+    account_id = models.CharField(max_length=12, unique=True)
+    email = models.EmailField()
+    name = models.CharField(max_length=50)
+    organizational_unit = models.ForeignKey(AWSOrganizationalUnit, on_delete=models.CASCADE)
+    tags = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        """Return account email and id."""
+        return f"{self.email} ({self.account_id})"
+
+
+class AWSAccountRequest(models.Model):
+    """Journal entry of a request to create a member account, so an interrupted sync can resume it."""
+
+    class Meta:
+        """Meta class for AWSAccountRequest model."""
+
+        verbose_name = "AWS account request"
+
+    class State(models.IntegerChoices):
+        """Progress of the creation of a member account."""
+
+        IN_PROGRESS = 0, "Creation in progress"
+        CREATED = 1, "Created"
+        MOVED = 2, "Moved"
+        FAILED = 3, "Failed"
+
+    request_id = models.CharField(max_length=68, unique=True)
+    email = models.EmailField()
+    slug = models.CharField(max_length=50)
+    project = models.ForeignKey("Project", on_delete=models.SET_NULL, null=True, blank=True)
+    destination_ou_id = models.CharField(max_length=68)
+    state = models.IntegerField(choices=State.choices, default=State.IN_PROGRESS)
+    attempts = models.PositiveIntegerField(
+        default=0, help_text="Number of times the status of the request was looked up, over all runs of the sync."
+    )
+    account_id = models.CharField(max_length=12, null=True, blank=True)
+    failure_reason = models.CharField(max_length=50, default="", blank=True)
+
+    def __str__(self):
+        """Return account email and request id."""
+        return f"{self.email} ({self.request_id})"
+
+
 class Client(models.Model):
     """Project client with logo."""
 
@@ -82,6 +154,14 @@ class Project(models.Model):
         help_text="This is the id of the team in the GitHub organization. ",
     )
 
+    aws_account_id = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="This is the id of the AWS member account of this project.",
+    )
+
     def __str__(self):
         """Return project name and semester."""
         return f"{self.name} ({self.semester})"
@@ -235,9 +235,11 @@ class GetProjectsTest(TestCase):
         self.project_admin.synchronise_to_GitHub = original_sync_action
 
     def test_synchronise_to_AWS(self):
+        self.aws_mock.return_value.synchronise_as_task.return_value = 1
         with patch("projects.admin.AWSSync", self.aws_mock):
-            self.project_admin.synchronise_to_AWS(self.request)
+            response = self.project_admin.synchronise_to_AWS(self.request)
         self.aws_mock.assert_called_once()
+        self.assertEqual(response.url, reverse("admin:progress_bar", kwargs={"task": 1}))
 
     def test_archive_all_repositories(self):
         self.project_admin.archive_all_repositories(self.request, Project.objects.all())
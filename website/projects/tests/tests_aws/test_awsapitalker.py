@@ -15,6 +15,7 @@ class AWSAPITalkerTest(TestCase):
 
     def setUp(self):
         """Set up testing environment."""
+        awsapitalker.client_provider.clear()
         self.api_talker = awsapitalker.AWSAPITalker()
 
     def create_organization(self):
@@ -41,6 +42,14 @@ class AWSAPITalkerTest(TestCase):
             Description="Policy for testing purposes",
         )["Policy"]["PolicySummary"]["Id"]
 
+    def test_client_provider(self):
+        self.assertIs(awsapitalker.AWSAPITalker().org_client, self.api_talker.org_client)
+        self.assertEqual(self.api_talker.org_client.meta.config.retries["mode"], "adaptive")
+        self.assertEqual(self.api_talker.org_client.meta.config.max_pool_connections, 16)
+
+        awsapitalker.client_provider.clear()
+        self.assertIsNot(awsapitalker.AWSAPITalker().org_client, self.api_talker.org_client)
+
     def test_create_organization(self):
         response = self.api_talker.create_organization("ALL")
 
@@ -165,6 +174,30 @@ class AWSAPITalkerTest(TestCase):
 
         self.assertEqual(expected_emails, received_emails)
 
+    def test_list_accounts_for_parent__multiple_pages(self):
+        self.create_organization()
+        root_id = self.api_talker.list_roots()[0]["Id"]
+        for i in range(45):
+            self.api_talker.create_account(f"test{i}@example.com", f"Test Account {i}")
+
+        with patch.object(
+            self.api_talker.org_client,
+            "list_accounts_for_parent",
+            wraps=self.api_talker.org_client.list_accounts_for_parent,
+        ) as list_accounts:
+            received_accounts = self.api_talker.iterate_accounts_for_parent(root_id)
+            first_account = next(received_accounts)
+            self.assertEqual(list_accounts.call_count, 1)
+            received_accounts = [first_account] + list(received_accounts)
+
+        self.assertEqual(len(received_accounts), 46)
+        self.assertEqual(list_accounts.call_count, 3)
+        self.assertEqual(list_accounts.call_args_list[0].kwargs["MaxResults"], 20)
+
+    def test_combine_pages(self):
+        pages = [{"Accounts": [1, 2]}, {"Accounts": []}, {"Accounts": [3]}]
+        self.assertEqual(self.api_talker.combine_pages(iter(pages), "Accounts"), [1, 2, 3])
+
     def test_list_tags_for_resource(self):
         org_id = self.create_organization()
 
@@ -1,11 +1,15 @@
 """Tests for awssync.py."""
 import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, patch
 
 
 from botocore.exceptions import ClientError
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -15,12 +19,16 @@ from courses.models import Semester
 
 from mailing_lists.models import MailingList
 
+from projects.aws.awsapitalker import client_provider
 from projects.aws.awssync import AWSSync
 from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
-from projects.models import AWSPolicy, Project
+from projects.management.commands.benchmark_aws_sync import STAGES
+from projects.models import AWSAccount, AWSAccountRequest, AWSPolicy, Project
 
 from registrations.models import Employee
 
+from tasks.models import Task
+
 User: Employee = get_user_model()
 
 
@@ -37,6 +45,7 @@ class QuietAWSSync(AWSSync):
 class AWSSyncTest(TestCase):
     def setUp(self):
         """Set up testing environment."""
+        client_provider.clear()
         self.sync = AWSSync()
         self.api_talker = self.sync.api_talker
 
@@ -76,7 +85,7 @@ class AWSSyncTest(TestCase):
 
     def test_get_syncdata_from_giphouse_normal(self):
         """Test get_emails_with_teamids function in optimal conditions."""
-        self.semester = Semester.objects.create(year=2023, season=Semester.SPRING)
+        self.semester = Semester.objects.get_or_create_current_semester()
         for i in range(3):
             self.mailing_list = MailingList.objects.create(address="test" + str(i))
             self.project = Project.objects.create(
@@ -95,6 +104,36 @@ class AWSSyncTest(TestCase):
         ]
         self.assertEqual(email_id, expected_result)
 
+    def test_get_syncdata_from_giphouse_multiple_mailing_lists(self):
+        semester = Semester.objects.get_or_create_current_semester()
+        for i in range(3):
+            project = Project.objects.create(name=f"test{i}", semester=semester, slug=f"test{i}")
+            MailingList.objects.create(address=f"test{i}").projects.add(project)
+            MailingList.objects.create(address=f"test{i}-extra").projects.add(project)
+
+        with self.assertNumQueries(2):
+            sync_data = self.sync.get_syncdata_from_giphouse()
+
+        self.assertEqual(
+            sync_data,
+            [
+                SyncData("test0@giphouse.nl", "test0"),
+                SyncData("test1@giphouse.nl", "test1"),
+                SyncData("test2@giphouse.nl", "test2"),
+            ],
+        )
+
+    def test_get_syncdata_from_giphouse_existing_account(self):
+        semester = Semester.objects.get_or_create_current_semester()
+        for i in range(2):
+            project = Project.objects.create(name=f"test{i}", semester=semester, slug=f"test{i}")
+            MailingList.objects.create(address=f"test{i}").projects.add(project)
+        Project.objects.filter(slug="test0").update(aws_account_id="123456789012")
+
+        sync_data = self.sync.get_syncdata_from_giphouse()
+
+        self.assertEqual(sync_data, [SyncData("test1@giphouse.nl", "test1")])
+
     def test_get_syncdata_from_giphouse_no_project(self):
         """Test get_emails_with_teamids function where the mailinglist is not assigned to a project"""
         MailingList.objects.all().delete()
@@ -149,25 +188,6 @@ class AWSSyncTest(TestCase):
         aws_list = [test2, test3]
         self.assertEquals(self.sync.generate_aws_sync_list(gip_list, aws_list), [test1])
 
-    def test_extract_aws_setup(self):
-        self.sync.api_talker.create_organization(feature_set="ALL")
-        root_id = self.api_talker.list_roots()[0]["Id"]
-
-        ou_response = self.api_talker.create_organizational_unit(root_id, "OU_1")
-        ou_id = ou_response["OrganizationalUnit"]["Id"]
-
-        account_response = self.api_talker.create_account("account_1@gmail.com", "account_1")
-        account_id = account_response["CreateAccountStatus"]["AccountId"]
-        self.api_talker.move_account(account_id=account_id, source_parent_id=root_id, dest_parent_id=ou_id)
-
-        aws_tree = self.sync.extract_aws_setup(root_id)
-
-        expected_sync_data = [SyncData("account_1@gmail.com", "account_1")]
-        expected_iteration = Iteration("OU_1", ou_id, expected_sync_data)
-        expected_tree = AWSTree("root", root_id, [expected_iteration])
-
-        self.assertEqual(aws_tree, expected_tree)
-
     def test_get_or_create_course_ou__new(self):
         self.sync.api_talker.create_organization(feature_set="ALL")
         root_id = self.sync.api_talker.list_roots()[0]["Id"]
@@ -248,6 +268,23 @@ class AWSSyncTest(TestCase):
         self.assertIsInstance(current_policy_id, str)
         self.assertEqual(current_policy_id, self.policy_id2.policy_id)
 
+    def test_get_current_policy__once_per_pipeline_run(self):
+        policy = AWSPolicy.objects.create(
+            policy_id="p-123456", base_ou_id="o-123456", tags_key="key", is_current_policy=True
+        )
+
+        with self.assertNumQueries(1):
+            self.sync.get_current_base_ou_id()
+            self.sync.get_current_policy_id()
+            self.sync.get_current_policy_tag()
+
+        policy.policy_id = "p-654321"
+        policy.save()
+        self.assertEqual(self.sync.get_current_policy_id(), "p-123456")
+        with patch.object(self.sync.api_talker, "list_roots", side_effect=Exception("Stop")):
+            self.assertRaises(Exception, self.sync.pipeline)
+        self.assertEqual(self.sync.get_current_policy_id(), "p-654321")
+
     def test_get_current_policy__no_current_policy(self):
         self.policy_id1 = AWSPolicy.objects.create(
             policy_id="Test-Policy1", tags_key="Test-Policy-Id1", is_current_policy=False
@@ -291,6 +328,152 @@ class AWSSyncTest(TestCase):
         self.assertTrue(success)
         self.assertNotIn({"Key": "no_permissions", "Value": "true"}, tags_alice + tags_bob)
 
+    def test_create_move_account__records_account(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        dest_ou_id = self.sync.get_or_create_course_ou(AWSTree("root", root_id, []))
+        semester = Semester.objects.get_or_create_current_semester()
+        project = Project.objects.create(name="Alice", semester=semester, slug="alices-project")
+
+        self.setup_policy()
+        success = self.sync.create_and_move_accounts(
+            [SyncData("alice@giphouse.nl", "alices-project")], root_id, dest_ou_id
+        )
+
+        account = AWSAccount.objects.get()
+        project.refresh_from_db()
+        self.assertTrue(success)
+        self.assertEqual(project.aws_account_id, account.account_id)
+        self.assertEqual(account.organizational_unit.ou_id, dest_ou_id)
+        self.assertEqual(account.tags, {"AutoCreated": ""})
+        self.assertEqual(
+            self.sync.mirror.tree(root_id),
+            AWSTree(
+                "root",
+                root_id,
+                [Iteration(str(semester), dest_ou_id, [SyncData("alice@giphouse.nl", "alices-project")])],
+            ),
+        )
+
+    def test_create_move_account__resume_in_progress(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        dest_ou_id = self.sync.api_talker.create_organizational_unit(root_id, "destination_ou")["OrganizationalUnit"][
+            "Id"
+        ]
+        self.setup_policy()
+        response = self.sync.api_talker.create_account(
+            "alice@giphouse.nl", "alices-project", [{"Key": "no_permissions", "Value": "true"}]
+        )
+        AWSAccountRequest.objects.create(
+            request_id=response["CreateAccountStatus"]["Id"],
+            email="alice@giphouse.nl",
+            slug="alices-project",
+            destination_ou_id=dest_ou_id,
+        )
+        members = [SyncData("alice@giphouse.nl", "alices-project"), SyncData("bob@giphouse.nl", "bobs-project")]
+
+        with patch.object(self.sync.api_talker, "create_account", wraps=self.sync.api_talker.create_account) as create:
+            success = self.sync.create_and_move_accounts(members, root_id, dest_ou_id)
+
+        course_accounts = self.sync.api_talker.list_accounts_for_parent(dest_ou_id)
+        self.assertTrue(success)
+        self.assertEqual([call.args[0] for call in create.call_args_list], ["bob@giphouse.nl"])
+        self.assertCountEqual(
+            [account["Email"] for account in course_accounts], ["alice@giphouse.nl", "bob@giphouse.nl"]
+        )
+        self.assertEqual(
+            list(AWSAccountRequest.objects.values_list("state", flat=True)), [AWSAccountRequest.State.MOVED] * 2
+        )
+
+    def test_create_move_account__resume_created(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        dest_ou_id = self.sync.api_talker.create_organizational_unit(root_id, "destination_ou")["OrganizationalUnit"][
+            "Id"
+        ]
+        self.setup_policy()
+        response = self.sync.api_talker.create_account(
+            "alice@giphouse.nl", "alices-project", [{"Key": "no_permissions", "Value": "true"}]
+        )
+        project = Project.objects.create(
+            name="Alice", semester=Semester.objects.get_or_create_current_semester(), slug="alices-project"
+        )
+        request = AWSAccountRequest.objects.create(
+            request_id=response["CreateAccountStatus"]["Id"],
+            email="alice@giphouse.nl",
+            slug="alices-project",
+            project=project,
+            destination_ou_id=dest_ou_id,
+            state=AWSAccountRequest.State.CREATED,
+            account_id=response["CreateAccountStatus"]["AccountId"],
+        )
+        other_request = AWSAccountRequest.objects.create(
+            request_id="car-other",
+            email="bob@giphouse.nl",
+            slug="alices-project",
+            destination_ou_id="ou-other",
+            state=AWSAccountRequest.State.CREATED,
+            account_id="123456789012",
+        )
+
+        with patch("projects.aws.awssync.time.sleep") as sleep:
+            success = self.sync.create_and_move_accounts([], root_id, dest_ou_id)
+
+        request.refresh_from_db()
+        other_request.refresh_from_db()
+        project.refresh_from_db()
+        self.assertTrue(success)
+        sleep.assert_not_called()
+        self.assertEqual(request.state, AWSAccountRequest.State.MOVED)
+        self.assertEqual(other_request.state, AWSAccountRequest.State.CREATED)
+        self.assertEqual(project.aws_account_id, request.account_id)
+        self.assertEqual(self.sync.api_talker.list_accounts_for_parent(dest_ou_id)[0]["Id"], request.account_id)
+        self.assertNotIn({"Key": "no_permissions", "Value": "true"}, self.get_tags_for_account("alice@giphouse.nl"))
+
+    def test_create_move_account__resume_already_moved(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        self.setup_policy()
+        request = AWSAccountRequest.objects.create(
+            request_id="car-1",
+            email="alice@giphouse.nl",
+            slug="alices-project",
+            destination_ou_id="ou-1",
+            state=AWSAccountRequest.State.CREATED,
+            account_id="123456789012",
+        )
+        duplicate = ClientError({"Error": {"Code": "DuplicateAccountException"}}, "MoveAccount")
+
+        with patch.object(self.sync.api_talker, "move_account", side_effect=duplicate), patch.object(
+            self.sync.api_talker, "untag_resource"
+        ) as untag:
+            success = self.sync.create_and_move_accounts([], root_id, "ou-1")
+
+        request.refresh_from_db()
+        self.assertTrue(success)
+        untag.assert_called_once_with("123456789012", ["no_permissions"])
+        self.assertEqual(request.state, AWSAccountRequest.State.MOVED)
+
+    def test_create_move_account__concurrent(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+
+        dest_ou = self.sync.api_talker.create_organizational_unit(root_id, "destination_ou")
+        dest_ou_id = dest_ou["OrganizationalUnit"]["Id"]
+        members = [SyncData(f"user{i}@giphouse.nl", f"project-{i}") for i in range(7)]
+
+        self.setup_policy()
+        self.sync.ACCOUNT_REQUEST_MAX_CONCURRENT = 3
+        with patch("projects.aws.awssync.time.sleep") as sleep:
+            success = self.sync.create_and_move_accounts(members, root_id, dest_ou_id)
+
+        course_accounts = self.sync.api_talker.list_accounts_for_parent(dest_ou_id)
+
+        self.assertTrue(success)
+        self.assertEqual(sleep.call_count, 3)
+        self.assertCountEqual([account["Email"] for account in course_accounts], [m.project_email for m in members])
+
     def test_create_move_account__exception_move(self):
         self.sync.api_talker.create_organization(feature_set="ALL")
         root_id = self.sync.api_talker.list_roots()[0]["Id"]
@@ -339,6 +522,56 @@ class AWSSyncTest(TestCase):
         self.assertIn({"Key": "no_permissions", "Value": "true"}, tags_alice)
         self.assertIn({"Key": "no_permissions", "Value": "true"}, tags_bob)
 
+    def test_create_move_account__describe_not_found(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        self.setup_policy()
+        AWSAccountRequest.objects.create(
+            request_id="car-purged", email="alice@giphouse.nl", slug="alices-project", destination_ou_id="ou-1"
+        )
+        not_found = ClientError(
+            {"Error": {"Code": "CreateAccountStatusNotFoundException"}}, "DescribeCreateAccountStatus"
+        )
+
+        with patch.object(self.sync.api_talker, "describe_create_account_status", side_effect=not_found):
+            success = self.sync.create_and_move_accounts([], root_id, "ou-1")
+
+        self.assertFalse(success)
+        self.assertEqual(
+            list(AWSAccountRequest.objects.values_list("state", "failure_reason", "attempts")),
+            [(AWSAccountRequest.State.FAILED, "CreateAccountStatusNotFoundException", 1)],
+        )
+
+    def test_create_move_account__max_total_attempts(self):
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        self.setup_policy()
+        AWSAccountRequest.objects.create(
+            request_id="car-1", email="alice@giphouse.nl", slug="alices-project", destination_ou_id="ou-1", attempts=28
+        )
+        AWSAccountRequest.objects.create(
+            request_id="car-2", email="bob@giphouse.nl", slug="bobs-project", destination_ou_id="ou-1", attempts=29
+        )
+
+        def describe_create_account_status(request_id):
+            if request_id == "car-2":
+                raise ClientError({}, "DescribeCreateAccountStatus")
+            return {"CreateAccountStatus": {"State": "IN_PROGRESS"}}
+
+        with patch.object(
+            self.sync.api_talker, "describe_create_account_status", side_effect=describe_create_account_status
+        ):
+            success = self.sync.create_and_move_accounts([], root_id, "ou-1")
+
+        self.assertFalse(success)
+        self.assertEqual(
+            list(AWSAccountRequest.objects.order_by("id").values_list("state", "failure_reason", "attempts")),
+            [
+                (AWSAccountRequest.State.FAILED, "MAX_ATTEMPTS_EXCEEDED", 30),
+                (AWSAccountRequest.State.FAILED, "MAX_ATTEMPTS_EXCEEDED", 30),
+            ],
+        )
+
     def test_create_move_account__failed(self):
         self.sync.api_talker.create_organization(feature_set="ALL")
         root_id = self.sync.api_talker.list_roots()[0]["Id"]
@@ -359,6 +592,10 @@ class AWSSyncTest(TestCase):
             success = self.sync.create_and_move_accounts(members, root_id, dest_ou_id)
 
         self.assertFalse(success)
+        self.assertEqual(
+            list(AWSAccountRequest.objects.values_list("state", "failure_reason")),
+            [(AWSAccountRequest.State.FAILED, "EMAIL_ALREADY_EXISTS")] * 2,
+        )
 
     def test_create_move_account__in_progress(self):
         self.sync.api_talker.create_organization(feature_set="ALL")
@@ -385,6 +622,9 @@ class AWSSyncTest(TestCase):
         self.assertFalse(success)
         self.assertIn({"Key": "no_permissions", "Value": "true"}, tags_alice)
         self.assertIn({"Key": "no_permissions", "Value": "true"}, tags_bob)
+        self.assertEqual(
+            list(AWSAccountRequest.objects.values_list("state", flat=True)), [AWSAccountRequest.State.IN_PROGRESS] * 2
+        )
 
     def test_pipeline__no_accounts_no_ou(self):
         self.sync.checker.api_talker.simulate_principal_policy = MagicMock(
@@ -439,16 +679,25 @@ class AWSSyncTest(TestCase):
         self.assertTrue(pipeline_success)
         self.assertEqual(["alice@giphouse.nl", "bob@giphouse.nl"], course_account_emails)
 
+    def synchronise_through_admin(self):
+        with patch("projects.aws.awssync.threading.Thread", side_effect=lambda target: MagicMock(start=target)):
+            response = self.client.get(reverse("admin:synchronise_to_aws"))
+
+        task = Task.objects.get()
+        self.assertRedirects(response, reverse("admin:progress_bar", args=[task.id]), fetch_redirect_response=False)
+        self.assertEqual(task.completed, task.total)
+        return self.client.get(reverse("admin:result", args=[task.id]), follow=True)
+
     def test_synchronise__success(self):
         with patch("projects.aws.awssync.AWSSync.pipeline", return_value=True):
-            response = self.client.get(reverse("admin:synchronise_to_aws"), follow=True)
+            response = self.synchronise_through_admin()
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.sync.SUCCESS_MSG)
 
     def test_synchronise__failure(self):
         with patch("projects.aws.awssync.AWSSync.pipeline", return_value=False):
-            response = self.client.get(reverse("admin:synchronise_to_aws"), follow=True)
+            response = self.synchronise_through_admin()
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.sync.FAIL_MSG)
@@ -456,7 +705,7 @@ class AWSSyncTest(TestCase):
     def test_synchronise__api_error(self):
         api_error = ClientError({"Error": {"Code": "AccessDeniedException"}}, "create_organization")
         with patch("projects.aws.awssync.AWSSync.pipeline", side_effect=api_error):
-            response = self.client.get(reverse("admin:synchronise_to_aws"), follow=True)
+            response = self.synchronise_through_admin()
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.sync.API_ERROR_MSG)
@@ -465,7 +714,73 @@ class AWSSyncTest(TestCase):
         sync_error = Exception("Synchronization Error")
 
         with patch("projects.aws.awssync.AWSSync.pipeline", side_effect=sync_error):
-            response = self.client.get(reverse("admin:synchronise_to_aws"), follow=True)
+            response = self.synchronise_through_admin()
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.sync.SYNC_ERROR_MSG)
+
+    def test_synchronise__without_task(self):
+        with patch("projects.aws.awssync.AWSSync.pipeline", return_value=False):
+            self.sync.synchronise()
+
+        self.assertIsNone(self.sync.task)
+        self.assertFalse(Task.objects.exists())
+
+    def test_synchronise__task_progress(self):
+        self.sync.task = Task.objects.create(total=self.sync.TASK_STAGES, completed=0, redirect_url="/")
+        self.sync.checker.api_talker.simulate_principal_policy = MagicMock(
+            return_value={"EvaluationResults": [{"EvalDecision": "allowed"}]}
+        )
+        self.sync.api_talker.create_organization(feature_set="ALL")
+        self.setup_policy()
+        root_id = self.sync.api_talker.list_roots()[0]["Id"]
+        self.sync.get_syncdata_from_giphouse = MagicMock(
+            return_value=[
+                SyncData("alice@giphouse.nl", "alices-project"),
+                SyncData("bob@giphouse.nl", "bobs-project"),
+            ]
+        )
+
+        progress = []
+        save = self.sync.task.save
+        with patch.object(
+            self.sync.task, "save", side_effect=lambda: progress.append(self.sync.task.completed) or save()
+        ):
+            with patch("projects.aws.awssync.AWSSync.get_current_base_ou_id", return_value=root_id):
+                self.sync.synchronise()
+
+        self.assertEqual(progress, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.sync.task.total, 6)
+        self.assertFalse(self.sync.task.fail)
+
+
+class BenchmarkAWSSyncCommandTest(TestCase):
+    def test_benchmark(self):
+        out = StringIO()
+
+        call_command("benchmark_aws_sync", "--semesters=2", "--accounts=3", "--projects=4", stdout=out)
+
+        results = json.loads(out.getvalue())
+        self.assertTrue(results["success"])
+        self.assertEqual(results["parameters"], {"semesters": 2, "accounts": 3, "projects": 4})
+        self.assertEqual(set(results["stages_seconds"]), set(STAGES))
+        self.assertEqual(results["api_calls"]["organizations.CreateAccount"], 4)
+        self.assertEqual(results["api_calls"]["organizations.ListAccountsForParent"], 2)
+        self.assertEqual(results["api_calls_total"], sum(results["api_calls"].values()))
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(AWSPolicy.objects.exists())
+
+    def test_benchmark__output_file(self):
+        out = StringIO()
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            call_command(
+                "benchmark_aws_sync", "--semesters=1", "--accounts=1", "--projects=1", f"--output={path}", stdout=out
+            )
+            with open(path) as file:
+                results = json.load(file)
+
+        self.assertEqual(out.getvalue(), "")
+        self.assertTrue(results["success"])
+        self.assertEqual(results["parameters"], {"semesters": 1, "accounts": 1, "projects": 1})
@@ -1,5 +1,7 @@
 """Tests for awssync/checks.py."""
-from unittest.mock import MagicMock
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
 
 from botocore.exceptions import ClientError
 
@@ -7,7 +9,8 @@ from django.test import TestCase
 
 from moto import mock_iam, mock_organizations, mock_sts
 
-from projects.aws.awssync_checks import Checks
+from projects.aws.awsapitalker import client_provider
+from projects.aws.awssync_checks import Checks, FactCache
 from projects.aws.awssync_checks_permissions import api_permissions
 from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
 
@@ -17,6 +20,7 @@ from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
 @mock_iam
 class ChecksTest(TestCase):
     def setUp(self):
+        client_provider.clear()
         self.checks = Checks()
         self.aws_tree1 = AWSTree(
             "AWS Tree",
@@ -177,3 +181,67 @@ class ChecksTest(TestCase):
         )
 
         self.checks.pipeline_preconditions(api_permissions)
+
+    def test_pipeline_preconditions__facts_requested_once(self):
+        self.checks.api_talker.create_organization("ALL")
+        self.checks.api_talker.iam_client.simulate_principal_policy = self.mock_simulate_principal_policy(
+            True, api_permissions
+        )
+        sts_client = self.checks.api_talker.sts_client
+        org_client = self.checks.api_talker.org_client
+
+        with patch.object(sts_client, "get_caller_identity", wraps=sts_client.get_caller_identity) as identity:
+            with patch.object(
+                org_client, "describe_organization", wraps=org_client.describe_organization
+            ) as organization:
+                self.checks.pipeline_preconditions(api_permissions)
+
+        identity.assert_called_once()
+        organization.assert_called_once()
+        self.assertIsNone(self.checks.facts)
+        self.assertIn("ms).", self.checks.logger.info.call_args.args[0])
+
+    def test_pipeline_preconditions__first_failure_raised(self):
+        self.checks.api_talker.iam_client.simulate_principal_policy = self.mock_simulate_principal_policy(
+            False, api_permissions
+        )
+
+        with self.assertRaisesRegex(Exception, "denied"):
+            self.checks.pipeline_preconditions(api_permissions)
+
+
+class FactCacheTest(TestCase):
+    def test_get(self):
+        facts = FactCache()
+        function = MagicMock(return_value="fact")
+
+        self.assertEqual(facts.get("fact", function), "fact")
+        self.assertEqual(facts.get("fact", function), "fact")
+        function.assert_called_once()
+
+    def test_get_failure(self):
+        facts = FactCache()
+        function = MagicMock(side_effect=ValueError("Oh no!"))
+
+        self.assertRaises(ValueError, facts.get, "fact", function)
+        self.assertRaises(ValueError, facts.get, "fact", function)
+        function.assert_called_once()
+
+    def test_get_concurrent(self):
+        facts = FactCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fact():
+            started.set()
+            release.wait(5)
+            return "fact"
+
+        function = MagicMock(side_effect=slow_fact)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(facts.get, "fact", function)
+            started.wait(5)
+            second = pool.submit(facts.get, "fact", function)
+            release.set()
+            self.assertEqual((first.result(), second.result()), ("fact", "fact"))
+        function.assert_called_once()
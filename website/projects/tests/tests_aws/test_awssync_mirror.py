@@ -0,0 +1,111 @@
+"""Tests for awssync_mirror.py."""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from moto import mock_organizations, mock_sts
+
+from projects.aws.awsapitalker import AWSAPITalker, client_provider
+from projects.aws.awssync_mirror import AWSOrganizationMirror
+from projects.aws.awssync_structs import AWSTree, Iteration, SyncData
+from projects.models import AWSAccount, AWSOrganizationalUnit
+
+
+@mock_organizations
+@mock_sts
+class AWSOrganizationMirrorTest(TestCase):
+    def setUp(self):
+        client_provider.clear()
+        self.api_talker = AWSAPITalker()
+        self.api_talker.create_organization("ALL")
+        self.root_id = self.api_talker.list_roots()[0]["Id"]
+        self.mirror = AWSOrganizationMirror(self.api_talker, timedelta(days=1))
+
+        self.ou_1 = self.create_ou("OU_1")
+        self.ou_2 = self.create_ou("OU_2")
+        self.account_1 = self.create_account("account_1", self.ou_1)
+        self.account_2 = self.create_account("account_2", self.ou_2)
+
+    def create_ou(self, name):
+        return self.api_talker.create_organizational_unit(self.root_id, name, [])["OrganizationalUnit"]["Id"]
+
+    def create_account(self, name, ou_id):
+        account_id = self.api_talker.create_account(f"{name}@giphouse.nl", name, [{"Key": "tag", "Value": name}])[
+            "CreateAccountStatus"
+        ]["AccountId"]
+        self.api_talker.move_account(account_id, self.root_id, ou_id)
+        return account_id
+
+    def refresh(self):
+        with patch.object(
+            self.api_talker, "iterate_accounts_for_parent", wraps=self.api_talker.iterate_accounts_for_parent
+        ) as iterate_accounts:
+            tree = self.mirror.refresh(self.root_id)
+        return tree, sorted(call.kwargs["parent_id"] for call in iterate_accounts.call_args_list)
+
+    def test_refresh(self):
+        tree, listed = self.refresh()
+
+        self.assertEqual(
+            tree,
+            AWSTree(
+                "root",
+                self.root_id,
+                [
+                    Iteration("OU_1", self.ou_1, [SyncData("account_1@giphouse.nl", "account_1")]),
+                    Iteration("OU_2", self.ou_2, [SyncData("account_2@giphouse.nl", "account_2")]),
+                ],
+            ),
+        )
+        self.assertEqual(listed, sorted([self.ou_1, self.ou_2]))
+        self.assertEqual(
+            AWSAccount.objects.get(account_id=self.account_1).tags, {"tag": "account_1", "AutoCreated": ""}
+        )
+
+    def test_refresh__within_ttl(self):
+        self.refresh()
+        self.create_account("account_3", self.ou_1)
+
+        tree, listed = self.refresh()
+
+        self.assertEqual(listed, [])
+        self.assertEqual(len(tree.awstree_to_syncdata_list()), 2)
+
+    def test_refresh__stale_or_renamed(self):
+        self.refresh()
+        self.create_account("account_3", self.ou_1)
+        AWSOrganizationalUnit.objects.filter(ou_id=self.ou_1).update(refreshed=timezone.now() - timedelta(days=2))
+        AWSOrganizationalUnit.objects.filter(ou_id=self.ou_2).update(name="Old name")
+
+        tree, listed = self.refresh()
+
+        self.assertEqual(listed, sorted([self.ou_1, self.ou_2]))
+        self.assertIn(SyncData("account_3@giphouse.nl", "account_3"), tree.get_iteration("OU_1").members)
+        self.assertIsNotNone(tree.get_iteration("OU_2"))
+
+    def test_refresh__removed(self):
+        self.refresh()
+        self.api_talker.move_account(self.account_1, self.ou_1, self.root_id)
+        AWSOrganizationalUnit.objects.filter(ou_id=self.ou_1).update(refreshed=None)
+        self.api_talker.move_account(self.account_2, self.ou_2, self.root_id)
+        self.api_talker.org_client.delete_organizational_unit(OrganizationalUnitId=self.ou_2)
+
+        tree, _ = self.refresh()
+
+        self.assertEqual(tree, AWSTree("root", self.root_id, [Iteration("OU_1", self.ou_1, [])]))
+        self.assertFalse(AWSAccount.objects.exists())
+
+    def test_record(self):
+        self.refresh()
+        ou_3 = self.create_ou("OU_3")
+        self.mirror.record_organizational_unit(self.root_id, ou_3, "OU_3")
+        self.mirror.record_account("123456789012", "new@giphouse.nl", "new", ou_3, {"AutoCreated": ""})
+        self.mirror.record_account("123456789013", "other@giphouse.nl", "other", "ou-unknown", {})
+
+        tree, listed = self.refresh()
+
+        self.assertEqual(listed, [])
+        self.assertEqual(tree.get_iteration("OU_3").members, [SyncData("new@giphouse.nl", "new")])
+        self.assertFalse(AWSAccount.objects.filter(account_id="123456789013").exists())
@@ -1,8 +1,11 @@
 """Tests for awssync_structs.py."""
+from io import StringIO
 
+from django.core.management import call_command
 from django.test import TestCase
 
 from projects.aws import awssync
+from projects.aws.awssync_structs import Iteration
 
 
 class SyncDataTest(TestCase):
@@ -16,6 +19,16 @@ class SyncDataTest(TestCase):
         """Test Type Error when equals is called on wrong type."""
         self.assertRaises(TypeError, self.sync("a", "b").__eq__, 123)
 
+    def test_hash_SyncData(self):
+        self.assertEqual(len({self.sync("a", "b"), self.sync("a", "b"), self.sync("a", "c")}), 2)
+
+    def test_immutable_SyncData(self):
+        sync_data = self.sync("a", "b")
+        with self.assertRaises(AttributeError):
+            sync_data.project_slug = "c"
+        with self.assertRaises(AttributeError):
+            sync_data.other = "c"
+
 
 class AWSSyncListTest(TestCase):
     """Test AWSSyncList class."""
@@ -55,7 +68,7 @@ class AWSTreeChecksTest(TestCase):
     def setUp(self):
         self.sync = awssync.AWSSync()
         self.awstree = awssync.AWSTree("Name", "1234", [])
-        self.iteration = awssync.Iteration("Name", "1234", [])
+        self.iteration = Iteration("Name", "1234", [])
         self.sync_data = awssync.SyncData("email@example.com", "Project X")
 
         self.treelist = [
@@ -69,7 +82,7 @@ class AWSTreeChecksTest(TestCase):
             "AWS Tree",
             "12345",
             [
-                awssync.Iteration(
+                Iteration(
                     "Fall 2020",
                     "54321",
                     [
@@ -77,7 +90,7 @@ class AWSTreeChecksTest(TestCase):
                         awssync.SyncData("email2@example.com", "project2"),
                     ],
                 ),
-                awssync.Iteration(
+                Iteration(
                     "Spring 2021",
                     "98765",
                     [
@@ -92,7 +105,7 @@ class AWSTreeChecksTest(TestCase):
             "AWS Tree",
             "12345",
             [
-                awssync.Iteration(
+                Iteration(
                     "Fall 2020",
                     "54321",
                     [
@@ -100,7 +113,7 @@ class AWSTreeChecksTest(TestCase):
                         awssync.SyncData("email2@example.com", "project2"),
                     ],
                 ),
-                awssync.Iteration(
+                Iteration(
                     "Spring 2020",
                     "98765",
                     [
@@ -131,4 +144,29 @@ class AWSTreeChecksTest(TestCase):
     def test_Iteration_equals(self):
         self.assertEqual(self.aws_tree1.iterations[0], self.aws_tree1.iterations[0])
         self.assertNotEqual(self.aws_tree1.iterations[0], self.aws_tree1.iterations[1])
-        self.assertRaises(TypeError, awssync.Iteration("", "", []).__eq__, [])
+        self.assertRaises(TypeError, Iteration("", "", []).__eq__, [])
+
+    def test_hash_AWSTree_Iteration(self):
+        self.assertEqual(hash(self.aws_tree1), hash(awssync.AWSTree("AWS Tree", "12345", [])))
+        self.assertIn(self.aws_tree1.iterations[0], set(self.aws_tree2.iterations))
+
+    def test_AWSTree_indexes(self):
+        tree = awssync.AWSTree("AWS Tree", "12345", self.aws_tree1.iterations[:1])
+        tree.add_iteration(self.aws_tree1.iterations[1])
+        tree.add_iteration(Iteration("Fall 2020", "11111", []))
+
+        self.assertIs(tree.get_iteration("Fall 2020"), self.aws_tree1.iterations[0])
+        self.assertIsNone(tree.get_iteration("Fall 2021"))
+        self.assertEqual(tree.duplicate_iteration_names(), ["Fall 2020"])
+        self.assertEqual(tree.awstree_to_syncdata_list(), self.treelist)
+
+
+class BenchmarkAWSTreeCommandTest(TestCase):
+    def test_benchmark(self):
+        out = StringIO()
+
+        call_command("benchmark_aws_tree", "--iterations=4", "--accounts=100", "--repeat=1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("AWS tree with 4 OUs and 100 accounts, 27 GiPHouse projects", output)
+        self.assertIn("Generate sync list:", output)
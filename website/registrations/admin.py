@@ -1,10 +1,12 @@
 import csv
+import os
 from io import StringIO
 
 from admin_auto_filters.filters import AutocompleteFilter
 
 from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
 from django.contrib.auth import get_user_model
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
@@ -105,6 +107,18 @@ class UserAdmin(admin.ModelAdmin):
     # Necessary for the autocomplete filter
     search_fields = ("first_name", "last_name", "student_number", "github_username")
 
+    def get_search_results(self, request, queryset, search_term):
+        """Only suggest users of the current semester in the autocomplete of the users of a mailing list."""
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if (
+            request.GET.get("app_label") == "mailing_lists"
+            and request.GET.get("model_name") == "mailinglist"
+            and request.GET.get("field_name") == "users"
+        ):
+            queryset = queryset.filter(registration__semester=Semester.objects.get_or_create_current_semester())
+            may_have_duplicates = True
+        return queryset, may_have_duplicates
+
     def get_current_project(self, obj):
         """Return current project."""
         registration = obj.registration_set.first()
@@ -214,7 +228,17 @@ class UserAdmin(admin.ModelAdmin):
             messages.warning(request, "All users should have a registration in the same semester.")
             return
 
-        task = TeamAssignmentGenerator(registrations).start_solve_task()
+        form = TeamAssignmentSolverForm(request.POST if "apply" in request.POST else None)
+        if not form.is_valid():
+            payload = {
+                "form": form,
+                "queryset": queryset,
+                "action_checkbox_name": ACTION_CHECKBOX_NAME,
+                "title": "Generate project assignment proposal",
+            }
+            return render(request, "admin/registrations/team-assignment.html", payload)
+
+        task = TeamAssignmentGenerator(registrations, **form.cleaned_data).start_solve_task()
         return redirect("admin:progress_bar", task=task.id)
 
     def get_urls(self):
@@ -230,6 +254,29 @@ class UserAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
 
+class TeamAssignmentSolverForm(forms.Form):
+    """Form used to configure the solver when generating a project assignment proposal."""
+
+    num_workers = forms.IntegerField(
+        min_value=1,
+        initial=os.cpu_count,
+        label="Workers",
+        help_text="Number of parallel search workers, by default all available cores.",
+    )
+    time_limit = forms.FloatField(
+        min_value=1,
+        initial=180,
+        label="Time limit",
+        help_text="Maximum number of seconds to search for better solutions.",
+    )
+    random_seed = forms.IntegerField(min_value=0, initial=0, label="Random seed")
+    fix_assigned = forms.BooleanField(
+        required=False,
+        label="Keep current projects",
+        help_text="Keep users that are assigned to a project in that project, and only assign the other users.",
+    )
+
+
 class CsvImportForm(forms.Form):
     """Form used when importing a csv group assignment."""
 
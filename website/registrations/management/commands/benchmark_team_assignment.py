@@ -0,0 +1,189 @@
+import logging
+from random import Random
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ortools.sat.python import cp_model
+
+from courses.models import Course, Semester
+
+from projects.models import Project
+
+from registrations.models import Registration
+from registrations.team_assignment import TeamAssignmentGenerator
+
+User = get_user_model()
+
+
+class DenseTeamAssignmentGenerator(TeamAssignmentGenerator):
+    """
+    Team assignment generator with the dense partner preference objective, as a baseline for the benchmark.
+
+    A 'together' variable is created for every pair of registrations in every project, also for pairs without any
+    preference for each other, and linked to the assignment variables by a multiplication equality.
+    """
+
+    def _partner_preference_objective(self):
+        """Create the partner preference objective with a variable for every pair of registrations in every project."""
+        weights = self._preferred_partner_weights()
+        registrations = [("engineer", r) for r in range(len(self.engineers))] + [
+            ("manager", r) for r in range(len(self.managers))
+        ]
+
+        objective = []
+        for i, registration1 in enumerate(registrations):
+            for registration2 in registrations[i:]:
+                for p in range(len(self.projects)):
+                    together = self.model.NewBoolVar(
+                        f"{registration1[0]}_{registration1[1]}_together_in_project_{p}_with_"
+                        f"{registration2[0]}_{registration2[1]}"
+                    )
+                    self.model.AddMultiplicationEquality(
+                        together,
+                        [self._assigned_variable(registration1, p), self._assigned_variable(registration2, p)],
+                    )
+                    objective.append(weights.get((registration1, registration2), 0) * together)
+
+        return sum(objective)
+
+
+class Command(BaseCommand):
+    """Command to benchmark the team assignment generator on generated registrations."""
+
+    help = "Benchmark building and solving the team assignment model for generated registrations"
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument("--engineers", type=int, default=120, help="Number of generated engineer registrations")
+        parser.add_argument("--managers", type=int, default=30, help="Number of generated manager registrations")
+        parser.add_argument("--projects", type=int, default=15, help="Number of generated projects")
+        parser.add_argument(
+            "--time-limit", type=float, default=60.0, help="Maximum number of seconds the solver may take"
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated registrations")
+        parser.add_argument(
+            "--skip-baseline",
+            action="store_true",
+            help="Do not build and solve the model with the dense partner preference objective for comparison",
+        )
+
+    def handle(self, *args, **options):
+        """Generate registrations, build and solve the model and report its size and timings."""
+        if options["verbosity"] < 2:
+            logging.getLogger("automaticteams").setLevel(logging.WARNING)
+
+        with transaction.atomic():
+            self.run_benchmark(options)
+            transaction.set_rollback(True)
+
+    def run_benchmark(self, options):
+        """Run the benchmark on generated data, which is created in the current transaction."""
+        registrations = self.generate_registrations(
+            Random(options["seed"]), options["engineers"], options["managers"], options["projects"]
+        )
+
+        # Match the partner preferences to users once up front, so the matching is not timed as part of the first
+        # model that is built. The matched users are cached on the registrations.
+        start = perf_counter()
+        matched_partners = sum(
+            user is not None
+            for registration in registrations
+            for user in (
+                registration.partner_preference1_user,
+                registration.partner_preference2_user,
+                registration.partner_preference3_user,
+            )
+        )
+        matching = perf_counter() - start
+
+        results = [("Sparse", self.measure(TeamAssignmentGenerator, registrations, options["time_limit"]))]
+        if not options["skip_baseline"]:
+            results.append(("Dense", self.measure(DenseTeamAssignmentGenerator, registrations, options["time_limit"])))
+
+        self.stdout.write(
+            f"{options['engineers']} engineers and {options['managers']} managers in {options['projects']} projects"
+        )
+        self.stdout.write(f"  {'Matched partners:':<24}{matched_partners} in {matching:.3f} s")
+        for name, result in results:
+            self.stdout.write(f"{name} partner preference objective")
+            self.stdout.write(f"  {'Variables:':<24}{result['variables']}")
+            self.stdout.write(f"  {'Constraints:':<24}{result['constraints']}")
+            self.stdout.write(f"  {'Build model:':<24}{result['building']:.3f} s")
+            self.stdout.write(f"  {'Solve model:':<24}{result['solving']:.3f} s ({result['status']})")
+            if result["objective"] is not None:
+                self.stdout.write(f"  {'Objective:':<24}{result['objective']:.0f}")
+                self.stdout.write(f"  {'Best bound:':<24}{result['bound']:.0f}")
+
+    @staticmethod
+    def measure(generator_class, registrations, time_limit):
+        """
+        Build and solve the model of a team assignment generator and measure its size and timings.
+
+        :return: Dictionary of results
+        """
+        start = perf_counter()
+        generator = generator_class(registrations)
+        building = perf_counter() - start
+        model = generator.model.Proto()
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        start = perf_counter()
+        status = solver.Solve(generator.model)
+        solving = perf_counter() - start
+
+        solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        return {
+            "variables": len(model.variables),
+            "constraints": len(model.constraints),
+            "building": building,
+            "solving": solving,
+            "status": solver.StatusName(status),
+            "objective": solver.ObjectiveValue() if solved else None,
+            "bound": solver.BestObjectiveBound() if solved else None,
+        }
+
+    @staticmethod
+    def generate_registrations(random, number_of_engineers, number_of_managers, number_of_projects):
+        """
+        Generate projects and registrations of the current semester with project and partner preferences.
+
+        Registrations are generated in groups of friends, who prefer each other as partners.
+
+        :return: List of Registration
+        """
+        semester = Semester.objects.get_or_create_current_semester()
+        projects = Project.objects.bulk_create(
+            Project(name=f"Benchmark {i}", slug=f"benchmark-{i}", semester=semester, description="")
+            for i in range(number_of_projects)
+        )
+        users = User.objects.bulk_create(
+            User(github_id=-1 - i, github_username=f"benchmark-{i}", first_name=f"Student{i}", last_name="Benchmark")
+            for i in range(number_of_engineers + number_of_managers)
+        )
+        courses = [Course.objects.se()] * number_of_engineers + [Course.objects.sdm()] * number_of_managers
+
+        registrations = []
+        for i, (user, course) in enumerate(zip(users, courses)):
+            group = [other for other in users[i - i % 4 : i - i % 4 + 4] if other != user]
+            partners = [other.get_full_name() for other in random.sample(group, random.randint(0, len(group)))]
+            preferences = random.sample(projects, min(3, len(projects)))
+            registrations.append(
+                Registration(
+                    user=user,
+                    course=course,
+                    semester=semester,
+                    experience=random.choice(Registration.EXPERIENCE_CHOICES)[0],
+                    is_international=random.random() < 0.2,
+                    preference1=preferences[0] if preferences else None,
+                    preference2=preferences[1] if len(preferences) > 1 else None,
+                    preference3=preferences[2] if len(preferences) > 2 else None,
+                    partner_preference1=partners[0] if partners else None,
+                    partner_preference2=partners[1] if len(partners) > 1 else None,
+                    partner_preference3=partners[2] if len(partners) > 2 else None,
+                )
+            )
+        return Registration.objects.bulk_create(registrations)
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.13 on 2026-10-19 05:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0018_awsaccountrequest"),
+        (
+            "registrations",
+            "0010_rename_available_during_scheduled_timeslot_registration_available_during_scheduled_timeslot_1_and_mo",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="registration",
+            name="proposed_project",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The project proposed by the last generated project assignment.",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="projects.project",
+            ),
+        ),
+    ]
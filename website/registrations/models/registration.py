@@ -42,6 +42,16 @@ class Registration(models.Model):
     preference2 = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
     preference3 = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
 
+    proposed_project = models.ForeignKey(
+        Project,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        help_text="The project proposed by the last generated project assignment.",
+    )
+
     partner_preference1 = models.CharField(null=True, blank=True, max_length=50)
     partner_preference2 = models.CharField(null=True, blank=True, max_length=50)
     partner_preference3 = models.CharField(null=True, blank=True, max_length=50)
@@ -1,6 +1,9 @@
 import csv
 import logging
+import os
 import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from io import StringIO
 
 from django.urls import reverse
@@ -39,16 +42,72 @@ CSV_STRUCTURE = [
 ]
 
 
+class SolutionProgress(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback that keeps track of the last improving solution found by the solver.
+
+    The solver calls the callback from its own threads, so the progress is only kept in memory and is written to the
+    Task by the thread that waits for the solver.
+    """
+
+    def __init__(self):
+        """Create a callback for which no solution has been found yet."""
+        super().__init__()
+        self.lock = threading.Lock()
+        self.solutions = 0
+        self.objective = None
+        self.bound = None
+        self.wall_time = 0.0
+
+    def on_solution_callback(self):
+        """Store the objective and bound of an improving solution."""
+        with self.lock:
+            self.solutions += 1
+            self.objective = self.ObjectiveValue()
+            self.bound = self.BestObjectiveBound()
+            self.wall_time = self.WallTime()
+
+    def message(self):
+        """Describe the last solution found, including the gap between its objective and the best bound."""
+        with self.lock:
+            if self.objective is None:
+                return "Searching for a first solution"
+            gap = abs(self.bound - self.objective) / max(abs(self.objective), 1)
+            return (
+                f"Solution {self.solutions} found after {self.wall_time:.1f} seconds: objective {self.objective:.0f}, "
+                f"bound {self.bound:.0f}, gap {gap:.1%}"
+            )
+
+
 class TeamAssignmentGenerator:
     """Team assignment generator to solve the team assignment as a CSP."""
 
-    def __init__(self, registrations):
-        """Get all required data to create a team assignment for a certain semester."""
+    # Seconds between updates of the progress in the Task, which is also when a request to stop is noticed.
+    PROGRESS_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, registrations, num_workers=None, time_limit=180.0, random_seed=0, fix_assigned=False):
+        """
+        Get all required data to create a team assignment for a certain semester.
+
+        :param registrations: The registrations to assign to the projects of their semester.
+        :param num_workers: Number of parallel search workers of the solver, all available cores if not given.
+        :param time_limit: Maximum number of seconds the solver may search for better solutions.
+        :param random_seed: Seed of the randomness of the solver.
+        :param fix_assigned: Keep registrations that are assigned to a project in that project, so only the other
+        registrations are assigned.
+        """
         self.semester = registrations[0].semester
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.random_seed = random_seed
+        self.fix_assigned = fix_assigned
 
         self.managers = [registration for registration in registrations if registration.course == Course.objects.sdm()]
         self.engineers = [registration for registration in registrations if registration.course == Course.objects.se()]
         self.projects = list(Project.objects.filter(semester=self.semester).order_by("?").all())
+        # The first projects get the most places, so give those to the projects that already have the most people.
+        assigned_per_project = Counter(registration.project_id for registration in self.managers + self.engineers)
+        self.projects.sort(key=lambda project: assigned_per_project[project.pk], reverse=True)
 
         self.engineers_per_project = list(
             len(range(len(self.engineers))[i :: len(self.projects)]) for i in range(len(self.projects))
@@ -57,10 +116,11 @@ class TeamAssignmentGenerator:
             len(range(len(self.managers))[i :: len(self.projects)]) for i in range(len(self.projects))
         )
         self.task = Task.objects.create(
-            total=1, completed=0, redirect_url=reverse("admin:registrations_employee_changelist")
+            total=1, completed=0, can_stop=True, redirect_url=reverse("admin:registrations_employee_changelist")
         )
 
         self.logger = logging.getLogger("automaticteams")
+        self.progress = None
 
         self._set_up_model()
 
@@ -85,12 +145,82 @@ class TeamAssignmentGenerator:
         self.logger.info("Maximizing objectives")
         self.model.Maximize(sum(self._get_objectives()))
 
+        self.logger.info("Adding hints")
+        self._add_hints()
+
+    def _add_hints(self):
+        """
+        Hint the solver with a complete assignment to start its search from.
+
+        Registrations are hinted to the project they are assigned to, or else to the project proposed for them by the
+        previous run. The other registrations are greedily hinted to their first project preference that is not full
+        yet, and otherwise to the project with the most places left.
+        """
+        for registrations, assigned, per_project in (
+            (self.managers, self.assigned_managers, self.managers_per_project),
+            (self.engineers, self.assigned_engineers, self.engineers_per_project),
+        ):
+            hinted_projects = self._greedy_assignment(registrations, per_project)
+            for r in range(len(registrations)):
+                for p in range(len(self.projects)):
+                    self.model.AddHint(assigned[(r, p)], int(hinted_projects[r] == p))
+
+    def _greedy_assignment(self, registrations, per_project):
+        """
+        Greedily assign registrations to projects, respecting the number of places per project where possible.
+
+        :param registrations: The registrations to assign.
+        :param per_project: The number of places in each project.
+        :return: dict of the index of each registration to the index of the project it is assigned to.
+        """
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        places_left = list(per_project)
+        assignment = {}
+
+        for r, registration in enumerate(registrations):
+            for project_id in (registration.project_id, registration.proposed_project_id):
+                if project_id in project_index:
+                    assignment[r] = project_index[project_id]
+                    places_left[assignment[r]] -= 1
+                    break
+
+        for r, registration in enumerate(registrations):
+            if r in assignment or not self.projects:
+                continue
+            preferences = [
+                project_index[project_id]
+                for project_id in (
+                    registration.preference1_id,
+                    registration.preference2_id,
+                    registration.preference3_id,
+                )
+                if project_id in project_index
+            ]
+            available = [p for p in preferences if places_left[p] > 0]
+            assignment[r] = available[0] if available else max(range(len(self.projects)), key=places_left.__getitem__)
+            places_left[assignment[r]] -= 1
+
+        return assignment
+
     def generate_team_assignment(self):
-        """Try to solve the CSP and return the generated assignment if feasible."""
+        """
+        Try to solve the CSP and return the generated assignment if feasible.
+
+        While the solver runs, the progress of the Task shows the last improving solution. If a stop of the Task is
+        requested, the search is stopped and the best solution found so far is used.
+        """
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 180.0
-        self.logger.info("Solve team constraints")
-        status = solver.Solve(self.model)
+        solver.parameters.num_workers = self.num_workers
+        solver.parameters.max_time_in_seconds = self.time_limit
+        solver.parameters.random_seed = self.random_seed
+        self.progress = SolutionProgress()
+        self.logger.info(f"Solve team constraints with {self.num_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            solving = pool.submit(solver.Solve, self.model, self.progress)
+            while not wait([solving], timeout=self.PROGRESS_INTERVAL_SECONDS).done:
+                self._report_progress(solver)
+            status = solving.result()
         self.logger.debug(f"{solver.ResponseStats()}")
 
         return (
@@ -99,6 +229,13 @@ class TeamAssignmentGenerator:
             else []
         )
 
+    def _report_progress(self, solver):
+        """Show the progress of the solver in the Task and stop the search if a stop of the Task was requested."""
+        Task.objects.filter(pk=self.task.pk).update(message=self.progress.message())
+        if Task.objects.filter(pk=self.task.pk, stop_requested=True).exists():
+            self.logger.info("Stop of the search requested")
+            solver.StopSearch()
+
     def _get_project_assignment_from_solved_model(self, solver):
         """Convert a solved model to a dict for registrations to assigned projects."""
         project_for_registrations = {}
@@ -170,15 +307,30 @@ class TeamAssignmentGenerator:
         if not project_for_registrations:
             self.logger.error("No solution found")
             self.task.fail = True
+            if self.fix_assigned:
+                self.task.fail_message = (
+                    "No assignment was found that keeps the users that are assigned to a project in their project."
+                )
         else:
             self.logger.info("Create csv output")
             output = StringIO()
             self.write_csv(output, project_for_registrations)
             self.task.data = output.getvalue()
+            self._store_proposal(project_for_registrations)
             self.task.success_message = "Successfully assigned all users to a project"
+            if self.progress is not None:
+                self.task.success_message += f". {self.progress.message()}."
         self.task.completed = 1
         self.task.save()
 
+    def _store_proposal(self, project_for_registrations):
+        """Store the proposed project of each registration, to start the search from when generating it again."""
+        registrations_for_project = {}
+        for registration, project in project_for_registrations.items():
+            registrations_for_project.setdefault(project, []).append(registration)
+        for project, registrations in registrations_for_project.items():
+            Registration.objects.filter(pk__in=registrations).update(proposed_project=project)
+
     def start_solve_task(self):
         """Start the automatic creation of teams in a background task."""
         thread = threading.Thread(target=self.execute_solve_task)
@@ -194,6 +346,8 @@ class TeamAssignmentGenerator:
         self._unique_project_per_registration_constraint()
         self._engineers_managers_per_project_constraint()
         self._1_not_international_per_project_constraint()
+        if self.fix_assigned:
+            self._assigned_registrations_constraint()
 
     def _unique_project_per_registration_constraint(self):
         """Add the constraint that each registration is assigned at least 1 project."""
@@ -214,6 +368,17 @@ class TeamAssignmentGenerator:
                 == self.engineers_per_project[p]
             )
 
+    def _assigned_registrations_constraint(self):
+        """Add the constraint that registrations that are assigned to a project stay in that project."""
+        project_index = {project.pk: p for p, project in enumerate(self.projects)}
+        for registrations, assigned in (
+            (self.managers, self.assigned_managers),
+            (self.engineers, self.assigned_engineers),
+        ):
+            for r, registration in enumerate(registrations):
+                if registration.project_id in project_index:
+                    self.model.Add(assigned[(r, project_index[registration.project_id])] == 1)
+
     def _1_not_international_per_project_constraint(self):
         """Add the constraint that each project should have at least 1 not-international manager."""
         is_international = {}
@@ -376,201 +541,75 @@ class TeamAssignmentGenerator:
         """
         Create partial objective function for partner preference in project assignment.
 
-        Because we are limited to linear expressions for our  objective functions, we introduce new variables for each
-        pair of registrations, that define the fact whether these two people are assigned to the same project. By
-        adding constraints to the model, we assure the correct boolean value of those 2 variables.
-
-        Since engineers and managers are assigned and indexed separately, we need to consider 3 separate cases:
-        - an engineer being in the same project as another engineer
-        - a manager being in the same project as another manager
-        - an engineer being in the same project as a manager
-
-        Then, we define a dict that contains for each of these facts, whether it is preferred by a user or not and we
-        acknowledge a certain weight to that fact. This weight is calculated by dividing the total amount of weight a
-        person gets (12) and dividing it by the amount of preferences it has. Since the 'preferred partner relation'
-        is not symmetric, we consider 4 cases here:
-        - an engineer being in the same project as a preferred fellow engineer
-        - a manager being in the same project as a preferred fellow manager
-        - an engineer being in the same project as a preferred manager
-        - a manager being in the same project as a preferred engineer
-
-        The objective is then formed by the sum of the 'preferredness' of all the true facts for all assigned managers
-        and engineers over the different projects that can be assigned.
-        """
-        self.logger.info("Creating partner preference objective")
+        Because we are limited to linear expressions for our objective functions, we introduce new variables for each
+        pair of registrations in which at least one prefers the other as partner, that define the fact whether these
+        two people are assigned to the same project. Pairs without any preference do not contribute to the objective,
+        so no variables are created for them. Each student names at most 3 partners, so the number of variables grows
+        linearly with the number of registrations instead of quadratically.
 
-        # Set up extra boolean variables for the case: engineer - engineer
-        engineer_together_in_project_with_engineer = {}
-        for e1 in range(len(self.engineers)):
-            for e2 in range(e1, len(self.engineers)):
-                for p in range(len(self.projects)):
-                    engineer_together_in_project_with_engineer[(e1, e2, p)] = self.model.NewBoolVar(
-                        f"engineer_{e1}_together_in_project_{p}_with_engineer_{e2}"
-                    )
-                    engineer_together_in_project_with_engineer[
-                        (e2, e1, p)
-                    ] = engineer_together_in_project_with_engineer[(e1, e2, p)]
-                    self.model.AddMultiplicationEquality(
-                        engineer_together_in_project_with_engineer[(e1, e2, p)],
-                        [self.assigned_engineers[(e1, p)], self.assigned_engineers[(e2, p)]],
-                    )
+        The weight of a preference is calculated by dividing the total amount of weight a person gets (12) by the
+        amount of preferences it has. Since the 'preferred partner relation' is not symmetric, the weight of a pair is
+        the sum of the weights of the preferences in both directions. Engineers and managers are indexed separately, so
+        pairs of an engineer and a manager are handled the same as pairs of two engineers or two managers.
 
-        # Set up extra boolean variables for the case: manager - manager
-        manager_together_in_project_with_manager = {}
-        for m1 in range(len(self.managers)):
-            for m2 in range(m1, len(self.managers)):
-                for p in range(len(self.projects)):
-                    manager_together_in_project_with_manager[(m1, m2, p)] = self.model.NewBoolVar(
-                        f"manager_{m1}_together_in_project_{p}_with_manager_{m2}"
-                    )
-                    manager_together_in_project_with_manager[(m2, m1, p)] = manager_together_in_project_with_manager[
-                        (m1, m2, p)
-                    ]
-                    self.model.AddMultiplicationEquality(
-                        manager_together_in_project_with_manager[(m1, m2, p)],
-                        [self.assigned_managers[(m1, p)], self.assigned_managers[(m2, p)]],
-                    )
+        The value of a 'together' variable is the logical AND of the assignment variables of both people, encoded with
+        linear constraints: it is at most each of the two assignment variables, and at least their sum minus one.
 
-        # Set up extra boolean variables for the case: engineer - manager
-        engineer_together_in_project_with_manager = {}
-        for e in range(len(self.engineers)):
-            for m in range(len(self.managers)):
-                for p in range(len(self.projects)):
-                    engineer_together_in_project_with_manager[(e, m, p)] = self.model.NewBoolVar(
-                        f"engineer_{e}_together_in_project_{p}_with_manager_{m}"
-                    )
-                    self.model.AddMultiplicationEquality(
-                        engineer_together_in_project_with_manager[(e, m, p)],
-                        [self.assigned_engineers[(e, p)], self.assigned_managers[(m, p)]],
-                    )
+        The objective is then formed by the sum of the weights of all pairs that are assigned to the same project.
+        """
+        self.logger.info("Creating partner preference objective")
 
-        # Calculate the preferred partners for the case: engineer - engineer
-        engineer_preferred_partner_engineers = {}
-        for reg in range(len(self.engineers)):
-            for partner in range(len(self.engineers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.engineers[reg].partner_preference1_user,
-                        self.engineers[reg].partner_preference2_user,
-                        self.engineers[reg].partner_preference3_user,
-                    ]
+        objective = []
+        for (registration1, registration2), weight in self._preferred_partner_weights().items():
+            for p in range(len(self.projects)):
+                assigned1 = self._assigned_variable(registration1, p)
+                assigned2 = self._assigned_variable(registration2, p)
+                together = self.model.NewBoolVar(
+                    f"{registration1[0]}_{registration1[1]}_together_in_project_{p}_with_"
+                    f"{registration2[0]}_{registration2[1]}"
                 )
-                if num_pref == 0:
-                    engineer_preferred_partner_engineers[(reg, partner)] = 0
-                else:
-                    engineer_preferred_partner_engineers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.engineers[reg].partner_preference1_user == self.engineers[partner].user
-                            or self.engineers[reg].partner_preference2_user == self.engineers[partner].user
-                            or self.engineers[reg].partner_preference3_user == self.engineers[partner].user
-                        )
-                    )
+                self.model.Add(together <= assigned1)
+                self.model.Add(together <= assigned2)
+                self.model.Add(together >= assigned1 + assigned2 - 1)
+                objective.append(weight * together)
 
-        # Calculate the preferred partners for the case: manager - manager
-        manager_preferred_partner_managers = {}
-        for reg in range(len(self.managers)):
-            for partner in range(len(self.managers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.managers[reg].partner_preference1_user,
-                        self.managers[reg].partner_preference2_user,
-                        self.managers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    manager_preferred_partner_managers[(reg, partner)] = 0
-                else:
-                    manager_preferred_partner_managers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.managers[reg].partner_preference1_user == self.managers[partner].user
-                            or self.managers[reg].partner_preference2_user == self.managers[partner].user
-                            or self.managers[reg].partner_preference3_user == self.managers[partner].user
-                        )
-                    )
+        return sum(objective)
 
-        # Calculate the preferred partners for the case: engineer - manager
-        engineer_preferred_partner_managers = {}
-        for reg in range(len(self.engineers)):
-            for partner in range(len(self.managers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.engineers[reg].partner_preference1_user,
-                        self.engineers[reg].partner_preference2_user,
-                        self.engineers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    engineer_preferred_partner_managers[(reg, partner)] = 0
-                else:
-                    engineer_preferred_partner_managers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.engineers[reg].partner_preference1_user == self.managers[partner].user
-                            or self.engineers[reg].partner_preference2_user == self.managers[partner].user
-                            or self.engineers[reg].partner_preference3_user == self.managers[partner].user
-                        )
-                    )
+    def _preferred_partner_weights(self):
+        """
+        Get the weight of every pair of registrations in which at least one prefers the other as partner.
 
-        # Calculate the preferred partners for the case: manager - engineer
-        manager_preferred_partner_engineers = {}
-        for reg in range(len(self.managers)):
-            for partner in range(len(self.engineers)):
-                num_pref = sum(
-                    pref is not None
-                    for pref in [
-                        self.managers[reg].partner_preference1_user,
-                        self.managers[reg].partner_preference2_user,
-                        self.managers[reg].partner_preference3_user,
-                    ]
-                )
-                if num_pref == 0:
-                    manager_preferred_partner_engineers[(reg, partner)] = 0
-                else:
-                    manager_preferred_partner_engineers[(reg, partner)] = (
-                        12
-                        // num_pref
-                        * int(
-                            self.managers[reg].partner_preference1_user == self.engineers[partner].user
-                            or self.managers[reg].partner_preference2_user == self.engineers[partner].user
-                            or self.managers[reg].partner_preference3_user == self.engineers[partner].user
-                        )
-                    )
+        Registrations are identified by a tuple of 'engineer' or 'manager' and their index. Preferences for oneself and
+        for people that are not part of this team assignment are left out.
 
-        # Calculate the objective
-        objective = (
-            sum(
-                engineer_preferred_partner_engineers[(e1, e2)]
-                * engineer_together_in_project_with_engineer[(e1, e2, p)]
-                for e1 in range(len(self.engineers))
-                for e2 in range(len(self.engineers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                manager_preferred_partner_managers[(m1, m2)] * manager_together_in_project_with_manager[(m1, m2, p)]
-                for m1 in range(len(self.managers))
-                for m2 in range(len(self.managers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                engineer_preferred_partner_managers[(e, m)] * engineer_together_in_project_with_manager[(e, m, p)]
-                for e in range(len(self.engineers))
-                for m in range(len(self.managers))
-                for p in range(len(self.projects))
-            )
-            + sum(
-                manager_preferred_partner_engineers[(m, e)] * engineer_together_in_project_with_manager[(e, m, p)]
-                for m in range(len(self.managers))
-                for e in range(len(self.engineers))
-                for p in range(len(self.projects))
-            )
-        )
+        :return: dict of pairs of registrations to the sum of the weights of their preferences for each other.
+        """
+        registrations = [("engineer", r, self.engineers[r]) for r in range(len(self.engineers))] + [
+            ("manager", r, self.managers[r]) for r in range(len(self.managers))
+        ]
+        registration_for_user = {registration.user: (kind, r) for kind, r, registration in registrations}
 
-        return objective
+        weights = {}
+        for kind, r, registration in registrations:
+            preferred_users = [
+                user
+                for user in [
+                    registration.partner_preference1_user,
+                    registration.partner_preference2_user,
+                    registration.partner_preference3_user,
+                ]
+                if user is not None
+            ]
+            for user in set(preferred_users):
+                partner = registration_for_user.get(user)
+                if partner is None or partner == (kind, r):
+                    continue
+                pair = tuple(sorted([(kind, r), partner]))
+                weights[pair] = weights.get(pair, 0) + 12 // len(preferred_users)
+
+        return weights
+
+    def _assigned_variable(self, registration, p):
+        """Get the variable of whether a registration, identified by its kind and index, is assigned to a project."""
+        kind, r = registration
+        return (self.assigned_engineers if kind == "engineer" else self.assigned_managers)[(r, p)]
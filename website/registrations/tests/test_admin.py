@@ -15,6 +15,7 @@ from projects.models import Project
 
 from registrations.admin import UserAdminProjectFilter, UserAdminSemesterFilter
 from registrations.models import Employee, Registration
+from registrations.team_assignment import TeamAssignmentGenerator
 
 User: Employee = get_user_model()
 
@@ -136,6 +137,24 @@ class RegistrationAdminTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_mailing_list_users_autocomplete(self):
+        other_semester_user = User.objects.create(
+            github_id=3, github_username="old", first_name="First", last_name="Old"
+        )
+        Registration.objects.create(
+            user=other_semester_user,
+            semester=Semester.objects.create(year=2000, season=Semester.SPRING),
+            experience=Registration.EXPERIENCE_BEGINNER,
+            course=self.course,
+        )
+
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            data={"app_label": "mailing_lists", "model_name": "mailinglist", "field_name": "users", "term": "First"},
+        )
+
+        self.assertEqual([result["id"] for result in response.json()["results"]], [str(self.user.id)])
+
     def test_student_number_csv_export(self):
         response = self.client.post(
             reverse("admin:registrations_employee_changelist"),
@@ -429,17 +448,44 @@ class RegistrationAdminTest(TestCase):
     @patch("threading.Thread")
     def test_download_csv__post(self, mock_thread):
         logging.disable(logging.CRITICAL)
+        data = {
+            ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
+            "action": "generate_project_assignment_proposal",
+            "index": 0,
+        }
+        response = self.client.post(reverse("admin:registrations_employee_changelist"), data)
+        self.assertTemplateUsed(response, "admin/registrations/team-assignment.html")
+        self.assertContains(response, "2 selected users")
+        mock_thread.assert_not_called()
+
+        data.update({"apply": "", "num_workers": 2, "time_limit": 10, "random_seed": 3})
+        with patch("registrations.admin.TeamAssignmentGenerator", wraps=TeamAssignmentGenerator) as generator:
+            response = self.client.post(reverse("admin:registrations_employee_changelist"), data, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            generator.call_args.kwargs, {"num_workers": 2, "time_limit": 10, "random_seed": 3, "fix_assigned": False}
+        )
+        mock_thread.assert_called_once()
+
+    @patch("threading.Thread")
+    def test_download_csv__post_invalid_solver_options(self, mock_thread):
         response = self.client.post(
             reverse("admin:registrations_employee_changelist"),
             {
                 ACTION_CHECKBOX_NAME: [self.manager.id, self.user.id],
                 "action": "generate_project_assignment_proposal",
                 "index": 0,
+                "apply": "",
+                "num_workers": 0,
+                "time_limit": 10,
+                "random_seed": 0,
             },
-            follow=True,
         )
-        self.assertEqual(response.status_code, 200)
-        mock_thread.assert_called_once()
+        self.assertTemplateUsed(response, "admin/registrations/team-assignment.html")
+        self.assertFormError(
+            response.context["form"], "num_workers", "Ensure this value is greater than or equal to 1."
+        )
+        mock_thread.assert_not_called()
 
     def test_download_csv__post_no_registration(self):
         user_without_registration = User.objects.create(
@@ -1,15 +1,23 @@
 import logging
-from unittest.mock import patch
+import threading
+from collections import Counter
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
+from ortools.sat.python import cp_model
+
 from courses.models import Course, Semester
 
 from projects.models import Project
 
 from registrations.models import Employee, Registration
-from registrations.team_assignment import TeamAssignmentGenerator
+from registrations.team_assignment import SolutionProgress, TeamAssignmentGenerator
+
+from tasks.models import Task
 
 User: Employee = get_user_model()
 
@@ -239,6 +247,148 @@ class TeamAssignmentTest(TestCase):
 
         self.assertDictEqual(expected_assignment, actual_assignment)
 
+    def test_preferred_partner_weights(self):
+        self.reg1.partner_preference1 = str(self.user2)
+        self.reg1.partner_preference2 = str(self.user3)
+        self.reg1.save()
+        self.reg2.partner_preference1 = str(self.user1)
+        self.reg2.partner_preference2 = str(self.user2)
+        self.reg2.save()
+
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        engineer1 = ("engineer", generator.engineers.index(self.reg1))
+        engineer2 = ("engineer", generator.engineers.index(self.reg2))
+        manager3 = ("manager", generator.managers.index(self.reg3))
+
+        self.assertDictEqual(
+            generator._preferred_partner_weights(),
+            {tuple(sorted([engineer1, engineer2])): 12, tuple(sorted([engineer1, manager3])): 6},
+        )
+
+    def test_partner_preference_objective__only_preferred_pairs(self):
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        number_of_variables = len(generator.model.Proto().variables)
+        self.assertEqual(generator._partner_preference_objective(), 0)
+        self.assertEqual(len(generator.model.Proto().variables), number_of_variables)
+
+        self.reg1.partner_preference1 = str(self.user2)
+        self.reg1.save()
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        number_of_variables = len(generator.model.Proto().variables)
+        generator._partner_preference_objective()
+        self.assertEqual(len(generator.model.Proto().variables), number_of_variables + len(generator.projects))
+
+    def test_solve_csp__solver_parameters_and_progress(self):
+        parameters = []
+        solve = cp_model.CpSolver.Solve
+
+        def record_parameters(solver, model, solution_callback=None):
+            parameters.append(solver.parameters)
+            return solve(solver, model, solution_callback)
+
+        generator = TeamAssignmentGenerator(Registration.objects.all(), num_workers=2, time_limit=5, random_seed=7)
+        with patch.object(cp_model.CpSolver, "Solve", autospec=True, side_effect=record_parameters):
+            generator.execute_solve_task()
+
+        self.assertEqual(parameters[0].num_workers, 2)
+        self.assertEqual(parameters[0].max_time_in_seconds, 5)
+        self.assertEqual(parameters[0].random_seed, 7)
+        self.assertGreaterEqual(generator.progress.solutions, 1)
+        self.assertRegex(
+            generator.task.success_message,
+            r"^Successfully assigned all users to a project\. Solution \d+ found after .* seconds: objective -?\d+, "
+            r"bound -?\d+, gap .*%\.$",
+        )
+
+    def test_report_progress(self):
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        generator.progress = SolutionProgress()
+        solver = MagicMock()
+
+        generator._report_progress(solver)
+        generator.task.refresh_from_db()
+        self.assertEqual(generator.task.message, "Searching for a first solution")
+        solver.StopSearch.assert_not_called()
+
+        Task.objects.filter(pk=generator.task.pk).update(stop_requested=True)
+        generator._report_progress(solver)
+        solver.StopSearch.assert_called_once()
+
+    def test_solve_csp__stop_requested_while_solving(self):
+        stopped = threading.Event()
+        solve = cp_model.CpSolver.Solve
+
+        def solve_after_stop(solver, model, solution_callback=None):
+            stopped.wait(timeout=10)
+            return solve(solver, model, solution_callback)
+
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        Task.objects.filter(pk=generator.task.pk).update(stop_requested=True)
+        with patch.object(generator, "PROGRESS_INTERVAL_SECONDS", 0.01), patch.object(
+            cp_model.CpSolver, "Solve", autospec=True, side_effect=solve_after_stop
+        ), patch.object(cp_model.CpSolver, "StopSearch", autospec=True, side_effect=lambda solver: stopped.set()):
+            self.assertTrue(generator.generate_team_assignment())
+
+        self.assertTrue(stopped.is_set())
+        generator.task.refresh_from_db()
+        self.assertEqual(generator.task.message, "Searching for a first solution")
+
+    def test_greedy_assignment(self):
+        self.reg1.project = self.project3
+        self.reg1.save()
+        self.reg2.proposed_project = self.project3
+        self.reg2.save()
+        for registration in (self.reg4, self.reg5, self.reg7):
+            registration.preference1 = self.project3
+            registration.preference2 = self.project2
+            registration.save()
+
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        assignment = generator._greedy_assignment(generator.engineers, generator.engineers_per_project)
+        project_for_registrations = {generator.engineers[r].pk: generator.projects[p] for r, p in assignment.items()}
+
+        self.assertEqual(generator.projects[0], self.project3)
+        self.assertEqual(project_for_registrations[self.reg1.pk], self.project3)
+        self.assertEqual(project_for_registrations[self.reg2.pk], self.project3)
+        preferred = Counter(project_for_registrations[reg.pk] for reg in (self.reg4, self.reg5, self.reg7))
+        self.assertEqual(preferred[self.project2], 2)
+        self.assertEqual(preferred[self.project3], 0)
+        self.assertEqual(Counter(assignment.values()), Counter({0: 2, 1: 2, 2: 2}))
+
+    def test_add_hints(self):
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+
+        hint = generator.model.Proto().solution_hint
+        self.assertEqual(len(hint.vars), 9 * 3)
+        self.assertEqual(sum(hint.values), 9)
+
+    def test_solve_csp__fix_assigned(self):
+        for registration in (self.reg1, self.reg2, self.reg3):
+            registration.project = self.project1
+            registration.preference1 = self.project2
+            registration.save()
+
+        assignment = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True).generate_team_assignment()
+
+        self.assertEqual([assignment[reg.pk] for reg in (self.reg1, self.reg2, self.reg3)], [self.project1] * 3)
+
+    def test_solve_task__fix_assigned_infeasible(self):
+        logging.disable(logging.CRITICAL)
+        Registration.objects.filter(course=self.se).update(project=self.project1)
+
+        generator = TeamAssignmentGenerator(Registration.objects.all(), fix_assigned=True)
+        generator.execute_solve_task()
+
+        self.assertTrue(generator.task.fail)
+        self.assertIsNotNone(generator.task.fail_message)
+
+    def test_solve_task__stores_proposal(self):
+        generator = TeamAssignmentGenerator(Registration.objects.all())
+        generator.execute_solve_task()
+
+        self.assertFalse(generator.task.fail)
+        self.assertFalse(Registration.objects.filter(proposed_project=None).exists())
+
     def test_solve_csp__mixed_programming_experience(self):
         self.reg1.experience = Registration.EXPERIENCE_BEGINNER
         self.reg1.save()
@@ -323,3 +473,39 @@ class TeamAssignmentTest(TestCase):
         self.assertEqual(assignment_generator.task.data, result)
         self.assertEqual(assignment_generator.task.completed, 1)
         self.assertFalse(assignment_generator.task.fail)
+
+
+class BenchmarkTeamAssignmentCommandTest(TestCase):
+    def test_benchmark(self):
+        output = StringIO()
+
+        call_command("benchmark_team_assignment", engineers=6, managers=3, projects=3, time_limit=5, stdout=output)
+
+        self.assertIn("6 engineers and 3 managers in 3 projects", output.getvalue())
+        self.assertIn("Sparse partner preference objective", output.getvalue())
+        self.assertIn("Dense partner preference objective", output.getvalue())
+        self.assertEqual(output.getvalue().count("(OPTIMAL)"), 2)
+        objectives = [line.split()[-1] for line in output.getvalue().splitlines() if "Objective:" in line]
+        self.assertEqual(objectives[0], objectives[1])
+        self.assertFalse(Registration.objects.exists())
+
+    def test_benchmark__verbose_without_solution(self):
+        output = StringIO()
+
+        with patch.object(cp_model.CpSolver, "Solve", return_value=cp_model.INFEASIBLE):
+            call_command(
+                "benchmark_team_assignment",
+                engineers=6,
+                managers=3,
+                projects=3,
+                time_limit=5,
+                seed=1,
+                skip_baseline=True,
+                verbosity=2,
+                stdout=output,
+            )
+
+        self.assertIn("(INFEASIBLE)", output.getvalue())
+        self.assertNotIn("Dense partner preference objective", output.getvalue())
+        self.assertNotIn("Objective:", output.getvalue())
+        self.assertFalse(Registration.objects.exists())
@@ -26,9 +26,17 @@ class TaskAdmin(admin.ModelAdmin):
                 "completed": task.completed,
                 "total": task.total,
                 "hasData": (not task.fail and task.data is not None and task.data != ""),
+                "message": task.message,
+                "canStop": task.can_stop and not task.stop_requested,
             }
         )
 
+    def task_stop(self, request, task):
+        """Request a Task to stop before it completes."""
+        if request.method == "POST":
+            Task.objects.filter(pk=task, can_stop=True).update(stop_requested=True)
+        return redirect("admin:progress_bar", task=task)
+
     def task_download(self, request, task):
         """Download the data of a task."""
         t = get_object_or_404(Task, pk=task)
@@ -45,7 +53,8 @@ class TaskAdmin(admin.ModelAdmin):
         if task.fail:
             messages.error(
                 request,
-                "Something went wrong while processing the task. Look at the log files for more details.",
+                task.fail_message
+                or "Something went wrong while processing the task. Look at the log files for more details.",
             )
         else:
             messages.success(request, task.success_message)
@@ -75,6 +84,11 @@ class TaskAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.task_result),
                 name="result",
             ),
+            path(
+                "task/<int:task>/stop",
+                self.admin_site.admin_view(self.task_stop),
+                name="stop",
+            ),
             path(
                 "task/<int:task>/download",
                 self.admin_site.admin_view(self.task_download),
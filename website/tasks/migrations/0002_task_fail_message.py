@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="fail_message",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0002_task_fail_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="can_stop",
+            field=models.BooleanField(default=False, help_text="Whether the task can be stopped before it completes."),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="message",
+            field=models.TextField(blank=True, help_text="Progress message shown below the progress bar.", null=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="stop_requested",
+            field=models.BooleanField(default=False),
+        ),
+    ]
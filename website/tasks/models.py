@@ -8,7 +8,11 @@ class Task(models.Model):
     completed = models.IntegerField(null=True, blank=True)
     fail = models.BooleanField(default=False)
     success_message = models.TextField(null=True, blank=True)
+    fail_message = models.TextField(null=True, blank=True)
     data = models.TextField(null=True, blank=True)
+    message = models.TextField(null=True, blank=True, help_text="Progress message shown below the progress bar.")
+    can_stop = models.BooleanField(default=False, help_text="Whether the task can be stopped before it completes.")
+    stop_requested = models.BooleanField(default=False)
     redirect_url = models.CharField(max_length=60)
 
     def __str__(self):
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 
 from django.contrib.admin import AdminSite
@@ -29,12 +30,49 @@ class MyTestCase(TestCase):
 
         response = self.task_admin.task_progress(self.request, self.task.id)
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(str(response.content, encoding="utf8"), {"completed": 0, "total": 5, "hasData": False})
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"completed": 0, "total": 5, "hasData": False, "message": None, "canStop": False},
+        )
 
     def test_task_progress_data(self):
         response = self.task_admin.task_progress(self.request, self.task_data.id)
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(str(response.content, encoding="utf8"), {"completed": 0, "total": 1, "hasData": True})
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"completed": 0, "total": 1, "hasData": True, "message": None, "canStop": False},
+        )
+
+    def test_task_progress_stoppable(self):
+        Task.objects.filter(pk=self.task.id).update(can_stop=True, message="Solution 1")
+        response = self.task_admin.task_progress(self.request, self.task.id)
+        self.assertJSONEqual(
+            str(response.content, encoding="utf8"),
+            {"completed": 0, "total": 5, "hasData": False, "message": "Solution 1", "canStop": True},
+        )
+
+        Task.objects.filter(pk=self.task.id).update(stop_requested=True)
+        response = self.task_admin.task_progress(self.request, self.task.id)
+        self.assertFalse(json.loads(response.content)["canStop"])
+
+    def test_task_stop(self):
+        request = RequestFactory().post(reverse("admin:stop", args=[self.task.id]))
+        response = self.task_admin.task_stop(request, self.task.id)
+        self.assertRedirects(
+            response, reverse("admin:progress_bar", args=[self.task.id]), fetch_redirect_response=False
+        )
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.stop_requested)
+
+        self.task.can_stop = True
+        self.task.save()
+        self.task_admin.task_stop(RequestFactory().get("/"), self.task.id)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.stop_requested)
+
+        self.task_admin.task_stop(request, self.task.id)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.stop_requested)
 
     def test_task_download_no_data(self):
         with self.assertRaises(Http404):
@@ -66,3 +104,8 @@ class MyTestCase(TestCase):
         self.task_admin.task_result(self.request, self.task.id)
         redirect.asser_called_once_with(self.task.redirect_url)
         error_message.assert_called_once()
+
+        self.task.fail_message = "fail message"
+        self.task.save()
+        self.task_admin.task_result(self.request, self.task.id)
+        error_message.assert_called_with(self.request, "fail message")